@@ -0,0 +1,289 @@
+"""Benchmarks for the incident store at realistic sizes.
+
+Generates synthetic incident databases, then measures bulk and single
+insert throughput, filtered and full-text query latency, the time the
+Incident Response tab takes to refresh, and web API latency. Everything
+runs offline against scratch databases; results are written as JSON so
+runs of different versions can be compared.
+
+    python benchmark.py --sizes 10k,1m --output results.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+# web_demo opens its store on import, so point it at a scratch file first
+SCRATCH_DIR = tempfile.mkdtemp(prefix="incident-bench-")
+os.environ["INCIDENT_STORE"] = "sqlite"
+os.environ["INCIDENTS_DB"] = os.path.join(SCRATCH_DIR, "web-import.db")
+
+from loguru import logger  # noqa: E402
+# Keep per-batch and migration chatter out of the report
+logger.remove()
+logger.add(sys.stderr, level="WARNING")
+
+from PyQt5.QtCore import QModelIndex  # noqa: E402
+import web_demo  # noqa: E402
+from modules import incident_db, incident_store  # noqa: E402
+from modules.incident_cache import IncidentCache  # noqa: E402
+from modules.incident_model import IncidentTableModel  # noqa: E402
+
+SIZES = {"10k": 10000, "100k": 100000, "1m": 1000000, "10m": 10000000}
+
+SUBJECTS = [
+    "Failed login burst for {user}", "Port scan from {ip}", "Malware signature match on {host}",
+    "Disk usage high on {host}", "Unusual outbound traffic to {ip}",
+    "High memory usage: {process}", "Privilege escalation attempt by {user}",
+    "Suspicious PowerShell on {host}",
+]
+WORDS = ("admin service backup kernel firewall proxy token session certificate cron "
+         "registry payload beacon exfiltration ransomware phishing credential lateral "
+         "persistence dns tunnel anomaly baseline quarantine").split()
+PROCESSES = ["chrome.exe", "svchost.exe", "java", "python3", "postgres", "nginx", "teams.exe"]
+# Most incidents are minor, as in a real queue
+SEVERITY_WEIGHTS = [40, 30, 20, 10]
+STATUS_WEIGHTS = {"New": 20, "Acknowledged": 15, "Contained": 10, "Resolved": 55}
+# Synthetic incidents are spread over this many days before now
+SPREAD_DAYS = 365
+INSERT_CHUNK = 50000
+
+FILTERED_QUERIES = {
+    "newest": {},
+    "severity_critical": {"severity": "Critical"},
+    "status_new": {"status": "New"},
+    "last_7_days": {"since": "{week_ago}"},
+    "severity_desc": {"sort": "severity_desc"},
+    "critical_last_7_days_oldest": {"severity": "Critical", "since": "{week_ago}",
+                                    "sort": "oldest"},
+}
+SEARCHES = {
+    "common_word": "session",
+    "rare_word": "exfiltration beacon",
+    "prefix": "ransom",
+    "no_match": "zzzz",
+}
+WEB_REQUESTS = {
+    "list": "/api/incidents?limit=50",
+    "list_filtered": "/api/incidents?limit=50&severity=High&status=New",
+    "search": "/api/incidents?limit=50&q=credential",
+    "stats": "/api/stats",
+    "counts_7d": "/api/incidents/counts?days=7",
+    "timeseries_48h": "/api/incidents/timeseries?granularity=hour",
+    "timeseries_30d": "/api/incidents/timeseries?granularity=day",
+}
+
+
+def summarize(latencies):
+    """Latency statistics in milliseconds"""
+    ordered = sorted(latencies)
+    return {
+        "count": len(ordered),
+        "mean_ms": statistics.mean(ordered) * 1000,
+        "p50_ms": ordered[len(ordered) // 2] * 1000,
+        "p99_ms": ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))] * 1000,
+        "max_ms": ordered[-1] * 1000,
+    }
+
+
+def timed(function, repeat):
+    latencies = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        latencies.append(time.perf_counter() - started)
+    return summarize(latencies)
+
+
+def synthetic_incidents(count, rng, now):
+    """(status, [(subject, severity, description, timestamp), ...]) chunks"""
+    statuses = list(STATUS_WEIGHTS)
+    weights = list(STATUS_WEIGHTS.values())
+    for start in range(0, count, INSERT_CHUNK):
+        chunk = []
+        for _ in range(min(INSERT_CHUNK, count - start)):
+            subject = rng.choice(SUBJECTS).format(
+                user=f"user{rng.randrange(500)}", ip=f"203.0.113.{rng.randrange(256)}",
+                host=f"host-{rng.randrange(200):03d}", process=rng.choice(PROCESSES))
+            description = " ".join(rng.choices(WORDS, k=12))
+            timestamp = now - timedelta(seconds=rng.randrange(SPREAD_DAYS * 86400))
+            chunk.append((subject, rng.choices(incident_db.SEVERITIES, SEVERITY_WEIGHTS)[0],
+                          description, timestamp.strftime("%Y-%m-%d %H:%M:%S")))
+        yield rng.choices(statuses, weights)[0], chunk
+
+
+def bench_inserts(store, rows, rng, now):
+    started = time.perf_counter()
+    for status, chunk in synthetic_incidents(rows, rng, now):
+        store.insert_incidents(chunk, status)
+    bulk_seconds = time.perf_counter() - started
+
+    singles = 1000
+    started = time.perf_counter()
+    for n in range(singles):
+        store.insert_incident("Benchmark single insert", "Low", f"Single insert {n}")
+    single_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    futures = [store.submit("insert_incident", "Benchmark queued insert", "Low", f"Queued {n}")
+               for n in range(singles)]
+    for future in futures:
+        future.result()
+    queued_seconds = time.perf_counter() - started
+    return {
+        "bulk_rows_per_s": rows / bulk_seconds,
+        "bulk_seconds": bulk_seconds,
+        "single_rows_per_s": singles / single_seconds,
+        "queued_rows_per_s": singles / queued_seconds,
+    }
+
+
+def bench_queries(store, repeat, week_ago):
+    results = {}
+    for name, filters in FILTERED_QUERIES.items():
+        filters = {key: value.format(week_ago=week_ago) for key, value in filters.items()}
+        results[name] = timed(lambda: store.query_page(limit=50, **filters), repeat)
+
+    # Twenty pages in, which is as deep as anyone scrolls
+    def deep_page():
+        after = None
+        for _ in range(20):
+            _, after = store.query_page(limit=50, after=after)
+    results["page_20"] = timed(deep_page, max(1, repeat // 10))
+    return results
+
+
+def bench_searches(store, repeat):
+    return {name: timed(lambda: store.query_page(limit=50, search=search), repeat)
+            for name, search in SEARCHES.items()}
+
+
+def bench_refresh(store, repeat):
+    """What the Incident Response tab does on a full refresh and at startup"""
+    model = IncidentTableModel(store)
+
+    def refresh():
+        model.refresh()
+        store.get_stats()
+        store.get_response_times()
+
+    def scroll():
+        model.refresh()
+        for _ in range(10):
+            model.fetchMore(QModelIndex())
+
+    def load_cache():
+        cache = IncidentCache(store)
+        cache.sync()
+        cache.close()
+
+    return {
+        "refresh": timed(refresh, repeat),
+        "scroll_10_pages": timed(scroll, max(1, repeat // 10)),
+        "cache_load": timed(load_cache, 1),
+    }
+
+
+def bench_web(store, repeat):
+    web_demo.store = store
+    web_demo.incident_cache.close()
+    web_demo.incident_cache = IncidentCache(store)
+    # Every request should reach the store, not the response cache
+    web_demo.response_cache.max_entries = 0
+    client = web_demo.app.test_client()
+    results = {}
+    for name, path in WEB_REQUESTS.items():
+        client.get(path)
+        results[name] = timed(lambda: client.get(path), repeat)
+    results["create"] = timed(lambda: client.post("/api/incidents", json={
+        "subject": "Benchmark API insert", "severity": "Medium", "description": "From the benchmark",
+    }), repeat)
+    return results
+
+
+def run_size(label, rows, repeat, seed):
+    path = os.path.join(SCRATCH_DIR, f"incidents-{label}.db")
+    store = incident_store.SQLiteIncidentStore(path)
+    rng = random.Random(seed)
+    now = datetime.now()
+    try:
+        result = {"rows": rows}
+        result["insert"] = bench_inserts(store, rows, rng, now)
+        # Measure a settled database, as the app sees it after a restart
+        with store.connection() as conn:
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            conn.execute("ANALYZE")
+            conn.commit()
+        result["database_mb"] = os.path.getsize(path) / 1e6
+        week_ago = (now - timedelta(days=7)).strftime("%Y-%m-%d %H:%M:%S")
+        result["query"] = bench_queries(store, repeat, week_ago)
+        result["search"] = bench_searches(store, repeat)
+        result["refresh"] = bench_refresh(store, max(1, repeat // 5))
+        result["web"] = bench_web(store, repeat)
+        return result
+    finally:
+        store.close()
+
+
+def git_version():
+    try:
+        return subprocess.run(["git", "describe", "--always", "--dirty"], capture_output=True,
+                              text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="10k",
+                        help=f"comma-separated dataset sizes, from {', '.join(SIZES)}")
+    parser.add_argument("--repeat", type=int, default=50, help="timed runs per measurement")
+    parser.add_argument("--seed", type=int, default=1, help="seed for the synthetic data")
+    parser.add_argument("--output", help="write the JSON results here instead of stdout")
+    parser.add_argument("--keep", action="store_true", help="keep the scratch databases")
+    args = parser.parse_args()
+
+    sizes = [size.strip().lower() for size in args.sizes.split(",")]
+    unknown = [size for size in sizes if size not in SIZES]
+    if unknown:
+        parser.error(f"unknown size {', '.join(unknown)}; choose from {', '.join(SIZES)}")
+
+    report = {
+        "version": git_version(),
+        "started_at": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "platform": platform.platform(),
+        "repeat": args.repeat,
+        "results": {},
+    }
+    try:
+        for size in sizes:
+            print(f"Benchmarking {size} incidents...", file=sys.stderr)
+            report["results"][size] = run_size(size, SIZES[size], args.repeat, args.seed)
+    finally:
+        if args.keep:
+            print(f"Scratch databases left in {SCRATCH_DIR}", file=sys.stderr)
+        else:
+            shutil.rmtree(SCRATCH_DIR, ignore_errors=True)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""Load test for the incident API's database access.
+
+Runs the same mix of concurrent reads and writes against the Flask app twice:
+once the old way, with a fresh rollback-journal connection per request, and
+once through the WAL connection pool. Each run gets its own scratch database,
+so this never touches incidents.db.
+
+    python load_test.py --clients 16 --requests 200 --write-ratio 0.1
+"""
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import threading
+import time
+
+# web_demo opens its store on import, so point it at a scratch file first
+SCRATCH_DIR = tempfile.mkdtemp(prefix="incident-load-")
+os.environ["INCIDENT_STORE"] = "sqlite"
+os.environ["INCIDENTS_DB"] = os.path.join(SCRATCH_DIR, "pooled.db")
+
+import web_demo  # noqa: E402
+from modules import incident_db  # noqa: E402
+
+READ_PATHS = [
+    "/api/incidents?limit=50",
+    "/api/incidents?limit=50&severity=Critical",
+    "/api/incidents?limit=50&sort=severity_desc",
+    "/api/incidents?limit=50&q=login",
+    "/api/stats",
+]
+SUBJECTS = ["Failed login burst", "Port scan detected", "Malware signature match",
+            "Disk usage high", "Unusual outbound traffic"]
+
+
+class LegacyConnections:
+    """What get_db_connection used to do: open and close per request"""
+
+    def __init__(self, path):
+        self.path = path
+
+    def acquire(self):
+        conn = sqlite3.connect(self.path)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def release(self, conn):
+        conn.close()
+
+
+def seed(path, rows, journal_mode):
+    conn = incident_db.connect(path)
+    conn.execute(f"PRAGMA journal_mode = {journal_mode}")
+    incidents = [
+        (random.choice(SUBJECTS), random.choice(incident_db.SEVERITIES),
+         f"Synthetic incident {n} for load testing", None)
+        for n in range(rows)
+    ]
+    incident_db.insert_incidents(conn, incidents)
+    conn.close()
+
+
+def client(requests, write_ratio, results):
+    test_client = web_demo.app.test_client()
+    for n in range(requests):
+        write = random.random() < write_ratio
+        started = time.perf_counter()
+        try:
+            if write:
+                response = test_client.post("/api/incidents", json={
+                    "subject": random.choice(SUBJECTS),
+                    "severity": random.choice(incident_db.SEVERITIES),
+                    "description": f"Load test write {n}",
+                })
+            else:
+                response = test_client.get(random.choice(READ_PATHS))
+            ok = response.status_code < 500
+        except sqlite3.Error:
+            ok = False
+        results.append((write, ok, time.perf_counter() - started))
+
+
+def run(mode, clients, requests, write_ratio):
+    results = []
+    threads = [threading.Thread(target=client, args=(requests, write_ratio, results))
+               for _ in range(clients)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    print(f"\n{mode}: {clients} clients x {requests} requests in {elapsed:.2f}s")
+    for label, is_write in (("reads", False), ("writes", True)):
+        latencies = sorted(latency for write, ok, latency in results if write == is_write and ok)
+        failed = sum(1 for write, ok, _ in results if write == is_write and not ok)
+        if not latencies:
+            print(f"  {label:6}  none completed, {failed} failed")
+            continue
+        p95 = latencies[int(len(latencies) * 0.95) - 1]
+        print(f"  {label:6} {len(latencies) / elapsed:8.0f}/s"
+              f"  p50 {statistics.median(latencies) * 1000:6.1f} ms"
+              f"  p95 {p95 * 1000:6.1f} ms  failed {failed}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=200, help="requests per client")
+    parser.add_argument("--rows", type=int, default=20000, help="incidents to seed")
+    parser.add_argument("--write-ratio", type=float, default=0.1)
+    args = parser.parse_args()
+
+    # Every request should reach the database, not the response cache
+    web_demo.response_cache.max_entries = 0
+
+    legacy_path = os.path.join(SCRATCH_DIR, "legacy.db")
+    seed(legacy_path, args.rows, "DELETE")
+    pool = web_demo.store.pool
+    web_demo.store.pool = LegacyConnections(legacy_path)
+    run("connection per request, rollback journal", args.clients, args.requests, args.write_ratio)
+
+    seed(pool.path, args.rows, "WAL")
+    web_demo.store.pool = pool
+    run("pooled connections, WAL", args.clients, args.requests, args.write_ratio)
+    pool.close()
+    print(f"\nScratch databases left in {SCRATCH_DIR}")
+
+
+if __name__ == "__main__":
+    main()
@@ -8,6 +8,7 @@ from PyQt5.QtCore import Qt
 from loguru import logger
 from .gui_components import (StyledLabel, StyledButton, StyledGroupBox, 
                            DataCard, COLORS)
+from .telemetry import get_sampler, host_info
 
 class AssetTreeWidget(QTreeWidget):
     def __init__(self):
@@ -42,6 +43,7 @@ class AssetTreeWidget(QTreeWidget):
 class AssetManagementModule(QWidget):
     def __init__(self):
         super().__init__()
+        self.sampler = get_sampler()
         self.setup_ui()
         
     def setup_ui(self):
@@ -131,6 +133,13 @@ class AssetManagementModule(QWidget):
         self.refresh_assets()
         
     def refresh_assets(self):
+        # Collected on the sampler thread; the trees are filled once it is in
+        self.refresh_button.setEnabled(False)
+        self.sampler.refresh("cpu", "memory", "partitions", "interfaces", "connections",
+                             "processes", "users", callback=self.show_assets)
+
+    def show_assets(self):
+        self.refresh_button.setEnabled(True)
         self.refresh_hardware_assets()
         self.refresh_network_assets()
         self.refresh_software_assets()
@@ -143,42 +152,41 @@ class AssetManagementModule(QWidget):
         self.hardware_tree.clear()
         
         # System Information
+        host = host_info()
         system_item = QTreeWidgetItem(["System Information"])
-        system_item.addChild(QTreeWidgetItem(["Hostname", socket.gethostname()]))
-        system_item.addChild(QTreeWidgetItem(["OS", f"{platform.system()} {platform.release()}"]))
-        system_item.addChild(QTreeWidgetItem(["Architecture", platform.machine()]))
+        system_item.addChild(QTreeWidgetItem(["Hostname", host.hostname]))
+        system_item.addChild(QTreeWidgetItem(["OS", host.os]))
+        system_item.addChild(QTreeWidgetItem(["Architecture", host.architecture]))
         self.hardware_tree.addTopLevelItem(system_item)
         
         # CPU Information
         cpu_item = QTreeWidgetItem(["CPU"])
-        cpu_count = psutil.cpu_count(logical=True)
-        cpu_freq = psutil.cpu_freq()
-        cpu_item.addChild(QTreeWidgetItem(["Cores", str(cpu_count)]))
-        if cpu_freq:
-            cpu_item.addChild(QTreeWidgetItem(["Frequency", f"{cpu_freq.current:.2f} MHz"]))
-        cpu_item.addChild(QTreeWidgetItem(["Usage", f"{psutil.cpu_percent()}%"]))
+        cpu_item.addChild(QTreeWidgetItem(["Cores", str(host.cpu_count)]))
+        if host.cpu_freq:
+            cpu_item.addChild(QTreeWidgetItem(["Frequency", f"{host.cpu_freq:.2f} MHz"]))
+        cpu_item.addChild(QTreeWidgetItem(["Usage", f"{self.sampler.latest_data('cpu', 0.0)}%"]))
         self.hardware_tree.addTopLevelItem(cpu_item)
         
         # Memory Information
         memory_item = QTreeWidgetItem(["Memory"])
-        mem = psutil.virtual_memory()
-        memory_item.addChild(QTreeWidgetItem(["Total", f"{mem.total // (1024**3)} GB"]))
-        memory_item.addChild(QTreeWidgetItem(["Available", f"{mem.available // (1024**3)} GB"]))
-        memory_item.addChild(QTreeWidgetItem(["Used", f"{mem.percent}%"]))
+        mem = self.sampler.latest_data("memory")
+        if mem is not None:
+            memory_item.addChild(QTreeWidgetItem(["Total", f"{mem.total // (1024**3)} GB"]))
+            memory_item.addChild(QTreeWidgetItem(["Available", f"{mem.available // (1024**3)} GB"]))
+            memory_item.addChild(QTreeWidgetItem(["Used", f"{mem.percent}%"]))
         self.hardware_tree.addTopLevelItem(memory_item)
         
         # Disk Information
         disk_item = QTreeWidgetItem(["Storage"])
-        for partition in psutil.disk_partitions():
-            try:
-                usage = psutil.disk_usage(partition.mountpoint)
-                part_item = QTreeWidgetItem([partition.device])
-                part_item.addChild(QTreeWidgetItem(["Mount Point", partition.mountpoint]))
-                part_item.addChild(QTreeWidgetItem(["Total", f"{usage.total // (1024**3)} GB"]))
-                part_item.addChild(QTreeWidgetItem(["Used", f"{usage.percent}%"]))
-                disk_item.addChild(part_item)
-            except:
+        for partition in self.sampler.latest_data("partitions", ()):
+            usage = partition.usage
+            if usage is None:
                 continue
+            part_item = QTreeWidgetItem([partition.device])
+            part_item.addChild(QTreeWidgetItem(["Mount Point", partition.mountpoint]))
+            part_item.addChild(QTreeWidgetItem(["Total", f"{usage.total // (1024**3)} GB"]))
+            part_item.addChild(QTreeWidgetItem(["Used", f"{usage.percent}%"]))
+            disk_item.addChild(part_item)
         self.hardware_tree.addTopLevelItem(disk_item)
         
         # Expand all items
@@ -188,7 +196,7 @@ class AssetManagementModule(QWidget):
         self.network_tree.clear()
         
         # Network Interfaces
-        for iface, addrs in psutil.net_if_addrs().items():
+        for iface, addrs, stats in self.sampler.latest_data("interfaces", ()):
             iface_item = QTreeWidgetItem([iface])
             for addr in addrs:
                 if addr.family == socket.AF_INET:
@@ -199,18 +207,15 @@ class AssetManagementModule(QWidget):
                     iface_item.addChild(QTreeWidgetItem(["MAC", addr.address]))
             
             # Add interface statistics
-            try:
-                stats = psutil.net_if_stats()[iface]
+            if stats is not None:
                 iface_item.addChild(QTreeWidgetItem(["Speed", f"{stats.speed} Mbps"]))
                 iface_item.addChild(QTreeWidgetItem(["Status", "Up" if stats.isup else "Down"]))
-            except:
-                pass
                 
             self.network_tree.addTopLevelItem(iface_item)
             
         # Network Connections
         connections_item = QTreeWidgetItem(["Active Connections"])
-        for conn in psutil.net_connections(kind='inet'):
+        for conn in self.sampler.latest_data("connections", ()):
             if conn.status == 'ESTABLISHED':
                 conn_item = QTreeWidgetItem([f"Connection {conn.pid if conn.pid else 'Unknown'}"])
                 conn_item.addChild(QTreeWidgetItem(["Local", f"{conn.laddr.ip}:{conn.laddr.port}"]))
@@ -278,13 +283,9 @@ class AssetManagementModule(QWidget):
         else:
             # Basic process listing for non-Windows systems
             processes = {}
-            for proc in psutil.process_iter(['name', 'exe', 'cmdline']):
-                try:
-                    info = proc.info
-                    if info['name'] not in processes and info['exe']:
-                        processes[info['name']] = info['exe']
-                except:
-                    continue
+            for proc in self.sampler.latest_data("processes", ()):
+                if proc.name not in processes and proc.exe:
+                    processes[proc.name] = proc.exe
             
             for name, path in sorted(processes.items()):
                 prog_item = QTreeWidgetItem([name])
@@ -296,7 +297,7 @@ class AssetManagementModule(QWidget):
         
         # Current sessions
         sessions_item = QTreeWidgetItem(["Active Sessions"])
-        for user in psutil.users():
+        for user in self.sampler.latest_data("users", ()):
             user_item = QTreeWidgetItem([user.name])
             user_item.addChild(QTreeWidgetItem(["Terminal", user.terminal or "N/A"]))
             user_item.addChild(QTreeWidgetItem(["Host", user.host or "local"]))
@@ -308,15 +309,11 @@ class AssetManagementModule(QWidget):
         # User processes
         processes_item = QTreeWidgetItem(["User Processes"])
         user_procs = {}
-        for proc in psutil.process_iter(['name', 'username']):
-            try:
-                username = proc.info['username']
-                if username:
-                    if username not in user_procs:
-                        user_procs[username] = []
-                    user_procs[username].append(proc.info['name'])
-            except:
-                continue
+        for proc in self.sampler.latest_data("processes", ()):
+            if proc.username:
+                if proc.username not in user_procs:
+                    user_procs[proc.username] = []
+                user_procs[proc.username].append(proc.name)
                 
         for username, procs in sorted(user_procs.items()):
             user_item = QTreeWidgetItem([username])
@@ -329,17 +326,17 @@ class AssetManagementModule(QWidget):
         
     def update_stats(self):
         # Update summary cards
-        mem = psutil.virtual_memory()
-        self.total_memory_card.update_value(f"{mem.total // (1024**3)} GB")
+        host = host_info()
+        self.total_memory_card.update_value(f"{host.memory_total // (1024**3)} GB")
         
         total_storage = sum(
-            psutil.disk_usage(p.mountpoint).total // (1024**3)
-            for p in psutil.disk_partitions()
-            if "fixed" in p.opts
+            p.usage.total // (1024**3)
+            for p in self.sampler.latest_data("partitions", ())
+            if "fixed" in p.opts and p.usage is not None
         )
         self.disk_space_card.update_value(f"{total_storage} GB")
         
-        self.cpu_cores_card.update_value(str(psutil.cpu_count(logical=True)))
+        self.cpu_cores_card.update_value(str(host.cpu_count))
 
 def get_asset_management_tab():
     return AssetManagementModule() 
\ No newline at end of file
@@ -0,0 +1,398 @@
+import functools
+import os
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+from loguru import logger
+from . import incident_db
+
+# Incidents older than this move out of the hot table into monthly archives
+RETENTION_DAYS = 90
+# Closed incidents are archived sooner; nobody works them any more
+CLOSED_RETENTION_DAYS = 7
+
+# Incidents moved per transaction. Each batch holds the write lock only for
+# a delete of this many rows, so saves from the GUI never wait long.
+ARCHIVE_BATCH = 500
+# Seconds between archive passes, and the breather between batches in one
+ARCHIVE_INTERVAL = 3600
+ARCHIVE_PAUSE = 0.05
+
+ARCHIVE_DIR = "archive"
+
+
+def _database_dir(conn):
+    path = conn.execute("PRAGMA database_list").fetchone()[2]
+    return os.path.dirname(path) if path else os.getcwd()
+
+
+def archive_path(month):
+    """Archive file for a YYYY-MM month, relative to the hot database"""
+    return os.path.join(ARCHIVE_DIR, f"incidents-{month}.db")
+
+
+def open_archive(path):
+    # Archives are written in batches and otherwise only read, so they keep
+    # a rollback journal and can be opened read-only without a -shm file
+    conn = sqlite3.connect(path)
+    conn.execute(f"PRAGMA busy_timeout = {incident_db.BUSY_TIMEOUT_MS}")
+    conn.execute("PRAGMA journal_mode = DELETE")
+    incident_db.ensure_schema(conn)
+    return conn
+
+
+def _columns(conn):
+    return [row[1] for row in conn.execute("PRAGMA table_info(incidents)")]
+
+
+# (severity rank, first, last timestamp) of each severity in an archive
+RANGES_SQL = '''
+    SELECT severity_rank, MIN(timestamp), MAX(timestamp) FROM incidents GROUP BY severity_rank
+'''
+
+
+def _save_ranges(conn, month_ranges):
+    conn.executemany("DELETE FROM incident_archive_ranges WHERE month = ?",
+                     [(month,) for month in {month for month, *_ in month_ranges}])
+    conn.executemany('''
+        INSERT INTO incident_archive_ranges (month, severity_rank, first_timestamp, last_timestamp)
+        VALUES (?, ?, ?, ?)
+    ''', month_ranges)
+
+
+def archive_batch(conn, now=None, batch_size=ARCHIVE_BATCH, retention_days=RETENTION_DAYS,
+                  closed_retention_days=CLOSED_RETENTION_DAYS):
+    """Move up to batch_size expired incidents into their monthly archives.
+
+    Rows are committed to the archive before they are deleted from the hot
+    table, and copied with INSERT OR IGNORE, so a pass interrupted between
+    the two steps is simply finished by the next one. Returns the number of
+    incidents moved; 0 means nothing is left to archive.
+    """
+    now = now or datetime.now()
+    cutoff = (now - timedelta(days=retention_days)).strftime("%Y-%m-%d %H:%M:%S")
+    closed_cutoff = (now - timedelta(days=closed_retention_days)).strftime("%Y-%m-%d %H:%M:%S")
+    statuses = ", ".join("?" for _ in incident_db.CLOSED_STATUSES)
+    columns = _columns(conn)
+    rows = conn.execute(f'''
+        SELECT {", ".join(columns)} FROM incidents
+        WHERE timestamp < ? OR (status IN ({statuses}) AND timestamp < ?)
+        ORDER BY timestamp LIMIT ?
+    ''', (cutoff, *incident_db.CLOSED_STATUSES, closed_cutoff, batch_size)).fetchall()
+    if not rows:
+        return 0
+
+    by_month = {}
+    timestamp_index = columns.index("timestamp")
+    for row in rows:
+        by_month.setdefault(row[timestamp_index][:7], []).append(row)
+
+    base = _database_dir(conn)
+    os.makedirs(os.path.join(base, ARCHIVE_DIR), exist_ok=True)
+    catalog = []
+    month_ranges = []
+    for month, month_rows in by_month.items():
+        path = archive_path(month)
+        archive = open_archive(os.path.join(base, path))
+        try:
+            # Only columns both sides know about, in case the archive was
+            # created by an older version
+            shared = [column for column in columns if column in set(_columns(archive))]
+            positions = [columns.index(column) for column in shared]
+            with archive:
+                archive.executemany(
+                    f"INSERT OR IGNORE INTO incidents ({', '.join(shared)}) "
+                    f"VALUES ({', '.join('?' for _ in shared)})",
+                    [[row[i] for i in positions] for row in month_rows])
+                # Nobody follows an archive's change log
+                archive.execute("DELETE FROM incident_changes")
+            first, last = archive.execute(
+                "SELECT MIN(timestamp), MAX(timestamp) FROM incidents").fetchone()
+            count = archive.execute(
+                "SELECT count FROM incident_counts WHERE dimension = 'total'").fetchone()[0]
+            month_ranges += [(month, *row) for row in archive.execute(RANGES_SQL)]
+        finally:
+            archive.close()
+        catalog.append((month, path, first, last, count))
+
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.execute("INSERT INTO incident_archiving (active) VALUES (1)")
+        conn.executemany("DELETE FROM incidents WHERE id = ?", [(row[0],) for row in rows])
+        conn.executemany('''
+            INSERT INTO incident_archives (month, path, first_timestamp, last_timestamp, incident_count)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT (month) DO UPDATE SET
+                first_timestamp = excluded.first_timestamp,
+                last_timestamp = excluded.last_timestamp,
+                incident_count = excluded.incident_count
+        ''', catalog)
+        _save_ranges(conn, month_ranges)
+        conn.execute("DELETE FROM incident_archiving")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return len(rows)
+
+
+class IncidentArchiver:
+    """Background thread that keeps the hot incidents table small.
+
+    Every interval it archives expired incidents batch by batch, pausing
+    between batches so other writers get the lock in between.
+    """
+
+    def __init__(self, path=incident_db.DB_PATH, interval=ARCHIVE_INTERVAL, pause=ARCHIVE_PAUSE,
+                 **policy):
+        self.path = path
+        self.interval = interval
+        self.pause = pause
+        self.policy = policy
+        self.stopping = threading.Event()
+        self.thread = threading.Thread(target=self.run, name="incident-archiver", daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self, timeout=None):
+        self.stopping.set()
+        if self.thread.is_alive():
+            self.thread.join(timeout)
+
+    def run(self):
+        conn = incident_db.connect(self.path)
+        try:
+            try:
+                fill_ranges(conn)
+            except sqlite3.Error as e:
+                logger.error(f"Failed to catalog incident archive ranges: {str(e)}")
+            while not self.stopping.is_set():
+                moved = 0
+                try:
+                    while not self.stopping.is_set():
+                        batch = archive_batch(conn, **self.policy)
+                        if not batch:
+                            break
+                        moved += batch
+                        self.stopping.wait(self.pause)
+                except (sqlite3.Error, OSError) as e:
+                    logger.error(f"Incident archiving failed: {str(e)}")
+                if moved:
+                    logger.info(f"Archived {moved} incidents")
+                self.stopping.wait(self.interval)
+        finally:
+            conn.close()
+
+
+def archives_for_range(conn, since=None, until=None):
+    """(month, path, first, last) of the archives holding incidents in [since, until)"""
+    sql = "SELECT month, path, first_timestamp, last_timestamp FROM incident_archives"
+    where = []
+    params = []
+    if since:
+        where.append("last_timestamp >= ?")
+        params.append(since)
+    if until:
+        where.append("first_timestamp < ?")
+        params.append(until)
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    return conn.execute(sql + " ORDER BY month DESC", params).fetchall()
+
+
+# Read-only connections to archives, shared by every thread in the process;
+# each one is used under its own lock
+_readers = {}
+_readers_lock = threading.Lock()
+
+
+def _read_archive(path, sql, params):
+    with _readers_lock:
+        reader = _readers.get(path)
+        if reader is None:
+            if os.path.exists(path):
+                # Bring archives written by an older version up to the
+                # current columns before reading them with today's queries
+                open_archive(path).close()
+            conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+            conn.execute(f"PRAGMA busy_timeout = {incident_db.BUSY_TIMEOUT_MS}")
+            reader = _readers[path] = (conn, threading.Lock())
+    conn, lock = reader
+    with lock:
+        return conn.execute(sql, params).fetchall()
+
+
+def fill_ranges(conn):
+    """Catalog the severity ranges of archives written before they were kept"""
+    missing = conn.execute('''
+        SELECT month, path FROM incident_archives
+        WHERE month NOT IN (SELECT month FROM incident_archive_ranges)
+    ''').fetchall()
+    base = _database_dir(conn)
+    for month, path in missing:
+        ranges = _read_archive(os.path.join(base, path), RANGES_SQL, ())
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            _save_ranges(conn, [(month, *row) for row in ranges])
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+
+def archive_ranges(conn):
+    """month -> [(severity rank, first, last timestamp)] of the cataloged ranges"""
+    ranges = {}
+    for month, rank, first, last in conn.execute(
+            "SELECT month, severity_rank, first_timestamp, last_timestamp "
+            "FROM incident_archive_ranges"):
+        ranges.setdefault(month, []).append((rank, first, last))
+    return ranges
+
+
+def _in_archives(conn, ids, months):
+    catalog = dict(conn.execute("SELECT month, path FROM incident_archives"))
+    base = _database_dir(conn)
+    found = set()
+    for month in catalog if months is None else months & set(catalog):
+        marks = ", ".join("?" for _ in ids)
+        try:
+            found.update(row[0] for row in _read_archive(
+                os.path.join(base, catalog[month]),
+                f"SELECT id FROM incidents WHERE id IN ({marks})", list(ids)))
+        except sqlite3.Error as e:
+            logger.error(f"Failed to read incident archive {catalog[month]}: {str(e)}")
+    if found:
+        # A batch interrupted mid-archive can leave a row in both places;
+        # until the next pass finishes it, the hot copy is the live one
+        marks = ", ".join("?" for _ in found)
+        found -= {row[0] for row in conn.execute(
+            f"SELECT id FROM incidents WHERE id IN ({marks})", list(found))}
+    return found
+
+
+def archived_ids(conn, incidents):
+    """Ids of the (id, timestamp) incidents that live in an archive.
+
+    An incident is archived by the month of its timestamp, so each id is
+    looked up in that one archive.
+    """
+    incidents = list(incidents)
+    if not incidents:
+        return set()
+    return _in_archives(conn, [incident_id for incident_id, _ in incidents],
+                        {timestamp[:7] for _, timestamp in incidents})
+
+
+def is_archived(conn, incident_id):
+    """Whether an incident, known only by id, lives in one of the archives"""
+    return bool(_in_archives(conn, [incident_id], None))
+
+
+def _sort_key(keys):
+    def compare(a, b):
+        for x, y, (_, descending) in zip(a, b, keys):
+            if x != y:
+                return (-1 if x > y else 1) if descending else (-1 if x < y else 1)
+        return 0
+    return functools.cmp_to_key(compare)
+
+
+def _range_keys(keys):
+    """The leading sort keys an archive's ranges bound: severity and time"""
+    bounded = []
+    for column, descending in keys:
+        if column not in ("incidents.severity_rank", "incidents.timestamp"):
+            break
+        bounded.append((column, descending))
+    return bounded
+
+
+def _bounds(ranges, bounded):
+    """(earliest, latest) sort position of each (rank, first, last) range on
+    the bounded keys"""
+    order = _sort_key(bounded)
+    bounds = []
+    for rank, first, last in ranges:
+        values = {"incidents.severity_rank": (rank, rank), "incidents.timestamp": (first, last)}
+        bounds.append((order(tuple(values[column][descending] for column, descending in bounded)),
+                       order(tuple(values[column][not descending] for column, descending in bounded))))
+    return bounds
+
+
+def _could_hold(bounds, bounded, after, boundary):
+    """Whether rows within bounds can sort after the cursor and no later
+    than the boundary row, judged on the bounded keys"""
+    order = _sort_key(bounded)
+    width = len(bounded)
+    for earliest, latest in bounds:
+        if after is not None and latest < order(tuple(after[:width])):
+            continue
+        if boundary is not None and order(tuple(boundary[:width])) < earliest:
+            continue
+        return True
+    return False
+
+
+def query_page(conn, limit=100, after=None, **filters):
+    """incident_db.query_page over the hot table and the archives it reaches.
+
+    An archive is only opened when the since/until range overlaps it and
+    the severities and times it holds can sort between the cursor and the
+    last row this page can use, which for a full page is the page's last
+    row so far. Each source returns its own first limit+1 rows; the merge
+    keeps the first limit+1 overall.
+    """
+    archives = archives_for_range(conn, filters.get("since"), filters.get("until"))
+    if not archives:
+        return incident_db.query_page(conn, limit=limit, after=after, **filters)
+
+    fulltext = incident_db.has_fulltext(conn)
+    sql, params = incident_db.build_incident_query(fulltext=fulltext, after=after,
+                                                   with_keys=True, **filters)
+    sql += " LIMIT ?"
+    params.append(int(limit) + 1)
+    rows = conn.execute(sql, params).fetchall()
+
+    search = filters.get("search")
+    keys = incident_db.sort_keys(filters.get("sort", "newest"), filters.get("severity"),
+                                 bool(search and fulltext and incident_db.fulltext_query(search)))
+    key_count = len(keys)
+    sort_key = _sort_key(keys)
+    bounded = _range_keys(keys)
+    ranges = archive_ranges(conn)
+    severity = filters.get("severity")
+    ranks = (range(len(incident_db.SEVERITIES)) if severity in (None, "All")
+             else [incident_db.SEVERITY_RANK.get(severity, -1)])
+    candidates = []
+    for month, path, first, last in archives:
+        # Archives cataloged before ranges were kept may hold any severity
+        month_ranges = [entry for entry in ranges.get(month) or [(rank, first, last) for rank in ranks]
+                        if entry[0] in ranks]
+        if month_ranges:
+            candidates.append((path, _bounds(month_ranges, bounded) if bounded else None))
+    if bounded:
+        # The archive that can hold the first rows goes first, so the page
+        # fills up, and rules the others out, as early as possible
+        candidates.sort(key=lambda candidate: min(earliest for earliest, _ in candidate[1]))
+    base = _database_dir(conn)
+    for path, bounds in candidates:
+        boundary = rows[limit][-key_count:] if len(rows) > limit else None
+        if bounds is not None and not _could_hold(bounds, bounded, after, boundary):
+            continue
+        try:
+            rows.extend(_read_archive(os.path.join(base, path), sql, params))
+        except sqlite3.Error as e:
+            logger.error(f"Failed to read incident archive {path}: {str(e)}")
+            continue
+        rows.sort(key=lambda row: sort_key(row[-key_count:]))
+        # A batch interrupted mid-archive can leave a row in both places
+        seen = set()
+        rows = [row for row in rows if not (row[0] in seen or seen.add(row[0]))][:limit + 1]
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = tuple(rows[-1][-key_count:])
+    return [tuple(row[:-key_count]) for row in rows], next_cursor
@@ -0,0 +1,191 @@
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import Counter
+from datetime import datetime, timedelta
+from . import incident_db
+
+# Days of incidents held in memory
+CACHE_DAYS = 30
+# Incidents read per query while (re)loading
+LOAD_PAGE = 5000
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def to_seconds(timestamp):
+    """A stored timestamp as whole seconds since 1970, keeping its local time"""
+    return int((datetime.fromisoformat(timestamp) - _EPOCH).total_seconds())
+
+
+def from_seconds(seconds):
+    return (_EPOCH + timedelta(seconds=seconds)).strftime("%Y-%m-%d %H:%M:%S")
+
+
+class IncidentCache:
+    """The last CACHE_DAYS of incidents, column-wise, for in-memory filters and counts.
+
+    Ids and timestamps live in parallel arrays ordered by time, and severity
+    and status share one small integer code per incident, so a row costs
+    about 18 bytes instead of a tuple of strings. Counting reduces to
+    counting codes over the slice a bisect finds for the time range.
+
+    Every query first catches up with the store: through its change feed
+    that is one PRAGMA while nothing has changed, and only the incidents
+    that did change are re-read. Stores without a change log are reloaded
+    whenever their version moves. Safe to share between threads.
+    """
+
+    COLUMNS = ["id", "timestamp", "severity", "status"]
+
+    def __init__(self, store, days=CACHE_DAYS):
+        self.store = store
+        self.days = days
+        self.lock = threading.RLock()
+        self.ids = array("q")
+        self.seconds = array("q")
+        # severity rank << 8 | index into self.statuses
+        self.codes = array("H")
+        self.statuses = []
+        self.status_codes = {}
+        self.max_id = 0
+        self.feed = None
+        self.version = None
+        self.loaded = False
+
+    def _code(self, severity, status):
+        code = self.status_codes.get(status)
+        if code is None:
+            code = self.status_codes[status] = len(self.statuses)
+            self.statuses.append(status)
+        return incident_db.SEVERITY_RANK.get(severity, 0) << 8 | code
+
+    def _since(self, days):
+        return to_seconds(incident_db.now_timestamp()) - days * 86400
+
+    def _start(self, days):
+        if days is None:
+            return 0
+        if days > self.days:
+            raise ValueError(f"Only the last {self.days} days of incidents are cached")
+        return bisect_left(self.seconds, self._since(days))
+
+    def reload(self):
+        with self.lock:
+            if self.feed is None:
+                # Taken before reading, so nothing committed during the load
+                # is missed; changes it already saw are simply applied twice
+                self.feed = self.store.change_feed()
+            if self.feed is None:
+                self.version = self.store.version()[0]
+            self.ids = array("q")
+            self.seconds = array("q")
+            self.codes = array("H")
+            self.max_id = 0
+
+            since = from_seconds(self._since(self.days))
+            after = None
+            while True:
+                rows, after = self.store.query_page(limit=LOAD_PAGE, after=after, sort="oldest",
+                                                    columns=self.COLUMNS, since=since)
+                for incident_id, timestamp, severity, status in rows:
+                    self.ids.append(incident_id)
+                    self.seconds.append(to_seconds(timestamp))
+                    self.codes.append(self._code(severity, status))
+                    self.max_id = max(self.max_id, incident_id)
+                if after is None:
+                    break
+            self.loaded = True
+
+    def sync(self):
+        """Catch up with writes made since the last query, from any connection"""
+        with self.lock:
+            if not self.loaded:
+                self.reload()
+                return
+            if self.feed is not None:
+                batch = self.feed.poll()
+                if batch is not None:
+                    if batch.reset:
+                        self.reload()
+                        return
+                    self._apply(batch)
+            else:
+                version = self.store.version()[0]
+                if version != self.version:
+                    self.reload()
+                    return
+
+            # Drop what has aged out of the window
+            expired = bisect_left(self.seconds, self._since(self.days))
+            if expired:
+                del self.ids[:expired]
+                del self.seconds[:expired]
+                del self.codes[:expired]
+
+    def _remove(self, incident_id):
+        if incident_id > self.max_id:
+            return
+        try:
+            position = self.ids.index(incident_id)
+        except ValueError:
+            return
+        del self.ids[position]
+        del self.seconds[position]
+        del self.codes[position]
+
+    def _insert(self, incident_id, timestamp, severity, status):
+        seconds = to_seconds(timestamp)
+        position = bisect_right(self.seconds, seconds)
+        self.ids.insert(position, incident_id)
+        self.seconds.insert(position, seconds)
+        self.codes.insert(position, self._code(severity, status))
+        self.max_id = max(self.max_id, incident_id)
+
+    def _apply(self, batch):
+        for incident_id in batch.upserts | batch.deletes:
+            self._remove(incident_id)
+        if not batch.upserts:
+            return
+        rows, _ = self.store.query_page(ids=sorted(batch.upserts), limit=len(batch.upserts),
+                                        columns=self.COLUMNS,
+                                        since=from_seconds(self._since(self.days)))
+        for row in rows:
+            self._insert(*row)
+
+    def _matching_codes(self, severity=None, status=None):
+        """Codes present in the cache that pass the filters; None when unfiltered"""
+        if severity in (None, "All") and status is None:
+            return None
+        ranks = ([incident_db.SEVERITY_RANK.get(severity, -1)] if severity not in (None, "All")
+                 else range(len(incident_db.SEVERITIES)))
+        statuses = ([self.status_codes.get(status, -1)] if status is not None
+                    else range(len(self.statuses)))
+        return {rank << 8 | code for rank in ranks for code in statuses}
+
+    def counts(self, days=None, severity=None, status=None):
+        """{"total", "by_severity", "by_status"} for the last days, like get_stats"""
+        with self.lock:
+            self.sync()
+            start = self._start(days)
+            wanted = self._matching_codes(severity, status)
+            by_code = Counter(self.codes[start:])
+        stats = {
+            "total": 0,
+            "by_severity": {name: 0 for name in incident_db.SEVERITIES},
+            "by_status": {},
+        }
+        for code, count in by_code.items():
+            if wanted is not None and code not in wanted:
+                continue
+            stats["total"] += count
+            stats["by_severity"][incident_db.SEVERITIES[code >> 8]] += count
+            status_name = self.statuses[code & 0xFF]
+            stats["by_status"][status_name] = stats["by_status"].get(status_name, 0) + count
+        return stats
+
+    def close(self):
+        with self.lock:
+            if self.feed is not None:
+                self.feed.conn.close()
+                self.feed = None
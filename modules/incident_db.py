@@ -0,0 +1,1043 @@
+import os
+import queue
+import re
+import sqlite3
+from datetime import datetime, timedelta
+from loguru import logger
+
+DB_PATH = os.environ.get('INCIDENTS_DB', 'incidents.db')
+
+SEVERITIES = ["Low", "Medium", "High", "Critical"]
+SEVERITY_RANK = {severity: rank for rank, severity in enumerate(SEVERITIES)}
+
+# Incident lifecycle, in the order an incident normally moves through it
+STATUSES = ["New", "Acknowledged", "Contained", "Resolved"]
+# Statuses that end the lifecycle; reaching one is what MTTR measures
+CLOSED_STATUSES = ("Resolved", "Closed")
+
+# Days of transitions averaged into MTTA and MTTR
+RESPONSE_TIME_DAYS = 30
+
+# A finding that repeats within this many seconds of its last occurrence is
+# folded into the same open incident
+DEDUP_WINDOW_SECONDS = 3600
+
+INCIDENT_COLUMNS = ["id", "timestamp", "subject", "severity", "description", "status",
+                    "occurrences", "last_seen"]
+
+# Sort keys understood by query_incidents, as (column, descending) pairs.
+# Every order ends on a column backed by an index so SQLite never has to
+# sort the whole table in a temp b-tree, and on the id so the order is total
+# and can be resumed from a keyset cursor.
+SORT_KEYS = {
+    "newest": (("incidents.timestamp", True), ("incidents.id", True)),
+    "oldest": (("incidents.timestamp", False), ("incidents.id", False)),
+    "severity_desc": (("incidents.severity_rank", True), ("incidents.timestamp", True),
+                      ("incidents.id", True)),
+    "severity_asc": (("incidents.severity_rank", False), ("incidents.timestamp", False),
+                     ("incidents.id", False)),
+    "relevance": (("incidents_fts.rank", False), ("incidents.timestamp", True),
+                  ("incidents.id", True)),
+}
+
+# Labels used by the "Sort by" combo box in the Incident Log tab
+SORT_LABELS = {
+    "Time (Newest)": "newest",
+    "Time (Oldest)": "oldest",
+    "Severity (High-Low)": "severity_desc",
+    "Severity (Low-High)": "severity_asc",
+    "Relevance": "relevance",
+}
+
+SNIPPET_TOKENS = 16
+
+
+def _severity_rank_case(column):
+    whens = " ".join(f"WHEN '{severity}' THEN {rank}" for severity, rank in SEVERITY_RANK.items())
+    return f"CASE {column} {whens} ELSE 0 END"
+
+
+def _migrate_severity_rank(conn):
+    """Add the stored severity rank and the indexes used by the log view"""
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(incidents)")]
+    if "severity_rank" not in columns:
+        conn.execute("ALTER TABLE incidents ADD COLUMN severity_rank INTEGER")
+    conn.execute(f"UPDATE incidents SET severity_rank = {_severity_rank_case('severity')} "
+                 "WHERE severity_rank IS NULL")
+
+    # Writers that predate the column (or talk to the file directly) leave it
+    # NULL; fill it in so the rank index stays correct.
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS incidents_rank_ai AFTER INSERT ON incidents
+        WHEN NEW.severity_rank IS NULL
+        BEGIN
+            UPDATE incidents SET severity_rank = {_severity_rank_case('NEW.severity')}
+            WHERE id = NEW.id;
+        END
+    ''')
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS incidents_rank_au AFTER UPDATE OF severity ON incidents
+        BEGIN
+            UPDATE incidents SET severity_rank = {_severity_rank_case('NEW.severity')}
+            WHERE id = NEW.id;
+        END
+    ''')
+
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_incidents_timestamp ON incidents (timestamp, id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_incidents_severity ON incidents (severity, timestamp)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_incidents_severity_rank "
+                 "ON incidents (severity_rank, timestamp, id)")
+
+
+def _migrate_fulltext(conn):
+    """FTS5 shadow index over subject and description, kept in sync by triggers"""
+    try:
+        conn.execute('''
+            CREATE VIRTUAL TABLE IF NOT EXISTS incidents_fts USING fts5(
+                subject, description,
+                content='incidents', content_rowid='id',
+                tokenize='unicode61 remove_diacritics 2',
+                prefix='2 3'
+            )
+        ''')
+    except sqlite3.OperationalError as e:
+        # SQLite built without FTS5; searches fall back to LIKE
+        logger.warning(f"Full-text search unavailable: {str(e)}")
+        return
+
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS incidents_fts_ai AFTER INSERT ON incidents
+        BEGIN
+            INSERT INTO incidents_fts (rowid, subject, description)
+            VALUES (NEW.id, NEW.subject, NEW.description);
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS incidents_fts_ad AFTER DELETE ON incidents
+        BEGIN
+            INSERT INTO incidents_fts (incidents_fts, rowid, subject, description)
+            VALUES ('delete', OLD.id, OLD.subject, OLD.description);
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS incidents_fts_au AFTER UPDATE OF subject, description ON incidents
+        BEGIN
+            INSERT INTO incidents_fts (incidents_fts, rowid, subject, description)
+            VALUES ('delete', OLD.id, OLD.subject, OLD.description);
+            INSERT INTO incidents_fts (rowid, subject, description)
+            VALUES (NEW.id, NEW.subject, NEW.description);
+        END
+    ''')
+    conn.execute("INSERT INTO incidents_fts (incidents_fts) VALUES ('rebuild')")
+
+
+# Columns whose changes are worth telling viewers about
+TRACKED_COLUMNS = ["subject", "severity", "description", "timestamp", "status",
+                   "occurrences", "last_seen"]
+
+UNIX_NOW = "((julianday('now') - 2440587.5) * 86400.0)"
+
+
+def _change_log_triggers(conn):
+    # Recreated whenever TRACKED_COLUMNS grows
+    conn.execute("DROP TRIGGER IF EXISTS incident_changes_au")
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS incident_changes_ai AFTER INSERT ON incidents
+        BEGIN
+            INSERT INTO incident_changes (incident_id, op, changed_at)
+            VALUES (NEW.id, 'insert', {UNIX_NOW});
+        END
+    ''')
+    conn.execute(f'''
+        CREATE TRIGGER incident_changes_au AFTER UPDATE OF {', '.join(TRACKED_COLUMNS)} ON incidents
+        BEGIN
+            INSERT INTO incident_changes (incident_id, op, changed_at)
+            VALUES (NEW.id, 'update', {UNIX_NOW});
+        END
+    ''')
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS incident_changes_ad AFTER DELETE ON incidents
+        BEGIN
+            INSERT INTO incident_changes (incident_id, op, changed_at)
+            VALUES (OLD.id, 'delete', {UNIX_NOW});
+        END
+    ''')
+
+
+def _migrate_change_log(conn):
+    """Append-only log of incident writes, read by the change feeds"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS incident_changes (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            incident_id INTEGER NOT NULL,
+            op TEXT NOT NULL,
+            changed_at REAL NOT NULL
+        )
+    ''')
+    _change_log_triggers(conn)
+
+
+# Dimensions counted in incident_counts; the empty one is the grand total
+COUNT_DIMENSIONS = {"total": "''", "severity": "{row}.severity", "status": "{row}.status"}
+
+
+def _count_upsert(row, delta):
+    statements = []
+    for dimension, value in COUNT_DIMENSIONS.items():
+        value = value.format(row=row)
+        statements.append(
+            f"INSERT INTO incident_counts (dimension, value, count) "
+            f"VALUES ('{dimension}', {value}, {delta}) "
+            f"ON CONFLICT (dimension, value) DO UPDATE SET count = count + ({delta});"
+        )
+    return "\n".join(statements)
+
+
+def _migrate_counts(conn):
+    """Trigger-maintained counts by severity and status for the stats cards"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS incident_counts (
+            dimension TEXT NOT NULL,
+            value TEXT NOT NULL,
+            count INTEGER NOT NULL,
+            PRIMARY KEY (dimension, value)
+        ) WITHOUT ROWID
+    ''')
+    conn.execute("DELETE FROM incident_counts")
+    for dimension, value in COUNT_DIMENSIONS.items():
+        value = value.format(row="incidents")
+        conn.execute(f'''
+            INSERT INTO incident_counts (dimension, value, count)
+            SELECT '{dimension}', {value}, COUNT(*) FROM incidents GROUP BY {value}
+        ''')
+
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS incident_counts_ai AFTER INSERT ON incidents
+        BEGIN
+            {_count_upsert("NEW", 1)}
+        END
+    ''')
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS incident_counts_ad AFTER DELETE ON incidents
+        BEGIN
+            {_count_upsert("OLD", -1)}
+        END
+    ''')
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS incident_counts_au AFTER UPDATE OF severity, status ON incidents
+        BEGIN
+            {_count_upsert("OLD", -1)}
+            {_count_upsert("NEW", 1)}
+        END
+    ''')
+
+
+def _migrate_status_index(conn):
+    """Index for the web API's status filter"""
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_incidents_status ON incidents (status, timestamp)")
+
+
+def _migrate_bulk_load(conn):
+    """Let bulk inserts index full-text in one statement instead of per row"""
+    conn.execute("CREATE TABLE IF NOT EXISTS incident_bulk_load (active INTEGER NOT NULL)")
+    if not has_fulltext(conn):
+        return
+    # insert_incidents puts a row in incident_bulk_load for the length of its
+    # own transaction, so other connections never see the trigger skipped
+    conn.execute("DROP TRIGGER IF EXISTS incidents_fts_ai")
+    conn.execute('''
+        CREATE TRIGGER incidents_fts_ai AFTER INSERT ON incidents
+        WHEN NOT EXISTS (SELECT 1 FROM incident_bulk_load)
+        BEGIN
+            INSERT INTO incidents_fts (rowid, subject, description)
+            VALUES (NEW.id, NEW.subject, NEW.description);
+        END
+    ''')
+
+
+def _migrate_archive_catalog(conn):
+    """Catalog of the monthly archive databases old incidents are moved to"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS incident_archives (
+            month TEXT PRIMARY KEY,
+            path TEXT NOT NULL,
+            first_timestamp DATETIME NOT NULL,
+            last_timestamp DATETIME NOT NULL,
+            incident_count INTEGER NOT NULL
+        )
+    ''')
+    # Archived incidents still exist, just elsewhere: while the archiver
+    # holds a row in incident_archiving, deleting them from the hot table
+    # neither logs a change nor lowers the counts
+    conn.execute("CREATE TABLE IF NOT EXISTS incident_archiving (active INTEGER NOT NULL)")
+    conn.execute("DROP TRIGGER IF EXISTS incident_changes_ad")
+    conn.execute(f'''
+        CREATE TRIGGER incident_changes_ad AFTER DELETE ON incidents
+        WHEN NOT EXISTS (SELECT 1 FROM incident_archiving)
+        BEGIN
+            INSERT INTO incident_changes (incident_id, op, changed_at)
+            VALUES (OLD.id, 'delete', {UNIX_NOW});
+        END
+    ''')
+    conn.execute("DROP TRIGGER IF EXISTS incident_counts_ad")
+    conn.execute(f'''
+        CREATE TRIGGER incident_counts_ad AFTER DELETE ON incidents
+        WHEN NOT EXISTS (SELECT 1 FROM incident_archiving)
+        BEGIN
+            {_count_upsert("OLD", -1)}
+        END
+    ''')
+
+
+def _response_time_trigger(name, metric, first_reached):
+    # first_reached is a condition on an event's to_status; the trigger adds
+    # the time from the incident being raised to the first transition that
+    # satisfies it into that day's bucket
+    return f'''
+        CREATE TRIGGER IF NOT EXISTS {name} AFTER INSERT ON incident_events
+        WHEN NEW.from_status IS NOT NULL AND {first_reached.format(status="NEW.to_status")}
+            AND NOT EXISTS (
+                SELECT 1 FROM incident_events AS earlier
+                WHERE earlier.incident_id = NEW.incident_id AND earlier.id < NEW.id
+                    AND earlier.from_status IS NOT NULL
+                    AND {first_reached.format(status="earlier.to_status")}
+            )
+        BEGIN
+            INSERT INTO incident_response_times (metric, severity, day, count, total_seconds)
+            SELECT '{metric}', severity, date(NEW.changed_at), 1,
+                   MAX(0, (julianday(NEW.changed_at) - julianday(timestamp)) * 86400)
+            FROM incidents WHERE id = NEW.incident_id
+            ON CONFLICT (metric, severity, day) DO UPDATE SET
+                count = count + 1,
+                total_seconds = total_seconds + excluded.total_seconds;
+        END
+    '''
+
+
+def _migrate_incident_events(conn):
+    """Append-only status history, and daily MTTA/MTTR sums kept by triggers"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS incident_events (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            incident_id INTEGER NOT NULL,
+            from_status TEXT,
+            to_status TEXT NOT NULL,
+            changed_at DATETIME NOT NULL
+        )
+    ''')
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_incident_events_incident
+        ON incident_events (incident_id, id)
+    ''')
+    for action in ("UPDATE", "DELETE"):
+        conn.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS incident_events_no_{action.lower()}
+            BEFORE {action} ON incident_events
+            BEGIN
+                SELECT RAISE(ABORT, 'incident_events is append-only');
+            END
+        ''')
+
+    # Creation is recorded too, with no from_status, so every incident's
+    # history starts with the status it was raised in
+    conn.execute('''
+        INSERT INTO incident_events (incident_id, from_status, to_status, changed_at)
+        SELECT id, NULL, status, timestamp FROM incidents ORDER BY id
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS incident_events_ai AFTER INSERT ON incidents
+        WHEN NOT EXISTS (SELECT 1 FROM incident_bulk_load)
+        BEGIN
+            INSERT INTO incident_events (incident_id, from_status, to_status, changed_at)
+            VALUES (NEW.id, NULL, NEW.status, NEW.timestamp);
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS incident_events_au AFTER UPDATE OF status ON incidents
+        WHEN OLD.status IS NOT NEW.status
+        BEGIN
+            INSERT INTO incident_events (incident_id, from_status, to_status, changed_at)
+            VALUES (NEW.id, OLD.status, NEW.status, datetime('now', 'localtime'));
+        END
+    ''')
+
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS incident_response_times (
+            metric TEXT NOT NULL,
+            severity TEXT NOT NULL,
+            day TEXT NOT NULL,
+            count INTEGER NOT NULL,
+            total_seconds REAL NOT NULL,
+            PRIMARY KEY (metric, severity, day)
+        ) WITHOUT ROWID
+    ''')
+    closed = ", ".join(f"'{status}'" for status in CLOSED_STATUSES)
+    conn.execute(_response_time_trigger("incident_events_ack", "ack", "{status} != 'New'"))
+    conn.execute(_response_time_trigger("incident_events_resolve", "resolve",
+                                        "{status} IN (" + closed + ")"))
+
+
+def _migrate_fingerprints(conn):
+    """Fingerprint, occurrence count and last sighting for deduplicated findings.
+
+    The incident's timestamp is when the finding was first seen. Incidents
+    raised by hand have no fingerprint and are never folded together.
+    """
+    conn.execute("ALTER TABLE incidents ADD COLUMN fingerprint TEXT")
+    conn.execute("ALTER TABLE incidents ADD COLUMN occurrences INTEGER NOT NULL DEFAULT 1")
+    conn.execute("ALTER TABLE incidents ADD COLUMN last_seen DATETIME")
+    conn.execute("UPDATE incidents SET last_seen = timestamp")
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_incidents_fingerprint
+        ON incidents (fingerprint, last_seen) WHERE fingerprint IS NOT NULL
+    ''')
+    # Repeats only bump occurrences and last_seen; views need to hear of it
+    _change_log_triggers(conn)
+
+
+# Buckets in incident_rollups: the strftime format that turns a timestamp
+# into its bucket's label (which is also when the bucket starts), and the
+# width of one bucket
+ROLLUP_PERIODS = {
+    "hour": ("%Y-%m-%d %H:00:00", timedelta(hours=1)),
+    "day": ("%Y-%m-%d", timedelta(days=1)),
+}
+
+# Most buckets one timeseries query may return
+MAX_TIMESERIES_PERIODS = 2000
+
+
+def _rollup_upsert(row, delta):
+    statements = []
+    for granularity, (label, _) in ROLLUP_PERIODS.items():
+        period = f"strftime('{label}', {row}.timestamp)"
+        statements.append(
+            f"INSERT INTO incident_rollups (granularity, period, severity, count) "
+            f"VALUES ('{granularity}', {period}, {row}.severity, {delta}) "
+            f"ON CONFLICT (granularity, period, severity) DO UPDATE SET count = count + ({delta});"
+        )
+    return "\n".join(statements)
+
+
+def _rollup_select(granularity, where=""):
+    period = f"strftime('{ROLLUP_PERIODS[granularity][0]}', incidents.timestamp)"
+    return f'''
+        INSERT INTO incident_rollups (granularity, period, severity, count)
+        SELECT '{granularity}', {period}, severity, COUNT(*) FROM incidents {where}
+        GROUP BY 2, 3
+        ON CONFLICT (granularity, period, severity) DO UPDATE SET count = count + excluded.count
+    '''
+
+
+def _migrate_rollups(conn):
+    """Incidents raised per hour and per day by severity, kept by triggers.
+
+    Like incident_counts, the rollups keep archived incidents; they are
+    only backfilled from the hot table, so history that was archived before
+    this migration is not in them.
+    """
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS incident_rollups (
+            granularity TEXT NOT NULL,
+            period TEXT NOT NULL,
+            severity TEXT NOT NULL,
+            count INTEGER NOT NULL,
+            PRIMARY KEY (granularity, period, severity)
+        ) WITHOUT ROWID
+    ''')
+    conn.execute("DELETE FROM incident_rollups")
+    for granularity in ROLLUP_PERIODS:
+        conn.execute(_rollup_select(granularity, "WHERE true"))
+
+    # insert_incidents rolls up its whole id range in one statement instead
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS incident_rollups_ai AFTER INSERT ON incidents
+        WHEN NOT EXISTS (SELECT 1 FROM incident_bulk_load)
+        BEGIN
+            {_rollup_upsert("NEW", 1)}
+        END
+    ''')
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS incident_rollups_ad AFTER DELETE ON incidents
+        WHEN NOT EXISTS (SELECT 1 FROM incident_archiving)
+        BEGIN
+            {_rollup_upsert("OLD", -1)}
+        END
+    ''')
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS incident_rollups_au AFTER UPDATE OF severity, timestamp ON incidents
+        WHEN OLD.severity IS NOT NEW.severity OR OLD.timestamp IS NOT NEW.timestamp
+        BEGIN
+            {_rollup_upsert("OLD", -1)}
+            {_rollup_upsert("NEW", 1)}
+        END
+    ''')
+
+
+def _migrate_archive_ranges(conn):
+    """First and last timestamp of each severity in each monthly archive.
+
+    Lets a page sorted by severity skip the archives that cannot hold one
+    of its rows. Filled in by the archiver; archives without ranges yet
+    are read as if they held every severity.
+    """
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS incident_archive_ranges (
+            month TEXT NOT NULL,
+            severity_rank INTEGER NOT NULL,
+            first_timestamp DATETIME NOT NULL,
+            last_timestamp DATETIME NOT NULL,
+            PRIMARY KEY (month, severity_rank)
+        ) WITHOUT ROWID
+    ''')
+
+
+def _migrate_incident_logs(conn):
+    """Free-text incident log lines, as written by the buffered log writer"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS incident_logs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            incident TEXT NOT NULL,
+            logged_at DATETIME NOT NULL
+        )
+    ''')
+
+
+# Schema migrations, applied in order. PRAGMA user_version records how many
+# of them an incidents.db file has already seen, so existing databases are
+# upgraded in place the first time a newer version of the app opens them.
+MIGRATIONS = [
+    _migrate_severity_rank,
+    _migrate_fulltext,
+    _migrate_change_log,
+    _migrate_counts,
+    _migrate_status_index,
+    _migrate_bulk_load,
+    _migrate_archive_catalog,
+    _migrate_incident_events,
+    _migrate_fingerprints,
+    _migrate_rollups,
+    _migrate_archive_ranges,
+    _migrate_incident_logs,
+]
+
+
+def ensure_schema(conn):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS incidents (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            subject TEXT NOT NULL,
+            severity TEXT NOT NULL,
+            description TEXT NOT NULL,
+            timestamp DATETIME NOT NULL,
+            status TEXT NOT NULL
+        )
+    ''')
+    conn.commit()
+
+    if conn.execute("PRAGMA user_version").fetchone()[0] >= len(MIGRATIONS):
+        return
+
+    # The GUI and the web demo may open the same file at once; take the write
+    # lock before re-reading the version so each migration runs exactly once.
+    while True:
+        conn.execute("BEGIN IMMEDIATE")
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        if version >= len(MIGRATIONS):
+            conn.commit()
+            return
+        migration = MIGRATIONS[version]
+        try:
+            migration(conn)
+            conn.execute(f"PRAGMA user_version = {version + 1}")
+            conn.commit()
+            logger.info(f"Applied incidents.db migration {version + 1}: {migration.__name__}")
+        except sqlite3.Error as e:
+            conn.rollback()
+            logger.error(f"Migration {version + 1} ({migration.__name__}) failed: {str(e)}")
+            raise
+
+
+# How long a connection waits on another writer's lock before giving up
+BUSY_TIMEOUT_MS = 5000
+
+
+def configure_connection(conn):
+    # WAL lets readers keep going while a write commits. With WAL,
+    # synchronous=NORMAL can lose the last commits on power loss but never
+    # corrupts the database, and skips an fsync per transaction.
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("PRAGMA synchronous = NORMAL")
+    conn.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+    conn.execute("PRAGMA foreign_keys = ON")
+
+
+def connect(path=DB_PATH, check_same_thread=True):
+    conn = sqlite3.connect(path, check_same_thread=check_same_thread)
+    configure_connection(conn)
+    ensure_schema(conn)
+    return conn
+
+
+class ConnectionPool:
+    """Reusable connections for a multi-threaded server.
+
+    A connection is borrowed for one request and handed back afterwards, so
+    requests skip the open and the pragmas, and the statements prepared on a
+    connection stay cached for the next request that borrows it. warmup, if
+    given, is called with each new connection to prepare the hot statements
+    before it serves anything.
+    """
+
+    def __init__(self, path=DB_PATH, max_idle=8, warmup=None):
+        self.path = path
+        self.warmup = warmup
+        # LIFO so the most recently used, warmest connections go out first
+        self.idle = queue.LifoQueue(maxsize=max_idle)
+        connect(path).close()
+
+    def _open(self):
+        conn = sqlite3.connect(self.path, check_same_thread=False, cached_statements=256)
+        configure_connection(conn)
+        if self.warmup:
+            self.warmup(conn)
+        return conn
+
+    def acquire(self):
+        try:
+            return self.idle.get_nowait()
+        except queue.Empty:
+            return self._open()
+
+    def release(self, conn):
+        if conn.in_transaction:
+            conn.rollback()
+        try:
+            self.idle.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+    def close(self):
+        while True:
+            try:
+                self.idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+def insert_log_entries(conn, entries):
+    """Append (text, logged_at) incident log lines in one transaction"""
+    conn.executemany("INSERT INTO incident_logs (incident, logged_at) VALUES (?, ?)", entries)
+    conn.commit()
+
+
+def query_log_page(conn, limit=100, after=None):
+    """Incident log lines newest first, as ((id, logged_at, text) rows, next_cursor)"""
+    sql = "SELECT id, logged_at, incident FROM incident_logs"
+    params = []
+    if after is not None:
+        sql += " WHERE id < ?"
+        params.append(after[0])
+    rows = conn.execute(sql + " ORDER BY id DESC LIMIT ?", params + [int(limit) + 1]).fetchall()
+    if len(rows) > limit:
+        return rows[:limit], (rows[limit - 1][0],)
+    return rows, None
+
+
+def now_timestamp():
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+
+def insert_incident(conn, subject, severity, description, timestamp=None, status="New"):
+    timestamp = timestamp or now_timestamp()
+    cursor = conn.execute('''
+        INSERT INTO incidents (subject, severity, severity_rank, description, timestamp, status,
+                               last_seen)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    ''', (subject, severity, SEVERITY_RANK.get(severity, 0), description, timestamp, status,
+          timestamp))
+    return cursor.lastrowid
+
+
+def record_occurrence(conn, fingerprint, subject, severity, description, seen_at=None,
+                      window=DEDUP_WINDOW_SECONDS, incident_id=None):
+    """Fold a sighting of a finding into its open incident, or raise a new one.
+
+    A sighting folds into the incident with the same fingerprint if that is
+    still open and was last seen at most window seconds earlier, so a
+    finding that keeps recurring stays one incident for as long as it does.
+    incident_id is the caller's guess at that incident, which saves the
+    fingerprint lookup when it is right. Returns (incident_id, created).
+    """
+    seen_at = seen_at or now_timestamp()
+    since = (datetime.strptime(seen_at, "%Y-%m-%d %H:%M:%S")
+             - timedelta(seconds=window)).strftime("%Y-%m-%d %H:%M:%S")
+    still_open = (f"fingerprint = ? AND last_seen >= ? "
+                  f"AND status NOT IN ({', '.join('?' for _ in CLOSED_STATUSES)})")
+    params = (fingerprint, since, *CLOSED_STATUSES)
+    bump = ("UPDATE incidents SET occurrences = occurrences + 1, "
+            "last_seen = MAX(last_seen, ?) WHERE id = ?")
+
+    if incident_id is not None:
+        cursor = conn.execute(f"{bump} AND {still_open}", (seen_at, incident_id, *params))
+        if cursor.rowcount:
+            return incident_id, False
+    row = conn.execute(
+        f"SELECT id FROM incidents WHERE {still_open} ORDER BY last_seen DESC LIMIT 1",
+        params).fetchone()
+    if row is not None:
+        conn.execute(bump, (seen_at, row[0]))
+        return row[0], False
+
+    cursor = conn.execute('''
+        INSERT INTO incidents (subject, severity, severity_rank, description, timestamp, status,
+                               fingerprint, last_seen)
+        VALUES (?, ?, ?, ?, ?, 'New', ?, ?)
+    ''', (subject, severity, SEVERITY_RANK.get(severity, 0), description, seen_at,
+          fingerprint, seen_at))
+    return cursor.lastrowid, True
+
+
+def validate_incident(data):
+    """Check one incident submitted through the API; returns insert_incidents' tuple"""
+    if not isinstance(data, dict):
+        raise ValueError("incident must be a JSON object")
+    values = []
+    for field in ("subject", "description"):
+        value = data.get(field)
+        if not isinstance(value, str) or not value.strip():
+            raise ValueError(f"{field} is required")
+        values.append(value.strip())
+    severity = data.get("severity")
+    if severity not in SEVERITY_RANK:
+        raise ValueError(f"severity must be one of {', '.join(SEVERITIES)}")
+
+    timestamp = data.get("timestamp")
+    if timestamp is not None:
+        try:
+            timestamp = datetime.fromisoformat(str(timestamp)).strftime("%Y-%m-%d %H:%M:%S")
+        except ValueError:
+            raise ValueError("timestamp must be an ISO 8601 date or time")
+    return (values[0], severity, values[1], timestamp)
+
+
+def insert_incidents(conn, incidents, status="New"):
+    """Insert (subject, severity, description, timestamp) tuples in one transaction.
+
+    Returns the new ids in input order. The rows go in through a single
+    executemany while holding the write lock, so AUTOINCREMENT hands out a
+    contiguous id range ending at last_insert_rowid(). That range is then
+    full-text indexed, given its creation events and rolled up with one
+    INSERT ... SELECT each, which is several times cheaper than the per-row
+    triggers.
+    """
+    if not incidents:
+        return []
+    default_timestamp = now_timestamp()
+    rows = [(subject, severity, SEVERITY_RANK.get(severity, 0), description,
+             timestamp or default_timestamp, status, timestamp or default_timestamp)
+            for subject, severity, description, timestamp in incidents]
+    fulltext = has_fulltext(conn)
+
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.execute("INSERT INTO incident_bulk_load (active) VALUES (1)")
+        conn.executemany('''
+            INSERT INTO incidents (subject, severity, severity_rank, description, timestamp, status,
+                                   last_seen)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', rows)
+        last_id = conn.execute("SELECT last_insert_rowid()").fetchone()[0]
+        first_id = last_id - len(rows) + 1
+        if fulltext:
+            conn.execute('''
+                INSERT INTO incidents_fts (rowid, subject, description)
+                SELECT id, subject, description FROM incidents WHERE id BETWEEN ? AND ?
+            ''', (first_id, last_id))
+        conn.execute('''
+            INSERT INTO incident_events (incident_id, from_status, to_status, changed_at)
+            SELECT id, NULL, status, timestamp FROM incidents WHERE id BETWEEN ? AND ?
+        ''', (first_id, last_id))
+        for granularity in ROLLUP_PERIODS:
+            conn.execute(_rollup_select(granularity, "WHERE id BETWEEN ? AND ?"),
+                         (first_id, last_id))
+        conn.execute("DELETE FROM incident_bulk_load")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return list(range(first_id, last_id + 1))
+
+
+def set_status(conn, incident_id, status):
+    """Move an incident to another lifecycle status; False if nothing changed.
+
+    The transition is recorded in incident_events by a trigger, which also
+    folds it into the response time sums.
+    """
+    if status not in STATUSES and status not in CLOSED_STATUSES:
+        raise ValueError(f"status must be one of {', '.join(STATUSES)}")
+    cursor = conn.execute(
+        "UPDATE incidents SET status = ? WHERE id = ? AND status != ?",
+        (status, incident_id, status))
+    return cursor.rowcount > 0
+
+
+def get_response_times(conn, days=RESPONSE_TIME_DAYS, today=None):
+    """Mean time to acknowledge and to resolve, in seconds, over recent days.
+
+    Returns {"mtta": {...}, "mttr": {...}}, each keyed by severity plus
+    "all", with None where nothing was acknowledged or resolved. Reads at
+    most one pre-summed row per day, metric and severity.
+    """
+    today = today or datetime.now().date()
+    since = (today - timedelta(days=days - 1)).isoformat()
+    times = {}
+    for metric, name in (("ack", "mtta"), ("resolve", "mttr")):
+        sums = {severity: [0, 0.0] for severity in SEVERITIES + ["all"]}
+        for severity, count, total in conn.execute('''
+                SELECT severity, SUM(count), SUM(total_seconds) FROM incident_response_times
+                WHERE metric = ? AND day >= ? GROUP BY severity
+                ''', (metric, since)):
+            for key in (severity, "all"):
+                sums.setdefault(key, [0, 0.0])
+                sums[key][0] += count
+                sums[key][1] += total
+        times[name] = {key: (total / count if count else None)
+                       for key, (count, total) in sums.items()}
+    return times
+
+
+def timeseries_periods(granularity, since, until=None):
+    """Labels of the hour or day buckets that overlap [since, until), oldest first.
+
+    since and until are timestamps as stored; until defaults to now.
+    """
+    if granularity not in ROLLUP_PERIODS:
+        raise ValueError(f"granularity must be one of {', '.join(ROLLUP_PERIODS)}")
+    label, width = ROLLUP_PERIODS[granularity]
+    try:
+        until = datetime.fromisoformat(until) if until else datetime.now()
+        start = datetime.fromisoformat(datetime.fromisoformat(since).strftime(label))
+    except (TypeError, ValueError):
+        raise ValueError("since and until must be ISO 8601 dates or times")
+    if (until - start) / width > MAX_TIMESERIES_PERIODS:
+        raise ValueError(f"at most {MAX_TIMESERIES_PERIODS} {granularity}s can be charted at once")
+    periods = []
+    while start < until:
+        periods.append(start.strftime(label))
+        start += width
+    return periods
+
+
+def timeseries_since(granularity, periods, until=None):
+    """since for a range of periods buckets ending with the one until (default: now) is in"""
+    end = datetime.fromisoformat(until) if until else datetime.now()
+    width = ROLLUP_PERIODS[granularity][1]
+    return (end - width * (periods - 1)).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def fill_timeseries(periods, rows, severity=None):
+    """{severity: [count per period]} from (period, severity, count) rows, zeros included"""
+    severities = [severity] if severity else SEVERITIES
+    series = {name: [0] * len(periods) for name in severities}
+    positions = {period: position for position, period in enumerate(periods)}
+    for period, name, count in rows:
+        position = positions.get(period)
+        if position is not None and name in series:
+            series[name][position] += count
+    return series
+
+
+def get_timeseries(conn, granularity, since, until=None, severity=None):
+    """Incidents raised per hour or day and severity, from incident_rollups.
+
+    Returns (periods, series) as timeseries_periods and fill_timeseries do.
+    Buckets are whole hours or days, so the first one may start before
+    since. Reads one pre-aggregated row per bucket and severity.
+    """
+    periods = timeseries_periods(granularity, since, until)
+    if not periods:
+        return periods, fill_timeseries(periods, [], severity)
+    sql = '''
+        SELECT period, severity, count FROM incident_rollups
+        WHERE granularity = ? AND period BETWEEN ? AND ? AND count != 0
+    '''
+    params = [granularity, periods[0], periods[-1]]
+    if severity:
+        sql += " AND severity = ?"
+        params.append(severity)
+    return periods, fill_timeseries(periods, conn.execute(sql, params), severity)
+
+
+def get_stats(conn):
+    """Incident counts by severity and status plus the latest timestamp.
+
+    Reads the few rows of incident_counts and one end of the timestamp
+    index, so the cost does not grow with the number of incidents.
+    """
+    stats = {
+        "total": 0,
+        "by_severity": {severity: 0 for severity in SEVERITIES},
+        "by_status": {},
+    }
+    for dimension, value, count in conn.execute(
+            "SELECT dimension, value, count FROM incident_counts WHERE count != 0"):
+        if dimension == "total":
+            stats["total"] = count
+        else:
+            stats[f"by_{dimension}"][value] = count
+    # Counts include archived incidents, and so does the latest timestamp
+    stats["latest"] = conn.execute('''
+        SELECT MAX(latest) FROM (
+            SELECT MAX(timestamp) AS latest FROM incidents
+            UNION ALL SELECT MAX(last_timestamp) FROM incident_archives
+        )
+    ''').fetchone()[0]
+    return stats
+
+
+def has_fulltext(conn):
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'incidents_fts'"
+    ).fetchone() is not None
+
+
+def fulltext_query(search):
+    """Turn search box text into an FTS5 MATCH expression.
+
+    Every word becomes a quoted prefix term, so "chrom mem" matches
+    "chrome.exe high memory usage" and user input is never parsed as
+    FTS5 operators.
+    """
+    terms = re.findall(r"\w+", search)
+    return " ".join('"' + term.replace('"', '""') + '"*' for term in terms)
+
+
+def sort_keys(sort, severity=None, fulltext_match=True):
+    if sort not in SORT_KEYS:
+        raise ValueError(f"Unknown sort order: {sort}")
+    if sort == "relevance" and not fulltext_match:
+        sort = "newest"
+    keys = SORT_KEYS[sort]
+    if severity and severity != "All" and keys[0][0] == "incidents.severity_rank":
+        # With a severity filter the rank is constant, so the severity sorts
+        # reduce to plain time order and can walk idx_incidents_severity
+        keys = keys[1:]
+    return keys
+
+
+def _keyset_condition(keys, after):
+    """WHERE clause selecting the rows that sort after the cursor values"""
+    if len({descending for _, descending in keys}) == 1:
+        op = "<" if keys[0][1] else ">"
+        columns = ", ".join(column for column, _ in keys)
+        marks = ", ".join("?" for _ in keys)
+        return f"({columns}) {op} ({marks})", list(after)
+
+    # Mixed directions cannot use a row value comparison; expand it into
+    # (k1 > v1) OR (k1 = v1 AND k2 < v2) OR ...
+    clauses = []
+    params = []
+    for i, (column, descending) in enumerate(keys):
+        terms = [f"{prior} = ?" for prior, _ in keys[:i]]
+        terms.append(f"{column} {'<' if descending else '>'} ?")
+        clauses.append("(" + " AND ".join(terms) + ")")
+        params.extend(after[:i + 1])
+    return "(" + " OR ".join(clauses) + ")", params
+
+
+def build_incident_query(columns=INCIDENT_COLUMNS, severity=None, search=None, sort="newest",
+                         fulltext=True, highlight=None, after=None, with_keys=False, ids=None,
+                         status=None, since=None, until=None):
+    """Build the SELECT for the incident log; returns (sql, params).
+
+    With fulltext the search goes through incidents_fts, and if highlight
+    is an (open, close) marker pair a snippet column is added to each row.
+    with_keys appends the sort key values, which is what a keyset cursor
+    (after) is made of. ids restricts the query to the given incidents,
+    since/until to timestamps in [since, until).
+    """
+    select = [f"incidents.{column}" for column in columns]
+    source = "incidents"
+    select_params = []
+    where = []
+    params = []
+
+    match = fulltext_query(search) if search and fulltext else ""
+    if match:
+        source = "incidents_fts JOIN incidents ON incidents.id = incidents_fts.rowid"
+        where.append("incidents_fts MATCH ?")
+        params.append(match)
+        if highlight:
+            select.append(f"snippet(incidents_fts, -1, ?, ?, '…', {SNIPPET_TOKENS})")
+            select_params.extend(highlight)
+    elif search:
+        # LIKE is case-insensitive for ASCII, same as the old lower() check
+        pattern = "%" + search.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        where.append("(incidents.subject LIKE ? ESCAPE '\\' OR incidents.description LIKE ? ESCAPE '\\')")
+        params.extend([pattern, pattern])
+
+    if severity and severity != "All":
+        where.append("incidents.severity = ?")
+        params.append(severity)
+    if status:
+        where.append("incidents.status = ?")
+        params.append(status)
+    if since:
+        where.append("incidents.timestamp >= ?")
+        params.append(since)
+    if until:
+        where.append("incidents.timestamp < ?")
+        params.append(until)
+    if ids is not None:
+        where.append(f"incidents.id IN ({', '.join('?' for _ in ids)})")
+        params.extend(ids)
+
+    keys = sort_keys(sort, severity, bool(match))
+    if with_keys:
+        select.extend(column for column, _ in keys)
+    if after is not None:
+        condition, condition_params = _keyset_condition(keys, after)
+        where.append(condition)
+        params.extend(condition_params)
+
+    order_by = ", ".join(f"{column} {'DESC' if descending else 'ASC'}" for column, descending in keys)
+
+    sql = f"SELECT {', '.join(select)} FROM {source}"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += f" ORDER BY {order_by}"
+    return sql, select_params + params
+
+
+def query_incidents(conn, limit=None, **filters):
+    """Run build_incident_query; filters are its keyword arguments"""
+    sql, params = build_incident_query(fulltext=has_fulltext(conn), **filters)
+    if limit is not None:
+        sql += " LIMIT ?"
+        params.append(int(limit))
+    return conn.execute(sql, params).fetchall()
+
+
+def query_page(conn, limit=100, after=None, **filters):
+    """Fetch one page of the incident log; returns (rows, next_cursor).
+
+    next_cursor is None on the last page. Otherwise pass it back as after to
+    get the following page; each page is an index seek, so its cost does not
+    depend on how deep into the log it is.
+    """
+    fulltext = has_fulltext(conn)
+    sql, params = build_incident_query(fulltext=fulltext, after=after, with_keys=True, **filters)
+    sql += " LIMIT ?"
+    params.append(int(limit) + 1)
+    rows = conn.execute(sql, params).fetchall()
+
+    search = filters.get("search")
+    key_count = len(sort_keys(filters.get("sort", "newest"), filters.get("severity"),
+                              bool(search and fulltext and fulltext_query(search))))
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = tuple(rows[-1][-key_count:])
+    return [tuple(row[:-key_count]) for row in rows], next_cursor
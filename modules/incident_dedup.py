@@ -0,0 +1,69 @@
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+from loguru import logger
+from . import incident_db
+
+# Fingerprints remembered in memory; older ones fall back to the database
+MAX_REMEMBERED = 10000
+
+
+def _normalize(part):
+    return re.sub(r"\s+", " ", str(part).strip().lower())
+
+
+def fingerprint(source, rule, entity):
+    """Stable hash of what a finding is about, ignoring case and spacing.
+
+    source is what raised it (e.g. "threat_scan"), rule the check that
+    fired and entity what it fired on, such as a process name or a remote
+    address. Measurements like the memory in use belong in the description,
+    not here, or every sighting would look new.
+    """
+    key = "\x1f".join(_normalize(part) for part in (source, rule, entity))
+    return hashlib.blake2b(key.encode(), digest_size=16).hexdigest()
+
+
+class IncidentDeduplicator:
+    """Folds repeated findings into one incident per fingerprint.
+
+    Sightings go to the store's writer as record_occurrence, which bumps
+    the open incident's occurrence count and last_seen or raises a new
+    incident once the previous one is closed or has been quiet for longer
+    than window seconds. The fingerprint -> incident id map kept here lets
+    the writer update that incident by id; the database stays the source of
+    truth, so a stale or missing entry only costs a lookup there.
+    """
+
+    def __init__(self, store, window=incident_db.DEDUP_WINDOW_SECONDS,
+                 max_remembered=MAX_REMEMBERED):
+        self.store = store
+        self.window = window
+        self.max_remembered = max_remembered
+        self.incidents = OrderedDict()
+        self.lock = threading.Lock()
+
+    def record(self, source, rule, entity, severity, subject, description, seen_at=None):
+        """Queue one sighting; the Future holds (incident_id, created)"""
+        key = fingerprint(source, rule, entity)
+        with self.lock:
+            incident_id = self.incidents.get(key)
+        future = self.store.submit("record_occurrence", key, subject, severity, description,
+                                   seen_at or incident_db.now_timestamp(), self.window,
+                                   incident_id)
+        future.add_done_callback(lambda done: self._remember(key, done))
+        return future
+
+    def _remember(self, key, future):
+        if future.cancelled():
+            return
+        if future.exception() is not None:
+            logger.error(f"Failed to record finding: {str(future.exception())}")
+            return
+        incident_id, _ = future.result()
+        with self.lock:
+            self.incidents[key] = incident_id
+            self.incidents.move_to_end(key)
+            while len(self.incidents) > self.max_remembered:
+                self.incidents.popitem(last=False)
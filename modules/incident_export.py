@@ -0,0 +1,96 @@
+import csv
+import io
+import json
+import os
+import zlib
+from . import incident_db
+
+EXPORT_FORMATS = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+EXPORT_COLUMNS = incident_db.INCIDENT_COLUMNS
+# Incidents read per page; memory use is bounded by this, not the export size
+EXPORT_CHUNK = 1000
+
+
+def iter_incident_pages(store, chunk_size=EXPORT_CHUNK, **filters):
+    """Every incident matching filters, a keyset page at a time.
+
+    Each page is its own short query, so a long download never holds a
+    read transaction open (which would stop SQLite checkpointing the WAL)
+    or a pooled connection for its whole duration.
+    """
+    after = None
+    while True:
+        rows, after = store.query_page(limit=chunk_size, after=after, columns=EXPORT_COLUMNS,
+                                       **filters)
+        if rows:
+            yield rows
+        if after is None:
+            return
+
+
+def _csv_pieces(pages):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    for rows in pages:
+        writer.writerows(rows)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        # Only the header, for an export with no incidents
+        yield buffer.getvalue()
+
+
+def _ndjson_pieces(pages):
+    for rows in pages:
+        yield "".join(json.dumps(dict(zip(EXPORT_COLUMNS, row))) + "\n" for row in rows)
+
+
+def export_chunks(store, export_format="csv", compress=False, chunk_size=EXPORT_CHUNK, **filters):
+    """Yield an export of the incidents matching filters as bytes, a page at a time.
+
+    With compress the output is a gzip file, compressed as it is produced.
+    """
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"format must be one of {', '.join(EXPORT_FORMATS)}")
+    pages = iter_incident_pages(store, chunk_size, **filters)
+    pieces = _csv_pieces(pages) if export_format == "csv" else _ndjson_pieces(pages)
+    # wbits=31 writes a gzip header and trailer around the deflate stream
+    compressor = zlib.compressobj(wbits=31) if compress else None
+    for piece in pieces:
+        data = piece.encode()
+        if compressor is not None:
+            data = compressor.compress(data)
+        if data:
+            yield data
+    if compressor is not None:
+        yield compressor.flush()
+
+
+def format_for_path(path):
+    """(export_format, compress) implied by a file name such as incidents.ndjson.gz"""
+    name = path.lower()
+    compress = name.endswith(".gz")
+    if compress:
+        name = name[:-3]
+    return ("ndjson" if name.endswith((".ndjson", ".jsonl")) else "csv"), compress
+
+
+def export_to_file(store, path, export_format=None, compress=None, **filters):
+    """Write an export to path; the file only appears once it is complete"""
+    guessed_format, guessed_compress = format_for_path(path)
+    export_format = export_format or guessed_format
+    compress = guessed_compress if compress is None else compress
+    partial = path + ".part"
+    try:
+        with open(partial, "wb") as output:
+            for data in export_chunks(store, export_format, compress, **filters):
+                output.write(data)
+        os.replace(partial, path)
+    finally:
+        if os.path.exists(partial):
+            os.remove(partial)
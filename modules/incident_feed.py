@@ -0,0 +1,127 @@
+import sqlite3
+import threading
+from collections import namedtuple
+from loguru import logger
+
+# Net effect of the writes seen by one poll. upserts and deletes are sets of
+# incident ids; reset means the feed fell behind the pruned change log, or
+# too far behind to read in one go, and the reader has to reload from scratch.
+ChangeBatch = namedtuple("ChangeBatch", ["upserts", "deletes", "reset", "last_seq"])
+
+# How many change log entries to keep around for readers that fall behind
+CHANGE_LOG_RETENTION = 10000
+# Change log entries written between prunes while a store is open
+PRUNE_INTERVAL = 1000
+# Most change log entries one poll reads; past that it reports a reset
+MAX_POLL_CHANGES = 5000
+
+
+def latest_seq(conn):
+    return conn.execute("SELECT COALESCE(MAX(seq), 0) FROM incident_changes").fetchone()[0]
+
+
+def store_version(conn):
+    """(seq, changed_at) of the newest write; (0, None) for an untouched store.
+
+    Any write to the incidents table moves seq, so it works as a version
+    number for caches and HTTP validators.
+    """
+    row = conn.execute(
+        "SELECT seq, changed_at FROM incident_changes ORDER BY seq DESC LIMIT 1").fetchone()
+    return (row[0], row[1]) if row else (0, None)
+
+
+def prune_changes(conn, keep=CHANGE_LOG_RETENTION):
+    conn.execute("DELETE FROM incident_changes WHERE seq <= ?", (latest_seq(conn) - keep,))
+    conn.commit()
+
+
+class ChangeLogPruner:
+    """Keeps the change log at about CHANGE_LOG_RETENTION entries.
+
+    Writers call after_write() with the connection that just committed;
+    once PRUNE_INTERVAL entries have been added since the last prune, it
+    drops the old ones. Checking costs one MAX(seq) on the primary key. A
+    prune that fails, say on a busy database, waits for the next interval
+    rather than failing the write that triggered it.
+    """
+
+    def __init__(self, interval=PRUNE_INTERVAL, keep=CHANGE_LOG_RETENTION):
+        self.interval = interval
+        self.keep = keep
+        self.pruned_at = None
+        self.lock = threading.Lock()
+
+    def after_write(self, conn):
+        seq = latest_seq(conn)
+        with self.lock:
+            if self.pruned_at is not None and seq - self.pruned_at < self.interval:
+                return
+            self.pruned_at = seq
+        try:
+            prune_changes(conn, self.keep)
+        except sqlite3.Error as e:
+            if conn.in_transaction:
+                conn.rollback()
+            logger.warning(f"Failed to prune the incident change log: {str(e)}")
+
+
+def read_changes(conn, after_seq, limit=None):
+    """Change log entries after after_seq, as (seq, incident_id, op, changed_at) rows"""
+    sql = "SELECT seq, incident_id, op, changed_at FROM incident_changes WHERE seq > ? ORDER BY seq"
+    params = [after_seq]
+    if limit is not None:
+        sql += " LIMIT ?"
+        params.append(int(limit))
+    return conn.execute(sql, params).fetchall()
+
+
+def changes_pruned_since(conn, after_seq):
+    oldest = conn.execute("SELECT MIN(seq) FROM incident_changes").fetchone()[0]
+    return oldest is not None and oldest > after_seq + 1
+
+
+class IncidentChangeFeed:
+    """Tells a reader which incidents changed since it last looked.
+
+    PRAGMA data_version only moves when another connection commits, so an
+    idle poll costs one pragma and no table access. The reader's own writes
+    do not move it; poll with force=True after committing on this connection.
+    """
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.last_seq = latest_seq(conn)
+        self.data_version = self._data_version()
+
+    def _data_version(self):
+        return self.conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def poll(self, force=False):
+        """Return a ChangeBatch, or None when nothing changed"""
+        version = self._data_version()
+        if not force and version == self.data_version:
+            return None
+        self.data_version = version
+
+        rows = read_changes(self.conn, self.last_seq, limit=MAX_POLL_CHANGES + 1)
+        if not rows:
+            return None
+        if len(rows) > MAX_POLL_CHANGES:
+            # A bulk load or a long pause; reloading is cheaper than
+            # replaying the backlog, and it is never held in memory
+            self.last_seq = latest_seq(self.conn)
+            return ChangeBatch(set(), set(), True, self.last_seq)
+
+        reset = changes_pruned_since(self.conn, self.last_seq)
+        upserts = set()
+        deletes = set()
+        for seq, incident_id, op, _ in rows:
+            if op == "delete":
+                upserts.discard(incident_id)
+                deletes.add(incident_id)
+            else:
+                deletes.discard(incident_id)
+                upserts.add(incident_id)
+        self.last_seq = rows[-1][0]
+        return ChangeBatch(upserts, deletes, reset, self.last_seq)
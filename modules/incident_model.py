@@ -0,0 +1,417 @@
+from bisect import bisect_right
+from collections import OrderedDict
+from itertools import accumulate
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex, QTimer, QVariant
+from PyQt5.QtGui import QColor
+from loguru import logger
+from . import incident_db
+from .incident_store import IncidentStoreError
+
+SEVERITY_COLORS = {
+    "Critical": QColor("red"),
+    "High": QColor("orange"),
+    "Medium": QColor("yellow"),
+    "Low": QColor("green"),
+}
+
+SNIPPET_MARKERS = ("«", "»")
+
+# data() role telling whether a row is archived, and so read-only
+ARCHIVED_ROLE = Qt.UserRole + 1
+ARCHIVED_COLOR = QColor("gray")
+
+# Above this many changed incidents a full reload is cheaper than patching
+MAX_INCREMENTAL_CHANGES = 500
+
+# Pages whose rows stay in memory: the ones the view read most recently
+MAX_LOADED_PAGES = 8
+
+# Header sections that can be sorted by clicking, mapped to the SQL sort
+# used for (ascending, descending)
+HEADER_SORTS = {
+    0: ("oldest", "newest"),
+    2: ("severity_asc", "severity_desc"),
+}
+
+
+class Page:
+    """One page of the log: the cursor it starts after, its row count, and
+    its rows while they are loaded (None once dropped), with the ids of
+    the archived ones"""
+
+    __slots__ = ("number", "start", "count", "rows", "archived")
+
+    def __init__(self, number, start, rows, archived=frozenset()):
+        self.number = number
+        self.start = start
+        self.count = len(rows)
+        self.rows = rows
+        self.archived = archived
+
+
+class IncidentTableModel(QAbstractTableModel):
+    """Incident log rows, paged in from an IncidentStore as the view scrolls.
+
+    Only the max_pages pages read most recently hold their rows, which
+    are the ones around the viewport; the others keep just their keyset
+    cursor and row count, and are read again when the view comes back to
+    them. Memory therefore stays the same however far the log is
+    scrolled. Filtering and sorting are done by re-querying, never by
+    touching the loaded rows.
+    """
+
+    HEADERS = ["Time", "Subject", "Severity", "Description", "Status"]
+    COLUMNS = ["id", "timestamp", "subject", "severity", "description", "status",
+               "occurrences", "last_seen"]
+
+    def __init__(self, store, page_size=200, max_pages=MAX_LOADED_PAGES, parent=None):
+        super().__init__(parent)
+        self.store = store
+        self.page_size = page_size
+        self.max_pages = max_pages
+        self.severity = None
+        self.search = None
+        self.sort_order = "newest"
+        self.reset_pages()
+
+    def reset_pages(self):
+        self.pages = []
+        # Pages holding their rows, least recently read first
+        self.loaded = OrderedDict()
+        # id -> Page, for the loaded rows only
+        self.by_id = {}
+        # Position of each page's first row; None until needed again
+        self.offsets = None
+        self.total = 0
+        self.cursor = None
+        self.exhausted = False
+        self.reconcile_pending = False
+
+    def set_query(self, severity=None, search=None, sort="newest"):
+        self.severity = severity
+        self.search = search
+        self.sort_order = sort
+        self.refresh()
+
+    def refresh(self):
+        self.beginResetModel()
+        self.reset_pages()
+        self.endResetModel()
+        # Load the first page now so callers see data right away; the view
+        # asks for the rest through canFetchMore/fetchMore
+        self.fetchMore(QModelIndex())
+
+    def sort_known(self):
+        # Relevance order is only known to FTS5
+        return not (self.sort_order == "relevance" and self.search)
+
+    def sort_key(self, row):
+        keys = incident_db.sort_keys(self.sort_order, self.severity, fulltext_match=False)
+        values = {
+            "incidents.timestamp": row[1],
+            "incidents.id": row[0],
+            "incidents.severity_rank": incident_db.SEVERITY_RANK.get(row[3], 0),
+        }
+        return tuple(values[column] for column, _ in keys)
+
+    def sorts_before(self, key, other):
+        descending = incident_db.sort_keys(self.sort_order, self.severity, fulltext_match=False)[0][1]
+        return key > other if descending else key < other
+
+    def query(self, after, limit, **filters):
+        return self.store.query_page(
+            columns=self.COLUMNS,
+            severity=self.severity,
+            search=self.search,
+            sort=self.sort_order,
+            highlight=SNIPPET_MARKERS,
+            after=after,
+            limit=limit,
+            **filters,
+        )
+
+    # Positions, pages and the loaded window
+
+    def page_offsets(self):
+        if self.offsets is None:
+            self.offsets = list(accumulate((page.count for page in self.pages[:-1]), initial=0))
+        return self.offsets
+
+    def locate(self, position):
+        """(page, offset in it) of a row position"""
+        number = bisect_right(self.page_offsets(), position) - 1
+        return self.pages[number], position - self.offsets[number]
+
+    def page_end(self, page):
+        """Cursor of the last row a page can hold, or None if it is unbounded"""
+        if page.number + 1 < len(self.pages):
+            return self.pages[page.number + 1].start
+        return self.cursor
+
+    def page_for_key(self, key):
+        """The page a row with this sort key belongs in, or None if that is
+        past what has been fetched so far"""
+        low, high = 0, len(self.pages)
+        while low < high:
+            middle = (low + high) // 2
+            start = self.pages[middle].start
+            if start is None or self.sorts_before(start, key):
+                low = middle + 1
+            else:
+                high = middle
+        if low == 0:
+            return None
+        page = self.pages[low - 1]
+        end = self.page_end(page)
+        if page.number == len(self.pages) - 1 and end is not None and self.sorts_before(end, key):
+            return None
+        return page
+
+    def resize_page(self, page, count, position):
+        """Set a page's row count, announcing the rows added or removed at position"""
+        growing = count > page.count
+        if growing:
+            self.beginInsertRows(QModelIndex(), position, position + count - page.count - 1)
+        else:
+            self.beginRemoveRows(QModelIndex(), position, position + page.count - count - 1)
+        self.total += count - page.count
+        page.count = count
+        self.offsets = None
+        if growing:
+            self.endInsertRows()
+        else:
+            self.endRemoveRows()
+
+    def touch(self, page):
+        self.loaded[page] = None
+        self.loaded.move_to_end(page)
+        while len(self.loaded) > self.max_pages:
+            dropped, _ = self.loaded.popitem(last=False)
+            for row in dropped.rows:
+                self.by_id.pop(row[0], None)
+            dropped.rows = None
+            dropped.archived = frozenset()
+
+    def archived_in(self, rows):
+        """Ids of the rows that come from an archive"""
+        try:
+            return self.store.archived_ids((row[0], row[1]) for row in rows)
+        except IncidentStoreError as e:
+            logger.error(f"Failed to look up archived incidents: {str(e)}")
+            return frozenset()
+
+    def load(self, page):
+        """Read a dropped page again, from its start cursor to the next page's.
+
+        Incidents added to or removed from it meanwhile change its length;
+        the rows are not added or removed here, since the view may be
+        painting, but on the next pass of the event loop.
+        """
+        end = self.page_end(page)
+        rows = []
+        after = page.start
+        limit = page.count
+        while True:
+            chunk, after = self.query(after, max(limit, 1))
+            rows += chunk
+            if (after is None or not self.sort_known()
+                    or (end is not None and not self.sorts_before(after, end))):
+                break
+            limit = self.page_size
+        if end is not None and self.sort_known():
+            rows = [row for row in rows if not self.sorts_before(end, self.sort_key(row))]
+        page.rows = rows
+        page.archived = self.archived_in(rows)
+        for row in rows:
+            self.by_id[row[0]] = page
+        if len(rows) != page.count and not self.reconcile_pending:
+            self.reconcile_pending = True
+            QTimer.singleShot(0, self.reconcile)
+
+    def reconcile(self):
+        """Match the row counts of pages read again to what they hold now"""
+        self.reconcile_pending = False
+        for page in list(self.loaded):
+            if page.rows is not None and len(page.rows) != page.count:
+                offset = self.page_offsets()[page.number] + min(page.count, len(page.rows))
+                self.resize_page(page, len(page.rows), offset)
+
+    def row_at(self, position):
+        """(row, archived) at a position, or None while it cannot be read"""
+        page, offset = self.locate(position)
+        if page.rows is None:
+            try:
+                self.load(page)
+            except IncidentStoreError as e:
+                logger.error(f"Failed to fetch incidents: {str(e)}")
+                return None
+        self.touch(page)
+        if offset >= len(page.rows):
+            return None
+        row = page.rows[offset]
+        return row, row[0] in page.archived
+
+    # Following the change feed
+
+    def row_for_id(self, incident_id):
+        """(page, offset in it) of a loaded incident, or None"""
+        page = self.by_id.get(incident_id)
+        if page is None:
+            return None
+        for offset, row in enumerate(page.rows):
+            if row[0] == incident_id:
+                return page, offset
+        return None
+
+    def remove_row(self, page, offset):
+        position = self.page_offsets()[page.number] + offset
+        self.beginRemoveRows(QModelIndex(), position, position)
+        self.by_id.pop(page.rows[offset][0], None)
+        del page.rows[offset]
+        page.count -= 1
+        self.total -= 1
+        self.offsets = None
+        self.endRemoveRows()
+
+    def insert_sorted(self, row):
+        if not self.pages:
+            self.pages.append(Page(0, None, []))
+            self.touch(self.pages[0])
+        key = self.sort_key(row)
+        page = self.page_for_key(key)
+        if page is None or page.rows is None:
+            # Past the keyset cursor, where the next page picks it up, or in
+            # a dropped page, which reads it when it is loaded again
+            return
+        for offset, loaded in enumerate(page.rows):
+            if self.sorts_before(key, self.sort_key(loaded)):
+                break
+        else:
+            offset = len(page.rows)
+        position = self.page_offsets()[page.number] + offset
+        self.beginInsertRows(QModelIndex(), position, position)
+        page.rows.insert(offset, row)
+        page.count += 1
+        self.total += 1
+        self.offsets = None
+        self.by_id[row[0]] = page
+        self.endInsertRows()
+
+    def apply_changes(self, batch):
+        """Patch the loaded rows with a ChangeBatch from the change feed"""
+        dropped = len(self.loaded) < len(self.pages)
+        if (batch.reset or len(batch.upserts) + len(batch.deletes) > MAX_INCREMENTAL_CHANGES
+                or (not self.sort_known() and (batch.upserts or (batch.deletes and dropped)))):
+            # Relevance order also cannot tell where a dropped page ends
+            self.refresh()
+            return
+
+        # Deleted incidents in dropped pages are gone when they are read again
+        for incident_id in batch.deletes:
+            found = self.row_for_id(incident_id)
+            if found is not None:
+                self.remove_row(*found)
+
+        if not batch.upserts:
+            return
+        # Re-read the changed incidents through the current filters; ones
+        # that no longer match simply do not come back
+        matching, _ = self.query(None, len(batch.upserts), ids=sorted(batch.upserts))
+        matching = {row[0]: row for row in matching}
+
+        for incident_id in batch.upserts:
+            found = self.row_for_id(incident_id)
+            row = matching.get(incident_id)
+            if found is not None:
+                page, offset = found
+                if row is not None and self.sort_key(row) == self.sort_key(page.rows[offset]):
+                    page.rows[offset] = row
+                    position = self.page_offsets()[page.number] + offset
+                    self.dataChanged.emit(self.index(position, 0),
+                                          self.index(position, self.columnCount() - 1))
+                    continue
+                self.remove_row(page, offset)
+            if row is not None:
+                self.insert_sorted(row)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self.total
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and not self.exhausted
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or self.exhausted:
+            return
+        start = self.cursor
+        try:
+            rows, cursor = self.query(start, self.page_size)
+        except IncidentStoreError as e:
+            logger.error(f"Failed to fetch incidents: {str(e)}")
+            self.exhausted = True
+            return
+
+        self.cursor = cursor
+        self.exhausted = cursor is None
+        if not rows:
+            return
+        page = Page(len(self.pages), start, rows, self.archived_in(rows))
+        self.beginInsertRows(QModelIndex(), self.total, self.total + len(rows) - 1)
+        self.pages.append(page)
+        self.total += len(rows)
+        self.offsets = None
+        for row in rows:
+            self.by_id[row[0]] = page
+        self.endInsertRows()
+        self.touch(page)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return QVariant()
+        entry = self.row_at(index.row())
+        if entry is None:
+            return QVariant()
+        row, archived = entry
+        column = index.column()
+
+        if role == Qt.DisplayRole:
+            if column == 3 and len(row) > len(self.COLUMNS):
+                # Full-text match: show the highlighted snippet instead of
+                # the start of the description
+                return row[-1]
+            if column == 1 and row[6] > 1:
+                # A finding seen more than once is still one incident
+                return f"{row[2]} (×{row[6]})"
+            if column == 4 and archived:
+                return f"{row[5]} (archived)"
+            return row[column + 1]
+        if role == Qt.ForegroundRole and column == 2:
+            return SEVERITY_COLORS.get(row[3], SEVERITY_COLORS["Low"])
+        if role == Qt.ForegroundRole and archived:
+            return ARCHIVED_COLOR
+        if role == Qt.ToolTipRole and column == 3:
+            return row[4]
+        if role == Qt.ToolTipRole and column == 1 and row[6] > 1:
+            return f"Seen {row[6]} times, first at {row[1]}, last at {row[7]}"
+        if role == Qt.ToolTipRole and column == 4 and archived:
+            return "Archived incidents are read-only"
+        if role == Qt.UserRole:
+            return row[0]
+        if role == ARCHIVED_ROLE:
+            return archived
+        return QVariant()
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.HEADERS[section]
+        return QVariant()
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        if column not in HEADER_SORTS:
+            return
+        ascending, descending = HEADER_SORTS[column]
+        self.set_query(self.severity, self.search,
+                       descending if order == Qt.DescendingOrder else ascending)
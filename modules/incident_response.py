@@ -1,20 +1,73 @@
 import sqlite3
+import threading
 from datetime import datetime
 from PyQt5.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QComboBox, QTextEdit, 
-    QMessageBox, QTreeWidget, QTreeWidgetItem, QTabWidget,
-    QLineEdit
+    QMessageBox, QTableView, QAbstractItemView, QHeaderView, QTabWidget,
+    QLineEdit, QFileDialog
 )
-from PyQt5.QtCore import Qt, QTimer
+from PyQt5.QtCore import Qt, QTimer, QObject, pyqtSignal
 from PyQt5.QtGui import QColor
 from loguru import logger
 from .gui_components import (StyledLabel, StyledButton, StyledGroupBox, 
                            DataCard, COLORS)
+from . import incident_db
+from .incident_model import IncidentTableModel, HEADER_SORTS, ARCHIVED_ROLE
+from .incident_archive import IncidentArchiver
+from .incident_export import export_to_file
+from .incident_cache import IncidentCache
+from .incident_trends import TrendChart, TREND_RANGES, week_over_week
+from .incident_store import get_store, SQLiteIncidentStore, IncidentStoreError
+
+class WriteSignals(QObject):
+    """Carries background-thread results back to the GUI thread"""
+    # (future, subject, severity) once an incident save has finished
+    incident_saved = pyqtSignal(object, str, str)
+    # (future, incident id, status) once a status change has finished
+    status_changed = pyqtSignal(object, int, str)
+    # (path, error or None) once an export has been written
+    export_finished = pyqtSignal(str, object)
+    # [(label, counts)] from the in-memory cache, or None if counting failed
+    recent_counted = pyqtSignal(object)
+    # (response times, timeseries, week over week), or None if loading failed
+    trends_loaded = pyqtSignal(object)
+
+# Windows counted from the in-memory cache for the total card's tooltip
+RECENT_WINDOWS = (("Last 24 hours", 1), ("Last 7 days", 7), ("Last 30 days", 30))
+
+def format_duration(seconds):
+    if seconds is None:
+        return "N/A"
+    minutes = int(seconds // 60)
+    if minutes < 60:
+        return f"{minutes}m"
+    if minutes < 24 * 60:
+        return f"{minutes // 60}h {minutes % 60}m"
+    return f"{minutes // (24 * 60)}d {minutes // 60 % 24}h"
 
 class IncidentResponseModule(QWidget):
     def __init__(self):
         super().__init__()
+        self.write_signals = WriteSignals()
+        self.write_signals.incident_saved.connect(self.on_incident_saved)
+        self.write_signals.status_changed.connect(self.on_status_changed)
+        self.write_signals.export_finished.connect(self.on_export_finished)
+        self.write_signals.recent_counted.connect(self.on_recent_counted)
+        self.write_signals.trends_loaded.connect(self.on_trends_loaded)
+        self.change_feed = None
+        self.cache = None
+        # A count of recent incidents is running, and whether another is due
+        self.counting_recent = False
+        self.recount_recent = False
+        # The same for response times and trends
+        self.loading_trends = False
+        self.reload_trends = False
         self.setup_database()
+        # Moves expired and closed incidents out to the monthly archives
+        self.archiver = None
+        if isinstance(self.store, SQLiteIncidentStore):
+            self.archiver = IncidentArchiver(self.store.path)
+            self.archiver.start()
         self.setup_ui()
         self.incident_count = 0
         self.critical_count = 0
@@ -22,23 +75,22 @@ class IncidentResponseModule(QWidget):
         
     def setup_database(self):
         try:
-            # Connect to database with proper settings for persistence
-            self.conn = sqlite3.connect('incidents.db', check_same_thread=False)
-            self.conn.execute("PRAGMA foreign_keys = ON")
-            self.cursor = self.conn.cursor()
-            
-            # Create incidents table if it doesn't exist
-            self.cursor.execute('''
-                CREATE TABLE IF NOT EXISTS incidents (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    subject TEXT NOT NULL,
-                    severity TEXT NOT NULL,
-                    description TEXT NOT NULL,
-                    timestamp DATETIME NOT NULL,
-                    status TEXT NOT NULL
-                )
-            ''')
-            self.conn.commit()
+            # Opening the store creates the schema and migrates older
+            # incidents.db files; all reads and writes go through it
+            self.store = get_store()
+            if self.change_feed is not None:
+                self.change_feed.conn.close()
+            # None when the backend has no change log; the log is then only
+            # refreshed on demand
+            self.change_feed = self.store.change_feed()
+            # Recent incidents held in memory for the stats tooltips
+            if self.cache is not None:
+                self.cache.close()
+            self.cache = IncidentCache(self.store)
+            threading.Thread(target=self.cache.sync, name="incident-cache-load",
+                             daemon=True).start()
+            if hasattr(self, 'log_model'):
+                self.log_model.store = self.store
             logger.info("Database setup completed successfully")
         except Exception as e:
             logger.error(f"Database setup failed: {str(e)}")
@@ -59,7 +111,8 @@ class IncidentResponseModule(QWidget):
         self.total_incidents_card = DataCard("Total Incidents", "0")
         self.critical_incidents_card = DataCard("Critical Incidents", "0")
         self.last_incident_card = DataCard("Last Incident", "Never")
-        self.response_time_card = DataCard("Avg Response Time", "N/A")
+        # Mean time to acknowledge / to resolve over the last 30 days
+        self.response_time_card = DataCard("Avg Response (MTTA / MTTR)", "N/A")
         
         for card in [self.total_incidents_card, self.critical_incidents_card, 
                     self.last_incident_card, self.response_time_card]:
@@ -90,7 +143,10 @@ class IncidentResponseModule(QWidget):
         
         # Incident Log Tab
         self.tabs.addTab(self.create_incident_log_tab(), "Incident Log")
-        
+
+        # Trends Tab
+        self.tabs.addTab(self.create_trends_tab(), "Trends")
+
         layout.addWidget(self.tabs)
         self.setLayout(layout)
         
@@ -131,7 +187,7 @@ class IncidentResponseModule(QWidget):
         
         # Severity Selection
         self.severity_combo = QComboBox()
-        self.severity_combo.addItems(["Low", "Medium", "High", "Critical"])
+        self.severity_combo.addItems(incident_db.SEVERITIES)
         self.severity_combo.setStyleSheet("""
             QComboBox {
                 background-color: #1E1E1E;
@@ -262,7 +318,7 @@ class IncidentResponseModule(QWidget):
         # Sort Order
         sort_label = StyledLabel("Sort by:")
         self.sort_filter = QComboBox()
-        self.sort_filter.addItems(["Time (Newest)", "Time (Oldest)", "Severity (High-Low)", "Severity (Low-High)"])
+        self.sort_filter.addItems(list(incident_db.SORT_LABELS))
         self.sort_filter.setStyleSheet("""
             QComboBox {
                 background-color: #1E1E1E;
@@ -283,24 +339,34 @@ class IncidentResponseModule(QWidget):
         
         layout.addLayout(filter_layout)
         
-        # Incident Log Tree
-        self.log_tree = QTreeWidget()
-        self.log_tree.setHeaderLabels(["Time", "Subject", "Severity", "Description", "Status"])
-        self.log_tree.setAlternatingRowColors(True)
-        self.log_tree.setStyleSheet("""
-            QTreeWidget {
+        # Incident Log Table; rows are paged in from SQLite as it scrolls
+        self.log_model = IncidentTableModel(self.store)
+        self.log_view = QTableView()
+        self.log_view.setModel(self.log_model)
+        self.log_view.setAlternatingRowColors(True)
+        self.log_view.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.log_view.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.log_view.setWordWrap(False)
+        self.log_view.verticalHeader().setVisible(False)
+        # Fixed row height so the view never measures rows it has not drawn
+        self.log_view.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.log_view.verticalHeader().setDefaultSectionSize(28)
+        self.log_view.horizontalHeader().setStretchLastSection(True)
+        self.log_view.horizontalHeader().setSortIndicator(0, Qt.DescendingOrder)
+        self.log_view.setSortingEnabled(True)
+        self.log_view.setStyleSheet("""
+            QTableView {
                 background-color: #1E1E1E;
+                alternate-background-color: #262626;
                 color: white;
                 border: 1px solid #333333;
                 border-radius: 5px;
+                gridline-color: #333333;
             }
-            QTreeWidget::item {
+            QTableView::item {
                 padding: 5px;
             }
-            QTreeWidget::item:alternate {
-                background-color: #262626;
-            }
-            QTreeWidget::item:selected {
+            QTableView::item:selected {
                 background-color: #007AFF;
             }
             QHeaderView::section {
@@ -310,25 +376,79 @@ class IncidentResponseModule(QWidget):
                 border: none;
             }
         """)
-        self.log_tree.setColumnWidth(0, 150)  # Time
-        self.log_tree.setColumnWidth(1, 250)  # Subject
-        self.log_tree.setColumnWidth(2, 100)  # Severity
-        self.log_tree.setColumnWidth(3, 300)  # Description
-        
-        layout.addWidget(self.log_tree)
-        
-        # Refresh button
+        self.log_view.setColumnWidth(0, 150)  # Time
+        self.log_view.setColumnWidth(1, 250)  # Subject
+        self.log_view.setColumnWidth(2, 100)  # Severity
+        self.log_view.setColumnWidth(3, 300)  # Description
+        
+        layout.addWidget(self.log_view)
+        
+        # Status change and refresh buttons
+        actions_layout = QHBoxLayout()
+        actions_layout.addWidget(StyledLabel("Set status:"))
+        self.status_combo = QComboBox()
+        self.status_combo.addItems(incident_db.STATUSES)
+        self.status_combo.setStyleSheet(self.severity_filter.styleSheet())
+        actions_layout.addWidget(self.status_combo)
+        set_status_button = StyledButton("Set Status")
+        set_status_button.clicked.connect(self.change_status)
+        actions_layout.addWidget(set_status_button)
+
+        self.export_button = StyledButton("Export...")
+        self.export_button.clicked.connect(self.export_incidents)
+        actions_layout.addWidget(self.export_button)
+
         refresh_button = StyledButton("Refresh Log")
         refresh_button.clicked.connect(self.refresh_incident_data)
-        layout.addWidget(refresh_button)
+        actions_layout.addWidget(refresh_button)
+        layout.addLayout(actions_layout)
         
         tab.setLayout(layout)
         return tab
-        
+
+    def create_trends_tab(self):
+        tab = QWidget()
+        layout = QVBoxLayout()
+
+        range_layout = QHBoxLayout()
+        range_label = StyledLabel("Show:")
+        self.trend_range = QComboBox()
+        self.trend_range.addItems(list(TREND_RANGES))
+        self.trend_range.setStyleSheet("""
+            QComboBox {
+                background-color: #1E1E1E;
+                color: white;
+                border: 1px solid #333333;
+                border-radius: 4px;
+                padding: 5px;
+                min-width: 180px;
+            }
+        """)
+        self.trend_range.currentTextChanged.connect(self.update_trends)
+        range_layout.addWidget(range_label)
+        range_layout.addWidget(self.trend_range)
+        range_layout.addStretch()
+        # Critical incidents raised in the last 7 days against the 7 before
+        self.week_label = StyledLabel("")
+        range_layout.addWidget(self.week_label)
+        layout.addLayout(range_layout)
+
+        self.trend_chart = TrendChart()
+        layout.addWidget(self.trend_chart, 1)
+
+        tab.setLayout(layout)
+        return tab
+
     def setup_auto_refresh(self):
+        # Cheap when idle: a poll is one PRAGMA unless another connection
+        # (e.g. the web demo) has committed since the last one
         self.refresh_timer = QTimer()
-        self.refresh_timer.timeout.connect(self.refresh_incident_data)
-        self.refresh_timer.start(30000)  # Refresh every 30 seconds
+        self.refresh_timer.timeout.connect(self.poll_changes)
+        self.refresh_timer.start(1000)  # Check for changes every second
+        # The chart's range moves with the clock even when nothing changes
+        self.trend_timer = QTimer()
+        self.trend_timer.timeout.connect(self.update_trends)
+        self.trend_timer.start(60000)
         
     def save_incident(self):
         subject = self.subject_input.text().strip()
@@ -345,40 +465,97 @@ class IncidentResponseModule(QWidget):
                               "Please provide an incident description.")
             return
 
-        try:
-            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            logger.info(f"Attempting to save incident - Subject: {subject}, Severity: {severity}")
-            
-            # Check if database connection is valid
-            if not self.conn:
-                raise Exception("Database connection is not initialized")
-                
-            self.cursor.execute('''
-                INSERT INTO incidents (subject, severity, description, timestamp, status)
-                VALUES (?, ?, ?, ?, ?)
-            ''', (subject, severity, description, timestamp, "New"))
-            
-            # Verify the insert was successful
-            if self.cursor.rowcount == 0:
-                raise Exception("No rows were inserted")
-                
-            self.conn.commit()
-            logger.info("Incident saved successfully")
-            
-            self.log_message(f"New incident logged: {subject} - {severity}")
-            self.clear_form()
-            self.refresh_incident_data()
-            
-        except sqlite3.Error as e:
-            error_msg = f"SQLite error occurred: {str(e)}"
-            logger.error(error_msg)
-            QMessageBox.critical(self, "Database Error", 
-                               f"Failed to save incident: {error_msg}")
-        except Exception as e:
-            error_msg = f"Failed to save incident: {str(e)}"
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        logger.info(f"Attempting to save incident - Subject: {subject}, Severity: {severity}")
+        self.save_button.setEnabled(False)
+        # The insert and commit happen on the store's writer thread; the
+        # result comes back through a queued signal so the GUI never waits
+        # on the disk
+        future = self.store.submit("insert_incident", subject, severity, description, timestamp)
+        future.add_done_callback(
+            lambda done: self.write_signals.incident_saved.emit(done, subject, severity))
+
+    def on_incident_saved(self, future, subject, severity):
+        self.save_button.setEnabled(True)
+        error = future.exception()
+        if error is not None:
+            if isinstance(error, (sqlite3.Error, IncidentStoreError)):
+                error_msg = f"SQLite error occurred: {str(error)}"
+                message = f"Failed to save incident: {error_msg}"
+            else:
+                error_msg = message = f"Failed to save incident: {str(error)}"
             logger.error(error_msg)
-            QMessageBox.critical(self, "Database Error", error_msg)
-            
+            QMessageBox.critical(self, "Database Error", message)
+            return
+
+        logger.info(f"Incident {future.result()} saved successfully")
+        self.log_message(f"New incident logged: {subject} - {severity}")
+        self.clear_form()
+        self.poll_changes()
+
+    def change_status(self):
+        """Move the selected incidents in the log to the chosen status"""
+        status = self.status_combo.currentText()
+        selected = self.log_view.selectionModel().selectedRows()
+        if not selected:
+            QMessageBox.information(self, "No Incident Selected",
+                                  "Select one or more incidents in the log first.")
+            return
+        ids = [index.data(Qt.UserRole) for index in selected if not index.data(ARCHIVED_ROLE)]
+        if len(ids) < len(selected):
+            self.log_message(f"Skipped {len(selected) - len(ids)} archived incident(s); "
+                             "archived incidents are read-only", "warning")
+        for incident_id in ids:
+            future = self.store.submit("set_status", incident_id, status)
+            future.add_done_callback(
+                lambda done, incident_id=incident_id:
+                    self.write_signals.status_changed.emit(done, incident_id, status))
+
+    def on_status_changed(self, future, incident_id, status):
+        error = future.exception()
+        if error is not None:
+            self.log_message(f"Failed to set incident {incident_id} to {status}: {str(error)}", "error")
+            return
+        if future.result():
+            self.log_message(f"Incident {incident_id} moved to {status}")
+            self.poll_changes()
+
+    def export_incidents(self):
+        """Write the incidents matching the log's filters to a file"""
+        path, _ = QFileDialog.getSaveFileName(
+            self, "Export Incidents", f"incidents-{datetime.now().strftime('%Y%m%d')}.csv",
+            "CSV (*.csv);;NDJSON (*.ndjson);;Compressed CSV (*.csv.gz);;"
+            "Compressed NDJSON (*.ndjson.gz)")
+        if not path:
+            return
+        filters = {
+            "severity": self.log_model.severity,
+            "search": self.log_model.search,
+            "sort": self.log_model.sort_order,
+        }
+        self.export_button.setEnabled(False)
+        self.log_message(f"Exporting incidents to {path}...")
+
+        # Pages are read and written on a worker thread; the file can be far
+        # larger than anything the log view would load
+        def run():
+            try:
+                export_to_file(self.store, path, **filters)
+            except Exception as e:
+                self.write_signals.export_finished.emit(path, e)
+            else:
+                self.write_signals.export_finished.emit(path, None)
+
+        threading.Thread(target=run, name="incident-export", daemon=True).start()
+
+    def on_export_finished(self, path, error):
+        self.export_button.setEnabled(True)
+        if error is not None:
+            self.log_message(f"Export to {path} failed: {str(error)}", "error")
+            QMessageBox.critical(self, "Export Failed", f"Failed to export incidents: {str(error)}")
+            return
+        self.log_message(f"Incidents exported to {path}")
+
     def clear_form(self):
         self.subject_input.clear()
         self.severity_combo.setCurrentIndex(0)
@@ -386,46 +563,11 @@ class IncidentResponseModule(QWidget):
         
     def refresh_incident_data(self):
         try:
-            # Ensure connection is still valid
-            if not self.conn:
-                self.setup_database()
-                
-            # Clear existing items
-            self.log_tree.clear()
-            
-            # Fetch incidents from database
-            self.cursor.execute('''
-                SELECT timestamp, subject, severity, description, status 
-                FROM incidents 
-                ORDER BY timestamp DESC
-            ''')
-            incidents = self.cursor.fetchall()
-            
-            # Update stats
-            self.incident_count = len(incidents)
-            self.critical_count = sum(1 for i in incidents if i[2] == "Critical")
-            
-            self.total_incidents_card.update_value(str(self.incident_count))
-            self.critical_incidents_card.update_value(str(self.critical_count))
-            
-            if incidents:
-                self.last_incident_card.update_value(incidents[0][0])
-            
-            # Populate tree
-            for incident in incidents:
-                item = QTreeWidgetItem(incident)
-                severity = incident[2]
-                if severity == "Critical":
-                    item.setForeground(2, QColor("red"))
-                elif severity == "High":
-                    item.setForeground(2, QColor("orange"))
-                elif severity == "Medium":
-                    item.setForeground(2, QColor("yellow"))
-                else:
-                    item.setForeground(2, QColor("green"))
-                self.log_tree.addTopLevelItem(item)
+            # Re-run the current log query; rows are fetched page by page
+            self.log_model.refresh()
+            self.update_stats()
                 
-        except sqlite3.Error as e:
+        except IncidentStoreError as e:
             logger.error(f"Database error during refresh: {str(e)}")
             self.log_message("Failed to refresh incident data - Database error", "error")
             # Try to reconnect
@@ -434,6 +576,114 @@ class IncidentResponseModule(QWidget):
             logger.error(f"Failed to refresh incident data: {str(e)}")
             self.log_message("Failed to refresh incident data", "error")
             
+    def poll_changes(self, force=False):
+        """Apply incidents added or changed since the last poll to the view"""
+        if self.change_feed is None:
+            return
+        try:
+            batch = self.change_feed.poll(force=force)
+            if batch is None:
+                return
+            self.log_model.apply_changes(batch)
+            self.update_stats()
+        except (sqlite3.Error, IncidentStoreError) as e:
+            logger.error(f"Database error while checking for changes: {str(e)}")
+            
+    def update_stats(self):
+        """Refresh the cards from the counters; everything slower is loaded
+        on worker threads, since this runs after every poll with changes"""
+        stats = self.store.get_stats()
+        self.incident_count = stats["total"]
+        self.critical_count = stats["by_severity"]["Critical"]
+        
+        self.total_incidents_card.update_value(str(self.incident_count))
+        self.critical_incidents_card.update_value(str(self.critical_count))
+        
+        if stats["latest"]:
+            self.last_incident_card.update_value(stats["latest"])
+
+        self.update_recent_counts()
+        self.update_trends()
+
+    def update_recent_counts(self):
+        """Count recent incidents from the in-memory cache on a worker thread.
+
+        Counting first syncs the cache with the store, which can mean a
+        reload under the cache's lock, so the GUI thread never calls it.
+        """
+        if self.counting_recent:
+            self.recount_recent = True
+            return
+        self.counting_recent = True
+        cache = self.cache
+
+        def run():
+            try:
+                recent = [(label, cache.counts(days=days)) for label, days in RECENT_WINDOWS]
+            except Exception as e:
+                logger.error(f"Failed to count recent incidents: {str(e)}")
+                recent = None
+            self.write_signals.recent_counted.emit(recent)
+
+        threading.Thread(target=run, name="incident-cache-count", daemon=True).start()
+
+    def on_recent_counted(self, recent):
+        self.counting_recent = False
+        if recent is not None:
+            self.total_incidents_card.setToolTip("\n".join(
+                f"{label}: {counts['total']} ({counts['by_severity']['Critical']} critical)"
+                for label, counts in recent))
+        if self.recount_recent:
+            # Changes arrived while counting
+            self.recount_recent = False
+            self.update_recent_counts()
+
+    def update_trends(self):
+        """Load response times and the trend chart's rollups on a worker thread"""
+        if self.loading_trends:
+            self.reload_trends = True
+            return
+        self.loading_trends = True
+        store = self.store
+        granularity, periods = TREND_RANGES[self.trend_range.currentText()]
+
+        def run():
+            try:
+                trends = (store.get_response_times(),
+                          store.get_timeseries(granularity,
+                                               incident_db.timeseries_since(granularity, periods)),
+                          week_over_week(store))
+            except Exception as e:
+                logger.error(f"Failed to load incident trends: {str(e)}")
+                trends = None
+            self.write_signals.trends_loaded.emit(trends)
+
+        threading.Thread(target=run, name="incident-trends", daemon=True).start()
+
+    def on_trends_loaded(self, trends):
+        self.loading_trends = False
+        if trends is not None:
+            self.show_trends(*trends)
+        if self.reload_trends:
+            # Changes arrived, or the range changed, while loading
+            self.reload_trends = False
+            self.update_trends()
+
+    def show_trends(self, times, timeseries, week):
+        self.response_time_card.update_value(
+            f"{format_duration(times['mtta']['all'])} / {format_duration(times['mttr']['all'])}")
+        self.response_time_card.setToolTip("\n".join(
+            f"{severity}: acknowledged in {format_duration(times['mtta'][severity])}, "
+            f"resolved in {format_duration(times['mttr'][severity])}"
+            for severity in reversed(incident_db.SEVERITIES)))
+        self.trend_chart.set_data(*timeseries)
+        this_week, last_week = week
+        change = ""
+        if last_week:
+            change = f", {(this_week - last_week) / last_week:+.0%}"
+        self.week_label.setText(
+            f"Critical this week: {this_week} (last week: {last_week}{change})")
+
     def log_message(self, message, level="info"):
         timestamp = datetime.now().strftime("%H:%M:%S")
         formatted_message = f"[{timestamp}] {message}"
@@ -463,57 +713,22 @@ class IncidentResponseModule(QWidget):
         try:
             # Get filter values
             severity_filter = self.severity_filter.currentText()
-            search_text = self.search_filter.text().lower()
+            search_text = self.search_filter.text().strip()
             sort_order = self.sort_filter.currentText()
             
-            # Clear existing items
-            self.log_tree.clear()
-            
-            # Fetch all incidents
-            self.cursor.execute('''
-                SELECT timestamp, subject, severity, description, status 
-                FROM incidents
-            ''')
-            incidents = self.cursor.fetchall()
-            
-            # Apply filters
-            filtered_incidents = []
-            for incident in incidents:
-                # Apply severity filter
-                if severity_filter != "All" and incident[2] != severity_filter:
-                    continue
-                    
-                # Apply search filter
-                if search_text and search_text not in incident[1].lower() and search_text not in incident[3].lower():
-                    continue
-                    
-                filtered_incidents.append(incident)
+            # Filtering, searching and sorting all happen in SQLite
+            sort = incident_db.SORT_LABELS[sort_order]
+            self.log_model.set_query(severity_filter, search_text, sort)
             
-            # Apply sorting
-            if sort_order == "Time (Newest)":
-                filtered_incidents.sort(key=lambda x: x[0], reverse=True)
-            elif sort_order == "Time (Oldest)":
-                filtered_incidents.sort(key=lambda x: x[0])
-            elif sort_order == "Severity (High-Low)":
-                severity_order = {"Critical": 0, "High": 1, "Medium": 2, "Low": 3}
-                filtered_incidents.sort(key=lambda x: severity_order[x[2]])
-            elif sort_order == "Severity (Low-High)":
-                severity_order = {"Critical": 3, "High": 2, "Medium": 1, "Low": 0}
-                filtered_incidents.sort(key=lambda x: severity_order[x[2]])
-            
-            # Populate tree with filtered and sorted incidents
-            for incident in filtered_incidents:
-                item = QTreeWidgetItem(incident)
-                severity = incident[2]
-                if severity == "Critical":
-                    item.setForeground(2, QColor("red"))
-                elif severity == "High":
-                    item.setForeground(2, QColor("orange"))
-                elif severity == "Medium":
-                    item.setForeground(2, QColor("yellow"))
-                else:
-                    item.setForeground(2, QColor("green"))
-                self.log_tree.addTopLevelItem(item)
+            # Keep the header's sort arrow in line with the combo box
+            header = self.log_view.horizontalHeader()
+            header.blockSignals(True)
+            header.setSortIndicator(-1, Qt.DescendingOrder)
+            for section, (ascending, descending) in HEADER_SORTS.items():
+                if sort in (ascending, descending):
+                    header.setSortIndicator(
+                        section, Qt.DescendingOrder if sort == descending else Qt.AscendingOrder)
+            header.blockSignals(False)
                 
         except Exception as e:
             logger.error(f"Failed to apply filters: {str(e)}")
@@ -522,13 +737,17 @@ class IncidentResponseModule(QWidget):
     def focusInEvent(self, event):
         """Handle when the window gains focus"""
         super().focusInEvent(event)
-        self.refresh_incident_data()
+        self.poll_changes()
         
     def closeEvent(self, event):
         """Handle when the window is closed"""
         try:
-            if hasattr(self, 'conn'):
-                self.conn.close()
+            if self.archiver is not None:
+                self.archiver.stop(timeout=5)
+            if self.change_feed is not None:
+                self.change_feed.conn.close()
+            if self.cache is not None:
+                self.cache.close()
         except Exception as e:
             logger.error(f"Error closing database connection: {str(e)}")
         super().closeEvent(event)
@@ -0,0 +1,743 @@
+import atexit
+import os
+from abc import ABC, abstractmethod
+import secrets
+import sqlite3
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from . import incident_db, incident_feed, incident_archive
+from .incident_writer import IncidentWriter
+
+
+class IncidentStoreError(Exception):
+    """A backend failure, whichever database the store runs on.
+
+    transient is True for failures worth retrying as they are: a lost or
+    refused connection, a lock wait or a deadlock.
+    """
+
+    def __init__(self, message, transient=False):
+        super().__init__(message)
+        self.transient = transient
+
+
+class IncidentArchivedError(Exception):
+    """A write to an incident that has moved to an archive, where it is read-only"""
+
+
+class IncidentStore(ABC):
+    """Where incidents are kept, independent of the database behind it.
+
+    Rows come back as tuples of the requested columns, timestamps as
+    "YYYY-MM-DD HH:MM:SS" strings, in the same order and with the same keyset
+    cursors on every backend. Backend errors are raised as
+    IncidentStoreError; bad arguments, including a cursor that does not
+    fit the sort, as ValueError. A backend missing one of the abstract
+    methods fails when it is constructed.
+    """
+
+    # Writes that can be queued with submit()
+    WRITE_OPERATIONS = ("insert_incident", "set_status", "record_occurrence")
+
+    @abstractmethod
+    def insert_incident(self, subject, severity, description, timestamp=None, status="New"):
+        """Insert one incident and return its id"""
+
+    @abstractmethod
+    def insert_incidents(self, incidents, status="New"):
+        """Insert (subject, severity, description, timestamp) tuples as one batch; returns the ids"""
+
+    @abstractmethod
+    def set_status(self, incident_id, status):
+        """Move an incident to status; False if it was already there.
+
+        KeyError if it does not exist, IncidentArchivedError if it has been
+        archived.
+        """
+
+    @abstractmethod
+    def record_occurrence(self, fingerprint, subject, severity, description, seen_at=None,
+                          window=incident_db.DEDUP_WINDOW_SECONDS, incident_id=None):
+        """Fold a finding into its open incident or raise one; as incident_db.record_occurrence"""
+
+    @abstractmethod
+    def query_page(self, limit=100, after=None, **filters):
+        """One page of incidents as (rows, next_cursor); filters as incident_db.build_incident_query"""
+
+    @abstractmethod
+    def get_stats(self):
+        """{"total", "by_severity", "by_status", "latest"}, as incident_db.get_stats"""
+
+    @abstractmethod
+    def get_response_times(self, days=incident_db.RESPONSE_TIME_DAYS):
+        """MTTA and MTTR in seconds over recent days, as incident_db.get_response_times"""
+
+    @abstractmethod
+    def get_timeseries(self, granularity, since, until=None, severity=None):
+        """(periods, series) of incidents raised per hour or day; as incident_db.get_timeseries"""
+
+    @abstractmethod
+    def version(self):
+        """(version, changed_at) that moves on every write; changed_at is a unix time or None"""
+
+    @abstractmethod
+    def insert_log_entries(self, entries):
+        """Append (text, logged_at) lines to the incident log in one transaction"""
+
+    @abstractmethod
+    def query_log_page(self, limit=100, after=None):
+        """Incident log lines newest first, as ((id, logged_at, text) rows, next_cursor)"""
+
+    def change_feed(self):
+        """An IncidentChangeFeed-like poller, or None when the backend has no change log"""
+        return None
+
+    def archived_ids(self, incidents):
+        """Ids of the (id, timestamp) incidents that are archived and so read-only"""
+        return set()
+
+    def submit(self, operation, *args, **kwargs):
+        """Run one of WRITE_OPERATIONS off the calling thread; returns a Future"""
+        if operation not in self.WRITE_OPERATIONS:
+            raise ValueError(f"Unknown write operation: {operation}")
+        if getattr(self, "_executor", None) is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="incident-store")
+        return self._executor.submit(getattr(self, operation), *args, **kwargs)
+
+    def close(self):
+        if getattr(self, "_executor", None) is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+
+# SQLite reports a busy database or lock as an OperationalError with one of these
+SQLITE_TRANSIENT_MESSAGES = ("database is locked", "database table is locked", "unable to open")
+
+# mysql.connector errnos: server gone or lost, connection refused, lock wait
+# timeout and deadlock
+MYSQL_TRANSIENT_ERRORS = {2002, 2003, 2006, 2013, 1205, 1213}
+
+
+def _check_cursor(after, filters, fulltext):
+    if after is None:
+        return
+    search = filters.get("search")
+    keys = incident_db.sort_keys(filters.get("sort", "newest"), filters.get("severity"),
+                                 bool(search and fulltext and incident_db.fulltext_query(search)))
+    if len(after) != len(keys):
+        raise ValueError("Cursor does not match the requested sort")
+
+
+# Store operations as functions of a SQLite connection, so the same code runs
+# inline on a pooled connection or queued on the writer thread
+
+def _sqlite_set_status(conn, incident_id, status):
+    changed = incident_db.set_status(conn, incident_id, status)
+    if not changed and conn.execute(
+            "SELECT 1 FROM incidents WHERE id = ?", (incident_id,)).fetchone() is None:
+        if incident_archive.is_archived(conn, incident_id):
+            raise IncidentArchivedError(f"Incident {incident_id} is archived and read-only")
+        raise KeyError(incident_id)
+    return changed
+
+
+SQLITE_WRITES = {
+    "insert_incident": incident_db.insert_incident,
+    "set_status": _sqlite_set_status,
+    "record_occurrence": incident_db.record_occurrence,
+}
+
+
+class SQLiteIncidentStore(IncidentStore):
+    """The incidents.db store: pooled WAL connections, group-committed writes
+    through an IncidentWriter, archive fan-out and the change log feed."""
+
+    def __init__(self, path=incident_db.DB_PATH, warmup=None):
+        self.path = path
+        self.pool = incident_db.ConnectionPool(path, warmup=warmup)
+        self.writer = None
+        self.lock = threading.Lock()
+        # Prunes the change log on open and then as writes add to it
+        self.pruner = incident_feed.ChangeLogPruner()
+        with self.connection() as conn:
+            self.pruner.after_write(conn)
+
+    @contextmanager
+    def connection(self):
+        """Borrow a pooled connection; SQLite errors surface as IncidentStoreError"""
+        conn = self.pool.acquire()
+        try:
+            yield conn
+        except sqlite3.Error as e:
+            transient = (isinstance(e, sqlite3.OperationalError)
+                         and str(e).startswith(SQLITE_TRANSIENT_MESSAGES))
+            raise IncidentStoreError(str(e), transient) from e
+        finally:
+            self.pool.release(conn)
+
+    def _write(self, operation, *args, **kwargs):
+        with self.connection() as conn:
+            result = SQLITE_WRITES[operation](conn, *args, **kwargs)
+            conn.commit()
+            self.pruner.after_write(conn)
+            return result
+
+    def insert_incident(self, subject, severity, description, timestamp=None, status="New"):
+        return self._write("insert_incident", subject, severity, description, timestamp, status)
+
+    def insert_incidents(self, incidents, status="New"):
+        with self.connection() as conn:
+            ids = incident_db.insert_incidents(conn, incidents, status)
+            self.pruner.after_write(conn)
+            return ids
+
+    def set_status(self, incident_id, status):
+        return self._write("set_status", incident_id, status)
+
+    def record_occurrence(self, fingerprint, subject, severity, description, seen_at=None,
+                          window=incident_db.DEDUP_WINDOW_SECONDS, incident_id=None):
+        return self._write("record_occurrence", fingerprint, subject, severity, description,
+                           seen_at, window, incident_id)
+
+    def query_page(self, limit=100, after=None, **filters):
+        with self.connection() as conn:
+            _check_cursor(after, filters, incident_db.has_fulltext(conn))
+            if filters.get("ids") is not None:
+                # Looking up changed incidents; archived ones never change
+                return incident_db.query_page(conn, limit=limit, after=after, **filters)
+            return incident_archive.query_page(conn, limit=limit, after=after, **filters)
+
+    def archived_ids(self, incidents):
+        with self.connection() as conn:
+            return incident_archive.archived_ids(conn, incidents)
+
+    def get_stats(self):
+        with self.connection() as conn:
+            return incident_db.get_stats(conn)
+
+    def get_response_times(self, days=incident_db.RESPONSE_TIME_DAYS):
+        with self.connection() as conn:
+            return incident_db.get_response_times(conn, days)
+
+    def get_timeseries(self, granularity, since, until=None, severity=None):
+        with self.connection() as conn:
+            return incident_db.get_timeseries(conn, granularity, since, until, severity)
+
+    def version(self):
+        with self.connection() as conn:
+            return incident_feed.store_version(conn)
+
+    def insert_log_entries(self, entries):
+        with self.connection() as conn:
+            incident_db.insert_log_entries(conn, entries)
+
+    def query_log_page(self, limit=100, after=None):
+        with self.connection() as conn:
+            return incident_db.query_log_page(conn, limit, after)
+
+    def change_feed(self):
+        # Its own connection: data_version only moves for other connections'
+        # commits, and pooled ones are shared with this process's writes.
+        # Readers may poll it from more than one thread, one at a time.
+        return incident_feed.IncidentChangeFeed(
+            incident_db.connect(self.path, check_same_thread=False))
+
+    def submit(self, operation, *args, **kwargs):
+        if operation not in self.WRITE_OPERATIONS:
+            raise ValueError(f"Unknown write operation: {operation}")
+        with self.lock:
+            if self.writer is None:
+                self.writer = IncidentWriter(self.path, after_commit=self.pruner.after_write)
+        return self.writer.submit(SQLITE_WRITES[operation], *args, **kwargs)
+
+    def close(self):
+        with self.lock:
+            if self.writer is not None:
+                self.writer.close()
+                self.writer = None
+        self.pool.close()
+
+
+def _as_text(value):
+    if isinstance(value, datetime):
+        return value.strftime("%Y-%m-%d %H:%M:%S")
+    return value
+
+
+class MySQLIncidentStore(IncidentStore):
+    """Incidents in MySQL, through a mysql.connector connection pool.
+
+    Search falls back to LIKE and there is no change log, so views built on
+    this store refresh instead of following changes. Status history and the
+    MTTA/MTTR sums are kept in the same transaction as the status update,
+    and the hourly and daily rollups in the same one as the insert. Every
+    write also updates incident_counts and bumps the one-row
+    incident_version in its transaction, as the SQLite triggers do, so
+    stats and version checks read a few rows instead of scanning incidents.
+    Writes made to these tables from outside the store are not counted.
+    """
+
+    SCHEMA = [
+        '''
+        CREATE TABLE IF NOT EXISTS incidents (
+            id BIGINT AUTO_INCREMENT PRIMARY KEY,
+            subject VARCHAR(255) NOT NULL,
+            severity VARCHAR(16) NOT NULL,
+            severity_rank TINYINT NOT NULL,
+            description TEXT NOT NULL,
+            timestamp DATETIME NOT NULL,
+            status VARCHAR(32) NOT NULL,
+            fingerprint CHAR(32) NULL,
+            occurrences INT NOT NULL DEFAULT 1,
+            last_seen DATETIME NULL,
+            batch_key CHAR(32) NULL,
+            updated_at DATETIME(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6)
+                ON UPDATE CURRENT_TIMESTAMP(6),
+            KEY idx_incidents_timestamp (timestamp, id),
+            KEY idx_incidents_severity (severity, timestamp),
+            KEY idx_incidents_severity_rank (severity_rank, timestamp, id),
+            KEY idx_incidents_status (status, timestamp),
+            KEY idx_incidents_fingerprint (fingerprint, last_seen),
+            KEY idx_incidents_updated (updated_at),
+            KEY idx_incidents_batch (batch_key, id)
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS incident_events (
+            id BIGINT AUTO_INCREMENT PRIMARY KEY,
+            incident_id BIGINT NOT NULL,
+            from_status VARCHAR(32),
+            to_status VARCHAR(32) NOT NULL,
+            changed_at DATETIME NOT NULL,
+            KEY idx_incident_events_incident (incident_id, id)
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS incident_response_times (
+            metric VARCHAR(16) NOT NULL,
+            severity VARCHAR(16) NOT NULL,
+            day DATE NOT NULL,
+            count INT NOT NULL,
+            total_seconds DOUBLE NOT NULL,
+            PRIMARY KEY (metric, severity, day)
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS incident_rollups (
+            granularity VARCHAR(8) NOT NULL,
+            period VARCHAR(19) NOT NULL,
+            severity VARCHAR(16) NOT NULL,
+            count INT NOT NULL,
+            PRIMARY KEY (granularity, period, severity)
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS incident_counts (
+            dimension VARCHAR(16) NOT NULL,
+            value VARCHAR(32) NOT NULL,
+            count BIGINT NOT NULL,
+            PRIMARY KEY (dimension, value)
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS incident_version (
+            id TINYINT PRIMARY KEY,
+            version BIGINT NOT NULL,
+            changed_at DATETIME(6) NULL
+        )
+        ''',
+        "INSERT IGNORE INTO incident_version (id, version, changed_at) VALUES (1, 0, NULL)",
+        '''
+        CREATE TABLE IF NOT EXISTS incident_logs (
+            id BIGINT AUTO_INCREMENT PRIMARY KEY,
+            incident TEXT NOT NULL,
+            logged_at DATETIME NULL
+        )
+        ''',
+    ]
+
+    def __init__(self, pool_name="incidents", pool_size=5, **config):
+        # Only needed when MySQL is actually configured
+        from mysql.connector import pooling, Error
+        self.Error = Error
+        try:
+            self.pool = pooling.MySQLConnectionPool(
+                pool_name=pool_name, pool_size=pool_size, **config)
+        except Error as e:
+            raise IncidentStoreError(str(e)) from e
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            for statement in self.SCHEMA:
+                cursor.execute(statement)
+            cursor.execute('''
+                SELECT 1 FROM information_schema.COLUMNS
+                WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'incidents'
+                    AND COLUMN_NAME = 'batch_key'
+            ''')
+            if cursor.fetchone() is None:
+                # Tables from before insert_incidents read its ids back
+                cursor.execute('''
+                    ALTER TABLE incidents ADD COLUMN batch_key CHAR(32) NULL,
+                        ADD KEY idx_incidents_batch (batch_key, id)
+                ''')
+            cursor.execute('''
+                SELECT 1 FROM information_schema.COLUMNS
+                WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'incident_logs'
+                    AND COLUMN_NAME = 'logged_at'
+            ''')
+            if cursor.fetchone() is None:
+                # incident_logs as the old log writer created it, text only
+                cursor.execute("ALTER TABLE incident_logs ADD COLUMN logged_at DATETIME NULL")
+            cursor.execute("SELECT 1 FROM incident_counts LIMIT 1")
+            if cursor.fetchone() is None:
+                # New table: count the incidents already there, setting
+                # rather than adding like the rollups below
+                cursor.execute('''
+                    INSERT INTO incident_counts (dimension, value, count)
+                    SELECT 'total', '', COUNT(*) FROM incidents HAVING COUNT(*) > 0
+                    ON DUPLICATE KEY UPDATE count = VALUES(count)
+                ''')
+                for dimension in ("severity", "status"):
+                    cursor.execute(f'''
+                        INSERT INTO incident_counts (dimension, value, count)
+                        SELECT '{dimension}', {dimension}, COUNT(*) FROM incidents
+                        GROUP BY {dimension}
+                        ON DUPLICATE KEY UPDATE count = VALUES(count)
+                    ''')
+            cursor.execute("SELECT 1 FROM incident_rollups LIMIT 1")
+            if cursor.fetchone() is None:
+                # New table: count the incidents already there. Setting
+                # rather than adding keeps two processes doing this at once
+                # from doubling the counts.
+                for granularity, (label, _) in incident_db.ROLLUP_PERIODS.items():
+                    cursor.execute('''
+                        INSERT INTO incident_rollups (granularity, period, severity, count)
+                        SELECT %s, DATE_FORMAT(timestamp, %s), severity, COUNT(*) FROM incidents
+                        GROUP BY 2, 3
+                        ON DUPLICATE KEY UPDATE count = VALUES(count)
+                    ''', (granularity, label))
+            conn.commit()
+
+    @contextmanager
+    def connection(self):
+        conn = None
+        try:
+            conn = self.pool.get_connection()
+            yield conn
+        except self.Error as e:
+            if conn is not None:
+                try:
+                    conn.rollback()
+                except self.Error:
+                    # The connection itself is gone
+                    pass
+            raise IncidentStoreError(str(e), e.errno in MYSQL_TRANSIENT_ERRORS) from e
+        finally:
+            if conn is not None:
+                # Returns it to the pool
+                conn.close()
+
+    def _query(self, **filters):
+        # The SQLite query builder without the FTS5 parts. MySQL treats a
+        # backslash as the LIKE escape already and uses %s placeholders.
+        sql, params = incident_db.build_incident_query(fulltext=False, **filters)
+        return sql.replace(" ESCAPE '\\'", "").replace("?", "%s"), params
+
+    def _count(self, cursor, deltas):
+        """Apply a Counter of (dimension, value) deltas to incident_counts and bump the version"""
+        rows = [(*key, delta) for key, delta in deltas.items() if delta]
+        if rows:
+            cursor.executemany('''
+                INSERT INTO incident_counts (dimension, value, count) VALUES (%s, %s, %s)
+                ON DUPLICATE KEY UPDATE count = count + VALUES(count)
+            ''', rows)
+        cursor.execute(
+            "UPDATE incident_version SET version = version + 1, changed_at = NOW(6) WHERE id = 1")
+
+    def _roll_up(self, cursor, raised):
+        """Count new incidents, as (severity, timestamp) pairs, into incident_rollups"""
+        counts = Counter()
+        for severity, timestamp in raised:
+            moment = datetime.fromisoformat(str(timestamp))
+            for granularity, (label, _) in incident_db.ROLLUP_PERIODS.items():
+                counts[granularity, moment.strftime(label), severity] += 1
+        cursor.executemany('''
+            INSERT INTO incident_rollups (granularity, period, severity, count)
+            VALUES (%s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE count = count + VALUES(count)
+        ''', [(*key, count) for key, count in counts.items()])
+
+    def insert_incident(self, subject, severity, description, timestamp=None, status="New"):
+        return self.insert_incidents([(subject, severity, description, timestamp)], status)[0]
+
+    def insert_incidents(self, incidents, status="New"):
+        if not incidents:
+            return []
+        default_timestamp = incident_db.now_timestamp()
+        rows = [(subject, severity, incident_db.SEVERITY_RANK.get(severity, 0), description,
+                 timestamp or default_timestamp, status, timestamp or default_timestamp)
+                for subject, severity, description, timestamp in incidents]
+        # Ids need not be consecutive (auto_increment_increment, interleaved
+        # lock mode), so the batch is tagged and its ids read back; within
+        # one statement they still rise in row order
+        batch_key = secrets.token_hex(16)
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            # mysql.connector sends an executemany INSERT as one multi-row
+            # statement
+            cursor.executemany('''
+                INSERT INTO incidents (subject, severity, severity_rank, description, timestamp, status,
+                                       last_seen, batch_key)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+            ''', [row + (batch_key,) for row in rows])
+            cursor.execute("SELECT id FROM incidents WHERE batch_key = %s ORDER BY id", (batch_key,))
+            ids = [row[0] for row in cursor.fetchall()]
+            cursor.executemany('''
+                INSERT INTO incident_events (incident_id, from_status, to_status, changed_at)
+                VALUES (%s, NULL, %s, %s)
+            ''', [(incident_id, status, row[4]) for incident_id, row in zip(ids, rows)])
+            self._roll_up(cursor, [(row[1], row[4]) for row in rows])
+            deltas = Counter(("severity", row[1]) for row in rows)
+            deltas["total", ""] = len(rows)
+            deltas["status", status] = len(rows)
+            self._count(cursor, deltas)
+            conn.commit()
+        return ids
+
+    def set_status(self, incident_id, status):
+        if status not in incident_db.STATUSES and status not in incident_db.CLOSED_STATUSES:
+            raise ValueError(f"status must be one of {', '.join(incident_db.STATUSES)}")
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "SELECT status, severity, timestamp FROM incidents WHERE id = %s FOR UPDATE",
+                (incident_id,))
+            row = cursor.fetchone()
+            if row is None:
+                conn.rollback()
+                raise KeyError(incident_id)
+            old_status, severity, raised_at = row
+            if old_status == status:
+                conn.rollback()
+                return False
+
+            now = datetime.now().replace(microsecond=0)
+            cursor.execute("UPDATE incidents SET status = %s WHERE id = %s", (status, incident_id))
+            self._count(cursor, Counter({("status", old_status): -1, ("status", status): 1}))
+            cursor.execute('''
+                INSERT INTO incident_events (incident_id, from_status, to_status, changed_at)
+                VALUES (%s, %s, %s, %s)
+            ''', (incident_id, old_status, status, now))
+
+            closed = tuple(incident_db.CLOSED_STATUSES)
+            for metric, reached, condition in (
+                    ("ack", status != "New", "to_status != 'New'"),
+                    ("resolve", status in closed,
+                     f"to_status IN ({', '.join('%s' for _ in closed)})")):
+                if not reached:
+                    continue
+                # Only the first time the incident gets there counts
+                cursor.execute(f'''
+                    SELECT COUNT(*) FROM incident_events
+                    WHERE incident_id = %s AND from_status IS NOT NULL AND {condition}
+                ''', (incident_id, *(closed if metric == "resolve" else ())))
+                if cursor.fetchone()[0] != 1:
+                    continue
+                seconds = max(0.0, (now - raised_at).total_seconds())
+                cursor.execute('''
+                    INSERT INTO incident_response_times (metric, severity, day, count, total_seconds)
+                    VALUES (%s, %s, %s, 1, %s)
+                    ON DUPLICATE KEY UPDATE count = count + 1,
+                        total_seconds = total_seconds + VALUES(total_seconds)
+                ''', (metric, severity, now.date(), seconds))
+            conn.commit()
+        return True
+
+    def record_occurrence(self, fingerprint, subject, severity, description, seen_at=None,
+                          window=incident_db.DEDUP_WINDOW_SECONDS, incident_id=None):
+        seen_at = seen_at or incident_db.now_timestamp()
+        since = (datetime.strptime(seen_at, "%Y-%m-%d %H:%M:%S")
+                 - timedelta(seconds=window)).strftime("%Y-%m-%d %H:%M:%S")
+        closed = tuple(incident_db.CLOSED_STATUSES)
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            # Locks the fingerprint's index range, so two producers seeing
+            # the same finding cannot both raise an incident for it
+            cursor.execute(f'''
+                SELECT id FROM incidents
+                WHERE fingerprint = %s AND last_seen >= %s
+                    AND status NOT IN ({', '.join('%s' for _ in closed)})
+                ORDER BY last_seen DESC LIMIT 1 FOR UPDATE
+            ''', (fingerprint, since, *closed))
+            row = cursor.fetchone()
+            if row is not None:
+                cursor.execute('''
+                    UPDATE incidents SET occurrences = occurrences + 1,
+                        last_seen = GREATEST(last_seen, %s)
+                    WHERE id = %s
+                ''', (seen_at, row[0]))
+                # Counts stay as they are; the version still moves
+                self._count(cursor, Counter())
+                conn.commit()
+                return row[0], False
+            cursor.execute('''
+                INSERT INTO incidents (subject, severity, severity_rank, description, timestamp,
+                                       status, fingerprint, last_seen)
+                VALUES (%s, %s, %s, %s, %s, 'New', %s, %s)
+            ''', (subject, severity, incident_db.SEVERITY_RANK.get(severity, 0), description,
+                  seen_at, fingerprint, seen_at))
+            new_id = cursor.lastrowid
+            cursor.execute('''
+                INSERT INTO incident_events (incident_id, from_status, to_status, changed_at)
+                VALUES (%s, NULL, 'New', %s)
+            ''', (new_id, seen_at))
+            self._roll_up(cursor, [(severity, seen_at)])
+            self._count(cursor, Counter({("total", ""): 1, ("severity", severity): 1,
+                                         ("status", "New"): 1}))
+            conn.commit()
+        return new_id, True
+
+    def query_page(self, limit=100, after=None, **filters):
+        _check_cursor(after, filters, False)
+        filters.pop("highlight", None)
+        sql, params = self._query(after=after, with_keys=True, **filters)
+        key_count = len(incident_db.sort_keys(filters.get("sort", "newest"),
+                                              filters.get("severity"), False))
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(sql + " LIMIT %s", params + [int(limit) + 1])
+            rows = [tuple(_as_text(value) for value in row) for row in cursor.fetchall()]
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = rows[-1][-key_count:]
+        return [row[:-key_count] for row in rows], next_cursor
+
+    def get_stats(self):
+        stats = {
+            "total": 0,
+            "by_severity": {severity: 0 for severity in incident_db.SEVERITIES},
+            "by_status": {},
+        }
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT dimension, value, count FROM incident_counts WHERE count != 0")
+            for dimension, value, count in cursor.fetchall():
+                if dimension == "total":
+                    stats["total"] = int(count)
+                else:
+                    stats[f"by_{dimension}"][value] = int(count)
+            # One end of the timestamp index
+            cursor.execute("SELECT MAX(timestamp) FROM incidents")
+            stats["latest"] = _as_text(cursor.fetchone()[0])
+        return stats
+
+    def get_response_times(self, days=incident_db.RESPONSE_TIME_DAYS):
+        since = datetime.now().date() - timedelta(days=days - 1)
+        times = {}
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            for metric, name in (("ack", "mtta"), ("resolve", "mttr")):
+                cursor.execute('''
+                    SELECT severity, SUM(count), SUM(total_seconds) FROM incident_response_times
+                    WHERE metric = %s AND day >= %s GROUP BY severity
+                ''', (metric, since))
+                sums = {severity: [0, 0.0] for severity in incident_db.SEVERITIES + ["all"]}
+                for severity, count, total in cursor.fetchall():
+                    for key in (severity, "all"):
+                        sums.setdefault(key, [0, 0.0])
+                        sums[key][0] += int(count)
+                        sums[key][1] += float(total)
+                times[name] = {key: (total / count if count else None)
+                               for key, (count, total) in sums.items()}
+        return times
+
+    def get_timeseries(self, granularity, since, until=None, severity=None):
+        periods = incident_db.timeseries_periods(granularity, since, until)
+        if not periods:
+            return periods, incident_db.fill_timeseries(periods, [], severity)
+        sql = '''
+            SELECT period, severity, count FROM incident_rollups
+            WHERE granularity = %s AND period BETWEEN %s AND %s AND count != 0
+        '''
+        params = [granularity, periods[0], periods[-1]]
+        if severity:
+            sql += " AND severity = %s"
+            params.append(severity)
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(sql, params)
+            rows = [(period, name, int(count)) for period, name, count in cursor.fetchall()]
+        return periods, incident_db.fill_timeseries(periods, rows, severity)
+
+    def version(self):
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT version, changed_at FROM incident_version WHERE id = 1")
+            version, changed_at = cursor.fetchone()
+        return int(version), (changed_at.timestamp() if changed_at is not None else None)
+
+    def insert_log_entries(self, entries):
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            cursor.executemany("INSERT INTO incident_logs (incident, logged_at) VALUES (%s, %s)",
+                               list(entries))
+            conn.commit()
+
+    def query_log_page(self, limit=100, after=None):
+        sql = "SELECT id, logged_at, incident FROM incident_logs"
+        params = []
+        if after is not None:
+            sql += " WHERE id < %s"
+            params.append(after[0])
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(sql + " ORDER BY id DESC LIMIT %s", params + [int(limit) + 1])
+            rows = [tuple(_as_text(value) for value in row) for row in cursor.fetchall()]
+        if len(rows) > limit:
+            return rows[:limit], (rows[limit - 1][0],)
+        return rows, None
+
+
+def open_store(backend=None, warmup=None):
+    """A new store for the configured backend.
+
+    INCIDENT_STORE picks the backend, sqlite (the default) or mysql. MySQL
+    settings come from MYSQL_HOST, MYSQL_PORT, MYSQL_USER, MYSQL_PASSWORD,
+    MYSQL_DATABASE and MYSQL_POOL_SIZE. warmup is passed to the SQLite
+    connection pool.
+    """
+    backend = backend or os.environ.get("INCIDENT_STORE", "sqlite")
+    if backend == "sqlite":
+        return SQLiteIncidentStore(incident_db.DB_PATH, warmup=warmup)
+    if backend == "mysql":
+        return MySQLIncidentStore(
+            pool_size=int(os.environ.get("MYSQL_POOL_SIZE", "5")),
+            host=os.environ.get("MYSQL_HOST", "localhost"),
+            port=int(os.environ.get("MYSQL_PORT", "3306")),
+            user=os.environ.get("MYSQL_USER", "root"),
+            password=os.environ.get("MYSQL_PASSWORD", ""),
+            database=os.environ.get("MYSQL_DATABASE", "security_app_db"),
+        )
+    raise ValueError(f"Unknown incident store backend: {backend}")
+
+
+_shared_store = None
+_shared_store_lock = threading.Lock()
+
+
+def get_store():
+    """The process-wide store, opened on first use and closed at exit.
+
+    The GUI, the web demo and any automated producers in the process share
+    it, so their writes go through one writer instead of racing each other.
+    """
+    global _shared_store
+    with _shared_store_lock:
+        if _shared_store is None:
+            _shared_store = open_store()
+            atexit.register(_shared_store.close)
+        return _shared_store
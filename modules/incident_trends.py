@@ -0,0 +1,117 @@
+from datetime import datetime, timedelta
+from PyQt5.QtWidgets import QWidget, QToolTip
+from PyQt5.QtCore import Qt, QRectF
+from PyQt5.QtGui import QPainter, QPen, QFont
+from .gui_components import COLORS
+from .incident_model import SEVERITY_COLORS
+from . import incident_db
+
+# Chart ranges offered in the Trends tab: (granularity, buckets)
+TREND_RANGES = {
+    "Last 48 hours (hourly)": ("hour", 48),
+    "Last 30 days (daily)": ("day", 30),
+}
+
+
+def week_over_week(store, severity="Critical", today=None):
+    """(last 7 days, the 7 days before) of incidents raised at a severity"""
+    today = today or datetime.now().date()
+    since = (today - timedelta(days=13)).isoformat()
+    until = (today + timedelta(days=1)).isoformat()
+    _, series = store.get_timeseries("day", since, until, severity)
+    counts = series[severity]
+    return sum(counts[7:]), sum(counts[:7])
+
+
+class TrendChart(QWidget):
+    """Stacked bars of incidents per period, one colour per severity"""
+
+    MARGIN_LEFT = 40
+    MARGIN_BOTTOM = 24
+    MARGIN_TOP = 24
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.periods = []
+        self.series = {}
+        self.setMinimumSize(400, 220)
+        self.setMouseTracking(True)
+
+    def set_data(self, periods, series):
+        self.periods = periods
+        self.series = series
+        self.update()
+
+    def _totals(self):
+        return [sum(counts[position] for counts in self.series.values())
+                for position in range(len(self.periods))]
+
+    def _plot_rect(self):
+        return QRectF(self.MARGIN_LEFT, self.MARGIN_TOP,
+                      max(1, self.width() - self.MARGIN_LEFT - 10),
+                      max(1, self.height() - self.MARGIN_TOP - self.MARGIN_BOTTOM))
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.fillRect(self.rect(), COLORS['surface'])
+        painter.setFont(QFont("Segoe UI", 8))
+        plot = self._plot_rect()
+
+        # Legend, most severe first
+        x = plot.left()
+        for severity in reversed(incident_db.SEVERITIES):
+            if severity not in self.series:
+                continue
+            painter.fillRect(QRectF(x, 8, 10, 10), SEVERITY_COLORS[severity])
+            painter.setPen(QPen(COLORS['text_secondary']))
+            painter.drawText(QRectF(x + 14, 4, 70, 18), Qt.AlignLeft | Qt.AlignVCenter, severity)
+            x += 80
+
+        if not self.periods:
+            return
+        totals = self._totals()
+        peak = max(max(totals), 1)
+
+        # Axis with the peak and zero marked
+        painter.setPen(QPen(COLORS['text_secondary']))
+        painter.drawLine(plot.bottomLeft(), plot.bottomRight())
+        painter.drawText(QRectF(0, plot.top() - 8, self.MARGIN_LEFT - 6, 16),
+                         Qt.AlignRight | Qt.AlignVCenter, str(peak))
+        painter.drawText(QRectF(0, plot.bottom() - 8, self.MARGIN_LEFT - 6, 16),
+                         Qt.AlignRight | Qt.AlignVCenter, "0")
+
+        slot = plot.width() / len(self.periods)
+        bar = max(1.0, slot * 0.8)
+        for position in range(len(self.periods)):
+            left = plot.left() + position * slot + (slot - bar) / 2
+            bottom = plot.bottom()
+            # Least severe at the bottom, so criticals sit on top
+            for severity in incident_db.SEVERITIES:
+                count = self.series.get(severity, [0] * len(self.periods))[position]
+                if not count:
+                    continue
+                height = plot.height() * count / peak
+                painter.fillRect(QRectF(left, bottom - height, bar, height),
+                                 SEVERITY_COLORS[severity])
+                bottom -= height
+
+        # First, middle and last bucket labels; more would overlap
+        painter.setPen(QPen(COLORS['text_secondary']))
+        for position in sorted({0, len(self.periods) // 2, len(self.periods) - 1}):
+            label = self.periods[position][5:16]
+            center = plot.left() + (position + 0.5) * slot
+            painter.drawText(QRectF(center - 50, plot.bottom() + 4, 100, 16),
+                             Qt.AlignHCenter | Qt.AlignTop, label)
+
+    def mouseMoveEvent(self, event):
+        plot = self._plot_rect()
+        if not self.periods or not plot.contains(event.pos()):
+            QToolTip.hideText()
+            return
+        position = int((event.pos().x() - plot.left()) / plot.width() * len(self.periods))
+        position = min(max(position, 0), len(self.periods) - 1)
+        lines = [self.periods[position]]
+        lines += [f"{severity}: {self.series[severity][position]}"
+                  for severity in reversed(incident_db.SEVERITIES) if severity in self.series]
+        QToolTip.showText(event.globalPos(), "\n".join(lines), self)
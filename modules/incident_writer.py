@@ -0,0 +1,117 @@
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from loguru import logger
+from . import incident_db
+
+# Most requests committed together in one transaction
+MAX_BATCH = 256
+# How long the writer waits for more requests to join a batch once it has
+# one; far below anything a person saving an incident would notice
+LINGER_SECONDS = 0.002
+
+
+class IncidentWriter:
+    """Thread that owns every write to the incident store.
+
+    Callers submit a function taking a connection and get a Future back.
+    Requests that arrive together run in one transaction and share a commit,
+    each inside its own savepoint so a failing request does not take the rest
+    of the batch down with it. Futures resolve only once the commit is done;
+    after_commit(conn), if given, runs after that for housekeeping.
+    """
+
+    def __init__(self, path=incident_db.DB_PATH, max_batch=MAX_BATCH, linger=LINGER_SECONDS,
+                 after_commit=None):
+        self.path = path
+        self.max_batch = max_batch
+        self.linger = linger
+        self.after_commit = after_commit
+        self.requests = queue.Queue()
+        self.lock = threading.Lock()
+        self.closed = False
+        self.thread = threading.Thread(target=self.run, name="incident-writer", daemon=True)
+        self.thread.start()
+
+    def submit(self, write, *args, **kwargs):
+        """Queue write(conn, *args, **kwargs); the Future holds its return value"""
+        future = Future()
+        with self.lock:
+            if self.closed:
+                raise RuntimeError("Incident writer is closed")
+            self.requests.put((future, write, args, kwargs))
+        return future
+
+    def close(self, timeout=None):
+        """Write everything already queued, then stop the thread"""
+        with self.lock:
+            if self.closed:
+                return
+            self.closed = True
+            self.requests.put(None)
+        self.thread.join(timeout)
+
+    def next_batch(self):
+        batch = [self.requests.get()]
+        deadline = time.monotonic() + self.linger
+        while batch[-1] is not None and len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining > 0:
+                    batch.append(self.requests.get(timeout=remaining))
+                else:
+                    batch.append(self.requests.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def run(self):
+        conn = incident_db.connect(self.path)
+        try:
+            while True:
+                batch = self.next_batch()
+                stop = batch[-1] is None
+                if stop:
+                    batch.pop()
+                if batch:
+                    self.write_batch(conn, batch)
+                if stop:
+                    return
+        finally:
+            conn.close()
+
+    def write_batch(self, conn, batch):
+        outcomes = []
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for future, write, args, kwargs in batch:
+                if not future.set_running_or_notify_cancel():
+                    continue
+                conn.execute("SAVEPOINT request")
+                try:
+                    outcomes.append((future, None, write(conn, *args, **kwargs)))
+                except Exception as e:
+                    conn.execute("ROLLBACK TO request")
+                    outcomes.append((future, e, None))
+                conn.execute("RELEASE request")
+            conn.commit()
+        except sqlite3.Error as e:
+            logger.error(f"Incident write batch of {len(batch)} failed: {str(e)}")
+            if conn.in_transaction:
+                conn.rollback()
+            for future, *_ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for future, error, value in outcomes:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(value)
+
+        if self.after_commit is not None:
+            self.after_commit(conn)
+
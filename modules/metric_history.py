@@ -0,0 +1,284 @@
+import math
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime
+import numpy as np
+from PyQt5.QtWidgets import QWidget, QToolTip
+from PyQt5.QtCore import Qt, QRectF, QPointF
+from PyQt5.QtGui import QPainter, QPen, QFont, QPolygonF, QColor
+from .gui_components import COLORS
+from .telemetry import get_sampler
+
+# Seconds of history kept for every metric
+HISTORY_SECONDS = 24 * 60 * 60
+
+# Metric -> (telemetry source, its value in a sample or None to skip it)
+METRICS = {
+    "cpu": ("cpu", lambda data: data),
+    "memory": ("memory", lambda data: data.percent),
+    "disk": ("disk", lambda data: data.percent),
+    "battery": ("battery", lambda data: data.percent if data else None),
+}
+
+WindowStats = namedtuple("WindowStats", "count minimum maximum mean p95")
+
+
+class RingBuffer:
+    """The last capacity (time, value) samples in two preallocated arrays.
+
+    append() overwrites the oldest sample once the buffer is full, so memory
+    stays fixed however long the app runs. Readers get views of the arrays
+    rather than copies: at most two (times, values) pairs, because a window
+    that crosses the end of the arrays continues at their start. Times must
+    be appended in order.
+    """
+
+    def __init__(self, capacity, dtype=np.float64):
+        self.capacity = capacity
+        self.times = np.zeros(capacity, dtype=np.float64)
+        self.values = np.zeros(capacity, dtype=dtype)
+        self.head = 0
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def append(self, taken_at, value):
+        self.times[self.head] = taken_at
+        self.values[self.head] = value
+        self.head = (self.head + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+
+    def latest(self):
+        """The newest (time, value), or None while empty"""
+        if not self.count:
+            return None
+        position = self.head - 1
+        return float(self.times[position]), float(self.values[position])
+
+    def segments(self, seconds=None, now=None):
+        """Views of the samples of the last seconds, oldest first"""
+        start = (self.head - self.count) % self.capacity
+        if start + self.count <= self.capacity:
+            spans = [(start, start + self.count)]
+        else:
+            spans = [(start, self.capacity), (0, self.head)]
+        if seconds is not None:
+            cutoff = (time.time() if now is None else now) - seconds
+            spans = [(begin + int(np.searchsorted(self.times[begin:end], cutoff)), end)
+                     for begin, end in spans]
+        return [(self.times[begin:end], self.values[begin:end])
+                for begin, end in spans if end > begin]
+
+    def percentile(self, q, seconds=None, now=None):
+        values = [values for _, values in self.segments(seconds, now)]
+        if not values:
+            return None
+        # Only a window that wraps around is copied, to sort it in one piece
+        window = values[0] if len(values) == 1 else np.concatenate(values)
+        return float(np.percentile(window, q))
+
+    def stats(self, seconds=None, now=None):
+        """WindowStats of the last seconds, or None if there is no sample in them"""
+        values = [values for _, values in self.segments(seconds, now)]
+        if not values:
+            return None
+        count = sum(len(part) for part in values)
+        return WindowStats(
+            count=count,
+            minimum=float(min(part.min() for part in values)),
+            maximum=float(max(part.max() for part in values)),
+            mean=float(sum(part.sum() for part in values) / count),
+            p95=self.percentile(95, seconds, now),
+        )
+
+
+class MetricHistory:
+    """A RingBuffer per metric, fed by the shared sampler.
+
+    Each buffer holds HISTORY_SECONDS at its source's sample interval:
+    57,600 CPU samples at 1.5 s are 0.9 MB. Samples are recorded on the
+    GUI thread, which is also where the charts read them.
+    """
+
+    def __init__(self, sampler, seconds=HISTORY_SECONDS, metrics=METRICS):
+        self.buffers = {}
+        self.recorders = {}
+        for metric, (source, value) in metrics.items():
+            capacity = math.ceil(seconds / sampler.intervals[source])
+            self.buffers[metric] = RingBuffer(capacity)
+            self.recorders.setdefault(source, []).append((self.buffers[metric], value))
+        for source in self.recorders:
+            sampler.subscribe(source, self._record)
+
+    def __getitem__(self, metric):
+        return self.buffers[metric]
+
+    def _record(self, snapshot):
+        for buffer, value in self.recorders[snapshot.source]:
+            sample = value(snapshot.data)
+            if sample is not None:
+                buffer.append(snapshot.taken_at, sample)
+
+
+_history = None
+_history_lock = threading.Lock()
+
+
+def get_history():
+    """The process-wide metric history; create it from the GUI thread"""
+    global _history
+    with _history_lock:
+        if _history is None:
+            _history = MetricHistory(get_sampler())
+        return _history
+
+
+def _columns(times, values, start, seconds, width):
+    """Per pixel column of one segment: (columns, lows, highs)"""
+    columns = ((times - start) * (width / seconds)).astype(np.int64)
+    np.clip(columns, 0, max(width - 1, 0), out=columns)
+    # Times are sorted, so each column is one run of samples
+    starts = np.flatnonzero(np.diff(columns, prepend=-1))
+    return (columns[starts], np.minimum.reduceat(values, starts),
+            np.maximum.reduceat(values, starts))
+
+
+class Sparkline(QWidget):
+    """The last seconds of a RingBuffer as a line, without axes.
+
+    Many samples per pixel are reduced to their range in that pixel column:
+    the line follows the highs, so a one-sample spike stays visible in a
+    day-long window, and the band down to the lows is shaded.
+    """
+
+    PADDING = 2
+
+    def __init__(self, buffer, seconds=300, maximum=100, color=None, parent=None):
+        super().__init__(parent)
+        self.buffer = buffer
+        self.seconds = seconds
+        # None scales to the highest value in the window
+        self.maximum = maximum
+        self.color = color or COLORS['primary']
+        self.setMinimumSize(120, 36)
+
+    def set_buffer(self, buffer, maximum=100):
+        self.buffer = buffer
+        self.maximum = maximum
+        self.update()
+
+    def set_seconds(self, seconds):
+        self.seconds = seconds
+        self.update()
+
+    def _plot_rect(self):
+        return QRectF(self.rect()).adjusted(self.PADDING, self.PADDING,
+                                            -self.PADDING, -self.PADDING)
+
+    def _scale(self, segments):
+        if self.maximum is not None:
+            return self.maximum
+        peak = max((values.max() for _, values in segments), default=0)
+        return float(peak) or 1.0
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.fillRect(self.rect(), COLORS['surface'])
+        self.paint_chart(painter)
+
+    def paint_chart(self, painter):
+        plot = self._plot_rect()
+        now = time.time()
+        start = now - self.seconds
+        segments = self.buffer.segments(self.seconds, now)
+        if not segments:
+            return
+        scale = self._scale(segments)
+        width = max(int(plot.width()), 1)
+
+        highs, lows = [], []
+        for times, values in segments:
+            columns, low, high = _columns(times, values, start, self.seconds, width)
+            x = (plot.left() + columns + 0.5).tolist()
+            highs += zip(x, (plot.bottom() - plot.height() * np.minimum(high, scale) / scale).tolist())
+            lows += zip(x, (plot.bottom() - plot.height() * np.minimum(low, scale) / scale).tolist())
+
+        band = QColor(self.color)
+        band.setAlpha(60)
+        painter.setPen(Qt.NoPen)
+        painter.setBrush(band)
+        painter.drawPolygon(QPolygonF([QPointF(x, y) for x, y in highs + lows[::-1]]))
+        painter.setPen(QPen(self.color, 1.5))
+        painter.setBrush(Qt.NoBrush)
+        painter.drawPolyline(QPolygonF([QPointF(x, y) for x, y in highs]))
+        return scale
+
+
+class HistoryChart(Sparkline):
+    """A Sparkline with a value axis, time labels and a hover tooltip"""
+
+    MARGIN_LEFT = 44
+    MARGIN_BOTTOM = 22
+    MARGIN_TOP = 10
+
+    def __init__(self, buffer, seconds=3600, maximum=100, unit="%", color=None, parent=None):
+        super().__init__(buffer, seconds, maximum, color, parent)
+        self.unit = unit
+        self.setMinimumSize(400, 200)
+        self.setMouseTracking(True)
+
+    def set_buffer(self, buffer, maximum=100, unit="%"):
+        self.unit = unit
+        super().set_buffer(buffer, maximum)
+
+    def _plot_rect(self):
+        return QRectF(self.MARGIN_LEFT, self.MARGIN_TOP,
+                      max(1, self.width() - self.MARGIN_LEFT - 10),
+                      max(1, self.height() - self.MARGIN_TOP - self.MARGIN_BOTTOM))
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.fillRect(self.rect(), COLORS['surface'])
+        scale = self.paint_chart(painter)
+        plot = self._plot_rect()
+
+        painter.setFont(QFont("Segoe UI", 8))
+        painter.setPen(QPen(COLORS['text_secondary']))
+        painter.drawLine(plot.bottomLeft(), plot.bottomRight())
+        if scale is not None:
+            painter.drawText(QRectF(0, plot.top() - 8, self.MARGIN_LEFT - 6, 16),
+                             Qt.AlignRight | Qt.AlignVCenter, f"{scale:g}{self.unit}")
+            painter.drawText(QRectF(0, plot.bottom() - 8, self.MARGIN_LEFT - 6, 16),
+                             Qt.AlignRight | Qt.AlignVCenter, f"0{self.unit}")
+
+        # Start and end of the window
+        now = time.time()
+        label = "%H:%M" if self.seconds > 600 else "%H:%M:%S"
+        for when, align in ((now - self.seconds, Qt.AlignLeft), (now, Qt.AlignRight)):
+            painter.drawText(QRectF(plot.left(), plot.bottom() + 4, plot.width(), 16),
+                             align | Qt.AlignTop, datetime.fromtimestamp(when).strftime(label))
+
+    def mouseMoveEvent(self, event):
+        plot = self._plot_rect()
+        if not plot.contains(event.pos()):
+            QToolTip.hideText()
+            return
+        when = time.time() - self.seconds * (plot.right() - event.pos().x()) / plot.width()
+        # The sample nearest to the pointer
+        nearest = None
+        for times, values in self.buffer.segments(self.seconds):
+            position = min(int(np.searchsorted(times, when)), len(times) - 1)
+            for candidate in {max(position - 1, 0), position}:
+                distance = abs(times[candidate] - when)
+                if nearest is None or distance < nearest[0]:
+                    nearest = (distance, times[candidate], values[candidate])
+        if nearest is None:
+            QToolTip.hideText()
+            return
+        _, taken_at, value = nearest
+        text = f"{datetime.fromtimestamp(taken_at):%H:%M:%S}\n{value:.1f}{self.unit}"
+        QToolTip.showText(event.globalPos(), text, self)
@@ -1,12 +1,183 @@
 from PyQt5.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QScrollArea
-from PyQt5.QtCore import QTimer, Qt
+from PyQt5.QtCore import Qt
+import math
 import socket
-import psutil
-from .gui_components import StyledLabel, StyledButton, StyledGroupBox, DataCard
+import numpy as np
+from .gui_components import COLORS, StyledLabel, StyledButton, StyledGroupBox, DataCard
+from .telemetry import SAMPLE_INTERVALS, get_sampler, host_info
+from .metric_history import RingBuffer, Sparkline
+
+# psutil per-interface counters, the columns of InterfaceRates' matrix
+NIC_COUNTERS = ("bytes_sent", "bytes_recv", "packets_sent", "packets_recv",
+                "errin", "errout", "dropin", "dropout")
+# Seconds of throughput drawn under each interface
+NIC_HISTORY_SECONDS = 10 * 60
+
+_WRAP_32 = 2 ** 32
+
+def counter_deltas(previous, current):
+    """current - previous for arrays of counters, allowing for counters that went back.
+
+    A counter below its previous value either wrapped at 32 bits, as some
+    drivers' counters do, or was reset, e.g. when the interface was
+    re-created. A 32-bit counter that wraps was in its upper half before;
+    anything else is taken as a reset that counted up from zero.
+    """
+    deltas = current - previous
+    went_back = deltas < 0
+    if went_back.any():
+        wrapped = went_back & (previous >= _WRAP_32 // 2) & (previous < _WRAP_32)
+        deltas[wrapped] += _WRAP_32
+        reset = went_back & ~wrapped
+        deltas[reset] = current[reset]
+    return deltas
+
+def format_rate(bytes_per_second):
+    for unit in ("B/s", "KB/s", "MB/s"):
+        if bytes_per_second < 1024:
+            return f"{bytes_per_second:.1f} {unit}"
+        bytes_per_second /= 1024
+    return f"{bytes_per_second:.1f} GB/s"
+
+class InterfaceRates:
+    """Per-interface rates from successive nic_io samples.
+
+    Each sample's counters form one interfaces x NIC_COUNTERS matrix, so
+    the rates of every interface are a single vectorized subtraction and
+    division, however many virtual interfaces the host has. Sent and
+    received bytes/s are also kept in a RingBuffer per interface.
+    """
+
+    def __init__(self, history_seconds=NIC_HISTORY_SECONDS,
+                 interval=SAMPLE_INTERVALS["nic_io"]):
+        self.capacity = math.ceil(history_seconds / interval)
+        # Interface name -> row of counters
+        self.rows = {}
+        self.counters = None
+        self.taken_at = None
+        # Interface name -> per-second rate of each of NIC_COUNTERS, as of
+        # the last sample; interfaces seen for the first time have none yet
+        self.current = {}
+        # Interface name -> (sent, received) bytes/s history
+        self.history = {}
+
+    def update(self, taken_at, nic_counters):
+        names = [name for name, _ in nic_counters]
+        current = np.array([[getattr(counters, field) for field in NIC_COUNTERS]
+                            for _, counters in nic_counters],
+                           dtype=np.int64).reshape(len(names), len(NIC_COUNTERS))
+
+        rates = {}
+        # Two samples with the same time, e.g. a refresh right after a
+        # scheduled sample, give no rate
+        if self.counters is not None and taken_at > self.taken_at:
+            previous_rows = np.array([self.rows.get(name, -1) for name in names], dtype=np.int64)
+            known = np.flatnonzero(previous_rows >= 0)
+            per_second = counter_deltas(self.counters[previous_rows[known]],
+                                        current[known]) / (taken_at - self.taken_at)
+            for position, row in zip(known.tolist(), per_second):
+                rates[names[position]] = row
+
+        for name, row in rates.items():
+            if name not in self.history:
+                self.history[name] = (RingBuffer(self.capacity), RingBuffer(self.capacity))
+            sent, received = self.history[name]
+            sent.append(taken_at, row[0])
+            received.append(taken_at, row[1])
+        # Interfaces that went away take their history with them
+        present = set(names)
+        for name in [name for name in self.history if name not in present]:
+            del self.history[name]
+
+        self.current = rates
+        self.rows = {name: position for position, name in enumerate(names)}
+        self.counters = current
+        self.taken_at = taken_at
+
+def rate_lines(rates):
+    """The text lines shown for one interface's rates"""
+    rate = dict(zip(NIC_COUNTERS, rates.tolist()))
+    return (
+        f"Sent: {format_rate(rate['bytes_sent'])} | Received: {format_rate(rate['bytes_recv'])}",
+        f"Packets: {rate['packets_sent']:.0f}/s out, {rate['packets_recv']:.0f}/s in | "
+        f"Errors: {rate['errin'] + rate['errout']:.1f}/s | "
+        f"Drops: {rate['dropin'] + rate['dropout']:.1f}/s",
+    )
+
+def interface_lines(addrs, stats):
+    """The text lines shown for one interface"""
+    lines = []
+    for addr in addrs:
+        if addr.family == socket.AF_INET:
+            lines.append(f"IPv4: {addr.address}")
+        elif addr.family == socket.AF_INET6:
+            lines.append(f"IPv6: {addr.address}")
+    if stats is not None:
+        status = "Up" if stats.isup else "Down"
+        speed = f"{stats.speed} Mbps" if stats.speed > 0 else "Unknown"
+        lines.append(f"Status: {status} | Speed: {speed}")
+    return tuple(lines)
+
+class InterfaceBox(StyledGroupBox):
+    """One interface's addresses, link state and throughput, updated in place"""
+
+    def __init__(self, name):
+        super().__init__(name)
+        layout = QVBoxLayout()
+        self.lines_layout = QVBoxLayout()
+        layout.addLayout(self.lines_layout)
+        self.setLayout(layout)
+        self.labels = []
+        self.lines = ()
+        self.link_lines = ()
+        self.rate_lines = ()
+        # Sent and received sparklines, added with the first rates
+        self.sparklines = None
+
+    def show_link(self, lines):
+        self.link_lines = lines
+        self.show_lines(self.link_lines + self.rate_lines)
+
+    def show_rates(self, lines, sent, received):
+        self.rate_lines = lines
+        self.show_lines(self.link_lines + self.rate_lines)
+        if self.sparklines is None:
+            row = QHBoxLayout()
+            self.sparklines = []
+            for buffer, color, tooltip in ((sent, COLORS['warning'], "Sent"),
+                                           (received, COLORS['success'], "Received")):
+                sparkline = Sparkline(buffer, NIC_HISTORY_SECONDS, maximum=None, color=color)
+                sparkline.setToolTip(f"{tooltip}, last {NIC_HISTORY_SECONDS // 60} minutes")
+                row.addWidget(sparkline)
+                self.sparklines.append(sparkline)
+            self.layout().addLayout(row)
+        for sparkline in self.sparklines:
+            sparkline.update()
+
+    def show_lines(self, lines):
+        if lines == self.lines:
+            return
+        layout = self.lines_layout
+        # Labels are only created or dropped when the number of lines changes
+        while len(self.labels) < len(lines):
+            label = StyledLabel()
+            layout.addWidget(label)
+            self.labels.append(label)
+        while len(self.labels) > len(lines):
+            label = self.labels.pop()
+            layout.removeWidget(label)
+            label.deleteLater()
+        for label, text in zip(self.labels, lines):
+            if label.text() != text:
+                label.setText(text)
+        self.lines = lines
 
 class NetworkMonitor(QWidget):
     def __init__(self):
         super().__init__()
+        # One InterfaceBox per interface name, kept across updates
+        self.interface_boxes = {}
+        self.interface_rates = InterfaceRates()
         self.setup_ui()
         
     def setup_ui(self):
@@ -23,7 +194,7 @@ class NetworkMonitor(QWidget):
         
         self.sent_card = DataCard("Data Sent", "0 MB")
         self.recv_card = DataCard("Data Received", "0 MB")
-        self.hostname_card = DataCard("Hostname", socket.gethostname())
+        self.hostname_card = DataCard("Hostname", host_info().hostname)
         self.ip_card = DataCard("IP Address", "Loading...")
         
         for card in [self.hostname_card, self.ip_card, self.sent_card, self.recv_card]:
@@ -57,61 +228,51 @@ class NetworkMonitor(QWidget):
         
         self.setLayout(layout)
         
-        # Setup timer for auto-refresh
-        self.timer = QTimer()
-        self.timer.timeout.connect(self.update_network_info)
-        self.timer.start(2000)  # Update every 2 seconds
-        
-        # Initial update
-        self.update_network_info()
+        # The shared sampler polls these off the GUI thread and calls back
+        # with each new sample
+        self.sampler = get_sampler()
+        self.sampler.subscribe("primary_ip", self.update_primary_ip)
+        self.sampler.subscribe("net_io", self.update_io_stats)
+        self.sampler.subscribe("interfaces", self.update_interfaces)
+        self.sampler.subscribe("nic_io", self.update_rates)
     
     def update_network_info(self):
-        # Update hostname & IP
-        try:
-            primary_ip = socket.gethostbyname(socket.gethostname())
-            self.ip_card.update_value(primary_ip)
-        except socket.gaierror:
-            self.ip_card.update_value("Unavailable")
-        
-        # Update network I/O stats
-        net_io = psutil.net_io_counters()
+        self.sampler.refresh("primary_ip", "net_io", "interfaces", "nic_io")
+
+    def update_primary_ip(self, snapshot):
+        self.ip_card.update_value(snapshot.data or "Unavailable")
+
+    def update_io_stats(self, snapshot):
+        net_io = snapshot.data
         mb_sent = net_io.bytes_sent / (1024 ** 2)
         mb_recv = net_io.bytes_recv / (1024 ** 2)
         
         self.sent_card.update_value(f"{mb_sent:.2f} MB")
         self.recv_card.update_value(f"{mb_recv:.2f} MB")
-        
-        # Clear previous interface widgets
-        for i in reversed(range(self.interfaces_layout.count())): 
-            widget = self.interfaces_layout.itemAt(i).widget()
-            if widget:
-                widget.deleteLater()
-        
-        # Add interface information
-        for iface_name, addrs in psutil.net_if_addrs().items():
-            iface_group = StyledGroupBox(iface_name)
-            iface_layout = QVBoxLayout()
-            
-            for addr in addrs:
-                if addr.family == socket.AF_INET:
-                    addr_label = StyledLabel(f"IPv4: {addr.address}")
-                    iface_layout.addWidget(addr_label)
-                elif addr.family == socket.AF_INET6:
-                    addr_label = StyledLabel(f"IPv6: {addr.address}")
-                    iface_layout.addWidget(addr_label)
-            
-            # Get interface statistics
-            try:
-                stats = psutil.net_if_stats()[iface_name]
-                status = "Up" if stats.isup else "Down"
-                speed = f"{stats.speed} Mbps" if stats.speed > 0 else "Unknown"
-                stats_label = StyledLabel(f"Status: {status} | Speed: {speed}")
-                iface_layout.addWidget(stats_label)
-            except:
-                pass
-            
-            iface_group.setLayout(iface_layout)
-            self.interfaces_layout.addWidget(iface_group)
+
+    def update_interfaces(self, snapshot):
+        # Reconcile by interface name: boxes are only added or removed when
+        # interfaces come and go, and a box only touches labels whose text
+        # changed, so hosts with many virtual interfaces do not churn widgets
+        present = {name for name, _, _ in snapshot.data}
+        for name in [name for name in self.interface_boxes if name not in present]:
+            box = self.interface_boxes.pop(name)
+            self.interfaces_layout.removeWidget(box)
+            box.deleteLater()
+
+        for position, (iface_name, addrs, stats) in enumerate(snapshot.data):
+            box = self.interface_boxes.get(iface_name)
+            if box is None:
+                box = self.interface_boxes[iface_name] = InterfaceBox(iface_name)
+                self.interfaces_layout.insertWidget(position, box)
+            box.show_link(interface_lines(addrs, stats))
+
+    def update_rates(self, snapshot):
+        self.interface_rates.update(snapshot.taken_at, snapshot.data)
+        for name, rates in self.interface_rates.current.items():
+            box = self.interface_boxes.get(name)
+            if box is not None:
+                box.show_rates(rate_lines(rates), *self.interface_rates.history[name])
 
 def get_network_monitor_tab():
     return NetworkMonitor()
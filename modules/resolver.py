@@ -0,0 +1,111 @@
+import atexit
+import socket
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from loguru import logger
+
+# Lookups in flight at once; the rest queue behind them. An unresolvable
+# address holds its thread for a whole resolver timeout, so this sets how
+# many of those overlap; a scan's peers clear in a few rounds without a
+# thread per peer. Threads are only started while lookups are waiting, so
+# a quiet resolver keeps a handful.
+RESOLVER_WORKERS = 64
+# Seconds an answer is reused, and a failed lookup is not retried
+RESOLVE_TTL = 300
+NEGATIVE_TTL = 60
+# Answers remembered, least recently used dropped first
+MAX_ENTRIES = 4096
+
+
+def _reverse(address):
+    return socket.gethostbyaddr(address)[0]
+
+
+class Resolver:
+    """Cached DNS lookups that never block the caller.
+
+    reverse() and forward() return a Future holding the name or address,
+    or None when the lookup failed. Failures are cached too, for
+    NEGATIVE_TTL seconds, since an address without a PTR record fails
+    slowly every time. Concurrent requests for the same name share one
+    lookup, and lookups run RESOLVER_WORKERS at a time, so resolving a
+    scan's peers takes a few resolver timeouts instead of one per peer.
+    """
+
+    def __init__(self, max_workers=RESOLVER_WORKERS, ttl=RESOLVE_TTL,
+                 negative_ttl=NEGATIVE_TTL, max_entries=MAX_ENTRIES):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self.executor = ThreadPoolExecutor(max_workers=max_workers,
+                                           thread_name_prefix="resolver")
+        # (kind, name) -> (expires at, answer)
+        self.cache = OrderedDict()
+        self.pending = {}
+        self.lock = threading.Lock()
+
+    def reverse(self, address):
+        """Future of the host name for an IP address"""
+        return self._lookup("reverse", address, _reverse)
+
+    def forward(self, hostname):
+        """Future of the IPv4 address of a host name"""
+        return self._lookup("forward", hostname, socket.gethostbyname)
+
+    def _lookup(self, kind, name, function):
+        key = (kind, name)
+        with self.lock:
+            entry = self.cache.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self.cache.move_to_end(key)
+                future = Future()
+                future.set_result(entry[1])
+                return future
+            future = self.pending.get(key)
+            if future is None:
+                # Registered under the lock, so _resolve cannot finish and
+                # unregister it before it is here
+                future = self.pending[key] = self.executor.submit(
+                    self._resolve, key, function, name)
+            return future
+
+    def _resolve(self, key, function, name):
+        answer = None
+        ttl = self.negative_ttl
+        try:
+            answer = function(name)
+            ttl = self.ttl
+        except (OSError, UnicodeError):
+            # herror and gaierror are OSErrors; an IDNA failure is not
+            pass
+        except Exception as e:
+            logger.warning(f"Lookup of {name} failed unexpectedly: {str(e)}")
+        finally:
+            # Always unregistered, or later requests would wait on this
+            # lookup forever
+            with self.lock:
+                self.pending.pop(key, None)
+                self.cache[key] = (time.monotonic() + ttl, answer)
+                self.cache.move_to_end(key)
+                while len(self.cache) > self.max_entries:
+                    self.cache.popitem(last=False)
+        return answer
+
+    def close(self):
+        self.executor.shutdown(wait=False)
+
+
+_resolver = None
+_resolver_lock = threading.Lock()
+
+
+def get_resolver():
+    """The process-wide resolver, shared by every module"""
+    global _resolver
+    with _resolver_lock:
+        if _resolver is None:
+            _resolver = Resolver()
+            atexit.register(_resolver.close)
+        return _resolver
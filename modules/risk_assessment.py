@@ -1,5 +1,3 @@
-import psutil
-import platform
 import datetime
 from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, 
                             QTextEdit, QProgressBar)
@@ -7,6 +5,7 @@ from PyQt5.QtCore import QTimer, Qt
 from loguru import logger
 from .gui_components import (StyledLabel, StyledButton, StyledGroupBox, 
                            DataCard, COLORS)
+from .telemetry import get_sampler, host_info
 
 class RiskGauge(QProgressBar):
     def __init__(self):
@@ -60,6 +59,7 @@ class RiskAssessmentModule(QWidget):
         super().__init__()
         self.setup_ui()
         self.is_assessing = False
+        self.sampler = get_sampler()
         
     def setup_ui(self):
         layout = QVBoxLayout()
@@ -145,7 +145,9 @@ class RiskAssessmentModule(QWidget):
         self.result_box.clear()
         self.issues_card.update_value("0")
         self.log_message("Starting risk assessment...", "info")
-        self.run_assessment()
+        # Assessed on fresh samples, collected off the GUI thread
+        self.sampler.refresh("memory", "processes", "connections", "cpu",
+                             callback=self.run_assessment)
         
     def stop_assessment(self):
         self.is_assessing = False
@@ -165,12 +167,16 @@ class RiskAssessmentModule(QWidget):
         """)
         
     def run_assessment(self):
+        if not self.is_assessing:
+            # Stopped while the samples were being collected
+            return
         score = 0
         max_score = 8  # Maximum possible risk score
         issues = 0
         
         # System uptime assessment
-        uptime = datetime.datetime.now() - datetime.datetime.fromtimestamp(psutil.boot_time())
+        host = host_info()
+        uptime = datetime.datetime.now() - datetime.datetime.fromtimestamp(host.boot_time)
         self.log_message(f"System Uptime: {uptime}", "info")
         
         if uptime.total_seconds() > 7 * 24 * 60 * 60:  # 7 days
@@ -179,30 +185,30 @@ class RiskAssessmentModule(QWidget):
             self.log_message("High uptime without reboot - System may be missing critical updates", "warning")
             
         # OS version assessment
-        os_info = f"{platform.system()} {platform.release()}"
-        self.log_message(f"Operating System: {os_info}", "info")
+        self.log_message(f"Operating System: {host.os}", "info")
         
         # Memory usage assessment
-        mem = psutil.virtual_memory()
-        self.log_message(f"Memory Usage: {mem.percent}%", "info")
-        
-        if mem.percent > 90:
-            score += 2
-            issues += 1
-            self.log_message("Critical memory usage - System stability at risk", "error")
-        elif mem.percent > 80:
-            score += 1
-            issues += 1
-            self.log_message("High memory usage detected", "warning")
+        mem = self.sampler.latest_data("memory")
+        if mem is None:
+            # The memory sample failed; assess the rest
+            self.log_message("Memory Usage: unavailable", "warning")
+        else:
+            self.log_message(f"Memory Usage: {mem.percent}%", "info")
+
+            if mem.percent > 90:
+                score += 2
+                issues += 1
+                self.log_message("Critical memory usage - System stability at risk", "error")
+            elif mem.percent > 80:
+                score += 1
+                issues += 1
+                self.log_message("High memory usage detected", "warning")
             
         # Process assessment
         high_mem_processes = 0
-        for proc in psutil.process_iter(['name', 'memory_info']):
-            try:
-                if proc.info['memory_info'].rss / (1024 * 1024) > 500:  # 500MB
-                    high_mem_processes += 1
-            except:
-                continue
+        for proc in self.sampler.latest_data("processes", ()):
+            if proc.rss is not None and proc.rss / (1024 * 1024) > 500:  # 500MB
+                high_mem_processes += 1
                 
         self.log_message(f"High Memory Processes: {high_mem_processes}", "info")
         if high_mem_processes > 5:
@@ -212,7 +218,7 @@ class RiskAssessmentModule(QWidget):
             
         # Network assessment
         ext_conn = 0
-        for conn in psutil.net_connections(kind='inet'):
+        for conn in self.sampler.latest_data("connections", ()):
             if (conn.status == 'ESTABLISHED' and conn.raddr and 
                 not conn.raddr.ip.startswith(("192.168.", "127.0.0.1", "10."))):
                 ext_conn += 1
@@ -228,7 +234,7 @@ class RiskAssessmentModule(QWidget):
             self.log_message("Multiple external connections detected", "warning")
             
         # CPU usage assessment
-        cpu_percent = psutil.cpu_percent()
+        cpu_percent = self.sampler.latest_data("cpu", 0.0)
         self.log_message(f"CPU Usage: {cpu_percent}%", "info")
         
         if cpu_percent > 90:
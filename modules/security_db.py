@@ -1,24 +1,163 @@
-import mysql.connector
-from mysql.connector import Error
-
-def get_connection():
-    return mysql.connector.connect(
-        host="localhost",
-        user="root",
-        password="CenaVsPunk2011!",
-        database="security_app_db"
-    )
-
-def save_incident_log(incident_text):
-    try:
-        conn = get_connection()
-        cursor = conn.cursor()
-        query = "INSERT INTO incident_logs (incident) VALUES (%s)"
-        cursor.execute(query, (incident_text,))
-        conn.commit()
-        cursor.close()
-        conn.close()
-        return True
-    except Error as e:
-        print(f"[DB ERROR] {e}")
-        return False
+import atexit
+import threading
+import time
+from loguru import logger
+from . import incident_db
+from .incident_store import get_store, IncidentStoreError
+
+# Rows written per INSERT, and the most that wait before a flush is forced
+BUFFER_SIZE = 500
+# Seconds a logged row may wait for the buffer to fill before it is written
+FLUSH_INTERVAL = 1.0
+# Rows kept while the database is unreachable; the oldest go first
+MAX_BUFFERED = 50000
+
+# Transient failures are retried, with backoff
+MAX_RETRIES = 3
+RETRY_DELAY = 0.5
+
+# What became of a batch handed to IncidentLogWriter.write
+WRITTEN = "written"
+# The database refused it; the rows are dropped and counted
+REJECTED = "rejected"
+# The database could not be reached; the rows stay buffered
+UNREACHABLE = "unreachable"
+
+
+class IncidentLogWriter:
+    """Buffers incident log lines and writes them to the store in batches.
+
+    A background thread flushes when BUFFER_SIZE rows are waiting or the
+    oldest has waited FLUSH_INTERVAL seconds, each batch through one
+    insert_log_entries call. Rows are stamped when they are logged, not
+    when they are written. A batch the database refuses is dropped, so it
+    does not hold up the rows behind it, and counted in rejected. close()
+    writes whatever is left and reports what never made it.
+    """
+
+    def __init__(self, store=None, buffer_size=BUFFER_SIZE, flush_interval=FLUSH_INTERVAL):
+        self.store = store or get_store()
+        self.buffer_size = buffer_size
+        self.flush_interval = flush_interval
+        self.rows = []
+        self.rejected = 0
+        self.first_buffered = None
+        self.closed = False
+        self.lock = threading.Lock()
+        self.wake = threading.Condition(self.lock)
+        # Held while writing, so flush() from a caller never writes batches
+        # out of order with the background thread
+        self.write_lock = threading.Lock()
+        self.thread = threading.Thread(target=self.run, name="incident-log-writer", daemon=True)
+        self.thread.start()
+
+    def log(self, incident_text):
+        with self.lock:
+            if self.closed:
+                raise RuntimeError("Incident log writer is closed")
+            first = not self.rows
+            if first:
+                self.first_buffered = time.monotonic()
+            self.rows.append((incident_text, incident_db.now_timestamp()))
+            if len(self.rows) > MAX_BUFFERED:
+                dropped = len(self.rows) - MAX_BUFFERED
+                del self.rows[:dropped]
+                logger.warning(f"Incident log buffer full, dropped {dropped} oldest rows")
+            # The first row starts the flush interval the thread waits out;
+            # a full buffer cuts it short
+            if first or len(self.rows) >= self.buffer_size:
+                self.wake.notify()
+
+    def flush(self):
+        """Write every buffered row now; returns False if some were rejected or are still waiting"""
+        written = True
+        with self.write_lock:
+            with self.lock:
+                rows, self.rows = self.rows, []
+            for start in range(0, len(rows), self.buffer_size):
+                batch = rows[start:start + self.buffer_size]
+                result = self.write(batch)
+                if result == REJECTED:
+                    with self.lock:
+                        self.rejected += len(batch)
+                    written = False
+                elif result == UNREACHABLE:
+                    # Keep what is left for the next flush, ahead of newer rows
+                    with self.lock:
+                        self.rows[:0] = rows[start:]
+                        self.first_buffered = time.monotonic()
+                    return False
+        return written
+
+    def write(self, batch):
+        """Insert one batch; returns WRITTEN, REJECTED or UNREACHABLE"""
+        for attempt in range(MAX_RETRIES + 1):
+            try:
+                self.store.insert_log_entries(batch)
+                return WRITTEN
+            except IncidentStoreError as e:
+                if not e.transient:
+                    logger.error(f"Dropped {len(batch)} incident log rows the database rejected: {e}")
+                    return REJECTED
+                if attempt == MAX_RETRIES:
+                    logger.error(f"Failed to write {len(batch)} incident log rows: {e}")
+                    return UNREACHABLE
+                time.sleep(RETRY_DELAY * 2 ** attempt)
+
+    def waiting(self):
+        with self.lock:
+            return len(self.rows)
+
+    def run(self):
+        while True:
+            with self.lock:
+                while not self.closed:
+                    if len(self.rows) >= self.buffer_size:
+                        break
+                    if self.rows:
+                        remaining = self.first_buffered + self.flush_interval - time.monotonic()
+                        if remaining <= 0:
+                            break
+                        self.wake.wait(remaining)
+                    else:
+                        self.wake.wait()
+                closed = self.closed
+            if closed:
+                return
+            if not self.flush() and self.waiting():
+                # The database is unreachable; wait before trying again
+                time.sleep(self.flush_interval)
+
+    def close(self, timeout=None):
+        """Stop the thread and write what is left; returns the number of rows never written"""
+        with self.lock:
+            if self.closed:
+                return 0
+            self.closed = True
+            self.wake.notify()
+        self.thread.join(timeout)
+        self.flush()
+        with self.lock:
+            lost = self.rejected + len(self.rows)
+            if lost:
+                logger.warning(f"Incident log writer closed with {len(self.rows)} rows unwritten "
+                               f"and {self.rejected} rejected")
+            return lost
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_incident_log_writer():
+    """The process-wide writer, started on first use and flushed at exit.
+
+    Producers call get_incident_log_writer().log(text); the Incident Log
+    Viewer reads the lines back through the store.
+    """
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = IncidentLogWriter()
+            atexit.register(_writer.close)
+        return _writer
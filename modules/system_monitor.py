@@ -1,8 +1,23 @@
 import psutil
-from PyQt5.QtWidgets import QWidget, QVBoxLayout, QGridLayout, QHBoxLayout
-from PyQt5.QtCore import QTimer, Qt, QRectF
+from PyQt5.QtWidgets import QWidget, QVBoxLayout, QGridLayout, QHBoxLayout, QComboBox
+from PyQt5.QtCore import Qt, QRectF, QTimer
 from PyQt5.QtGui import QPainter, QPen, QFont
 from .gui_components import COLORS, StyledGroupBox, StyledLabel, DataCard
+from .telemetry import get_sampler, host_info
+from .metric_history import get_history, Sparkline, HistoryChart
+
+# Windows offered by the history chart, in seconds
+HISTORY_RANGES = {
+    "Last 5 minutes": 5 * 60,
+    "Last hour": 60 * 60,
+    "Last 24 hours": 24 * 60 * 60,
+}
+HISTORY_METRICS = {
+    "CPU": "cpu",
+    "Memory": "memory",
+    "Disk": "disk",
+    "Battery": "battery",
+}
 
 class CircularProgress(QWidget):
     def __init__(self, label_text, parent=None):
@@ -71,6 +86,9 @@ def get_system_monitor_tab():
     grid = QGridLayout()
     grid.setSpacing(20)
 
+    # Every gauge has a sparkline of its last five minutes underneath
+    history = get_history()
+
     # Create widgets
     cpu_widget = CircularProgress("CPU Usage")
     ram_widget = CircularProgress("RAM Usage")
@@ -81,21 +99,29 @@ def get_system_monitor_tab():
     cpu_group = StyledGroupBox("CPU Status")
     cpu_layout = QVBoxLayout()
     cpu_layout.addWidget(cpu_widget, alignment=Qt.AlignCenter)
+    cpu_sparkline = Sparkline(history['cpu'])
+    cpu_layout.addWidget(cpu_sparkline)
     cpu_group.setLayout(cpu_layout)
 
     ram_group = StyledGroupBox("Memory Status")
     ram_layout = QVBoxLayout()
     ram_layout.addWidget(ram_widget, alignment=Qt.AlignCenter)
+    ram_sparkline = Sparkline(history['memory'])
+    ram_layout.addWidget(ram_sparkline)
     ram_group.setLayout(ram_layout)
 
     disk_group = StyledGroupBox("Storage Status")
     disk_layout = QVBoxLayout()
     disk_layout.addWidget(disk_widget, alignment=Qt.AlignCenter)
+    disk_sparkline = Sparkline(history['disk'])
+    disk_layout.addWidget(disk_sparkline)
     disk_group.setLayout(disk_layout)
 
     battery_group = StyledGroupBox("Power Status")
     battery_layout = QVBoxLayout()
     battery_layout.addWidget(battery_widget, alignment=Qt.AlignCenter)
+    battery_sparkline = Sparkline(history['battery'])
+    battery_layout.addWidget(battery_sparkline)
     battery_group.setLayout(battery_layout)
 
     # Add groups to grid
@@ -116,42 +142,73 @@ def get_system_monitor_tab():
         pass
     
     # Memory Details card
-    mem = psutil.virtual_memory()
-    mem_total = f"{mem.total / (1024**3):.1f} GB"
+    host = host_info()
+    mem_total = f"{host.memory_total / (1024**3):.1f} GB"
     mem_card = DataCard("Total Memory", mem_total)
     stats_layout.addWidget(mem_card)
     
     # Disk Details card
-    disk = psutil.disk_usage('/')
-    disk_total = f"{disk.total / (1024**3):.1f} GB"
+    disk_total = f"{host.disk_total / (1024**3):.1f} GB"
     disk_card = DataCard("Total Storage", disk_total)
     stats_layout.addWidget(disk_card)
 
+    # History of one metric over a longer window
+    history_group = StyledGroupBox("History")
+    history_layout = QVBoxLayout()
+    controls = QHBoxLayout()
+    metric_combo = QComboBox()
+    metric_combo.addItems(HISTORY_METRICS)
+    range_combo = QComboBox()
+    range_combo.addItems(HISTORY_RANGES)
+    range_combo.setCurrentText("Last hour")
+    history_stats = StyledLabel("")
+    controls.addWidget(metric_combo)
+    controls.addWidget(range_combo)
+    controls.addWidget(history_stats, 1)
+    history_layout.addLayout(controls)
+    history_chart = HistoryChart(history['cpu'])
+    history_layout.addWidget(history_chart)
+    history_group.setLayout(history_layout)
+
+    def update_history():
+        buffer = history[HISTORY_METRICS[metric_combo.currentText()]]
+        seconds = HISTORY_RANGES[range_combo.currentText()]
+        history_chart.set_buffer(buffer)
+        history_chart.set_seconds(seconds)
+        stats = buffer.stats(seconds)
+        if stats is None:
+            history_stats.setText("No samples yet")
+        else:
+            history_stats.setText(f"Min {stats.minimum:.1f}%   Mean {stats.mean:.1f}%   "
+                                  f"95th {stats.p95:.1f}%   Max {stats.maximum:.1f}%")
+
+    metric_combo.currentTextChanged.connect(update_history)
+    range_combo.currentTextChanged.connect(update_history)
+    history_timer = QTimer(tab)
+    history_timer.timeout.connect(update_history)
+    history_timer.start(2000)
+    update_history()
+
     main_layout.addLayout(grid)
     main_layout.addLayout(stats_layout)
+    main_layout.addWidget(history_group, 1)
     tab.setLayout(main_layout)
 
-    def update_stats():
-        cpu = psutil.cpu_percent()
-        ram = psutil.virtual_memory().percent
-        disk = psutil.disk_usage('/').percent
-        battery = psutil.sensors_battery()
-        
-        cpu_widget.setValue(cpu)
-        ram_widget.setValue(ram)
-        disk_widget.setValue(disk)
-        
-        if battery:
-            battery_widget.setValue(battery.percent)
-        else:
-            battery_widget.setValue(0)
-
-    # Update every 1.5 seconds
-    timer = QTimer()
-    timer.timeout.connect(update_stats)
-    timer.start(1500)
-
-    # Initial update
-    update_stats()
+    # Sampled off the GUI thread by the shared sampler, each at its own
+    # interval; the gauges just show what arrives and the sparklines repaint
+    # from the history, which recorded the sample before these run
+    sampler = get_sampler()
+
+    def show(gauge, sparkline, value):
+        gauge.setValue(value)
+        sparkline.update()
+
+    sampler.subscribe("cpu", lambda snapshot: show(cpu_widget, cpu_sparkline, snapshot.data))
+    sampler.subscribe("memory", lambda snapshot: show(ram_widget, ram_sparkline,
+                                                      snapshot.data.percent))
+    sampler.subscribe("disk", lambda snapshot: show(disk_widget, disk_sparkline,
+                                                    snapshot.data.percent))
+    sampler.subscribe("battery", lambda snapshot: show(
+        battery_widget, battery_sparkline, snapshot.data.percent if snapshot.data else 0))
 
     return tab
@@ -0,0 +1,250 @@
+import atexit
+import functools
+import platform
+import socket
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import TimeoutError as FutureTimeout
+import psutil
+from PyQt5.QtCore import QObject, pyqtSignal
+from loguru import logger
+from .resolver import get_resolver
+
+# Seconds between samples of each source while some tab subscribes to it
+SAMPLE_INTERVALS = {
+    "cpu": 1.5,
+    "memory": 1.5,
+    "disk": 5.0,
+    "battery": 30.0,
+    "net_io": 2.0,
+    "nic_io": 2.0,
+    "interfaces": 5.0,
+    "primary_ip": 30.0,
+    "processes": 5.0,
+    "connections": 5.0,
+    "partitions": 30.0,
+    "users": 30.0,
+}
+
+# One sample of one source. data is immutable: a psutil named tuple, a
+# tuple of the records below, or a plain value.
+Snapshot = namedtuple("Snapshot", "source taken_at data")
+
+ProcessInfo = namedtuple("ProcessInfo", "pid name rss username exe")
+InterfaceInfo = namedtuple("InterfaceInfo", "name addresses stats")
+PartitionInfo = namedtuple("PartitionInfo", "device mountpoint opts usage")
+
+# Returned by a source with nothing new yet; subscribers keep the last sample
+PENDING = object()
+# Seconds the sampler waits on a host name lookup before moving on
+LOOKUP_WAIT = 0.5
+
+HostInfo = namedtuple("HostInfo", "hostname os architecture cpu_count cpu_freq memory_total "
+                                  "disk_total boot_time")
+
+
+@functools.lru_cache(maxsize=None)
+def host_info():
+    """Facts about the machine that do not change while the app runs"""
+    cpu_freq = psutil.cpu_freq()
+    return HostInfo(
+        hostname=socket.gethostname(),
+        os=f"{platform.system()} {platform.release()}",
+        architecture=platform.machine(),
+        cpu_count=psutil.cpu_count(logical=True),
+        cpu_freq=cpu_freq.current if cpu_freq else None,
+        memory_total=psutil.virtual_memory().total,
+        disk_total=psutil.disk_usage('/').total,
+        boot_time=psutil.boot_time(),
+    )
+
+
+def _primary_ip():
+    # Through the shared resolver, so the answer is cached between samples;
+    # a slow lookup finishes in the background instead of holding up the
+    # other sources, and is picked up by a later sample
+    try:
+        return get_resolver().forward(socket.gethostname()).result(timeout=LOOKUP_WAIT)
+    except FutureTimeout:
+        return PENDING
+
+
+def _processes():
+    processes = []
+    for proc in psutil.process_iter(['pid', 'name', 'memory_info', 'username', 'exe']):
+        info = proc.info
+        memory = info['memory_info']
+        processes.append(ProcessInfo(info['pid'], info['name'], memory.rss if memory else None,
+                                     info['username'], info['exe']))
+    return tuple(processes)
+
+
+def _interfaces():
+    stats = psutil.net_if_stats()
+    return tuple(InterfaceInfo(name, tuple(addresses), stats.get(name))
+                 for name, addresses in psutil.net_if_addrs().items())
+
+
+def _partitions():
+    partitions = []
+    for partition in psutil.disk_partitions():
+        try:
+            usage = psutil.disk_usage(partition.mountpoint)
+        except OSError:
+            # Empty drives and mounts we may not read
+            usage = None
+        partitions.append(PartitionInfo(partition.device, partition.mountpoint, partition.opts,
+                                        usage))
+    return tuple(partitions)
+
+
+SOURCES = {
+    "cpu": lambda: psutil.cpu_percent(),
+    "memory": psutil.virtual_memory,
+    "disk": lambda: psutil.disk_usage('/'),
+    "battery": psutil.sensors_battery,
+    "net_io": psutil.net_io_counters,
+    # (interface name, counters) pairs
+    "nic_io": lambda: tuple(psutil.net_io_counters(pernic=True).items()),
+    "interfaces": _interfaces,
+    "primary_ip": _primary_ip,
+    "processes": _processes,
+    "connections": lambda: tuple(psutil.net_connections(kind='inet')),
+    "partitions": _partitions,
+    "users": lambda: tuple(psutil.users()),
+}
+
+
+class TelemetrySampler(QObject):
+    """One background thread that samples host telemetry for every tab.
+
+    Tabs subscribe to the sources they display; each subscribed source is
+    sampled at its own interval and the callbacks receive the Snapshot on
+    the GUI thread. Code that needs data now, like a scan, calls refresh()
+    and gets called back once fresh samples are in. Sampling once for all
+    tabs also keeps cpu_percent() meaningful: every call measures from the
+    previous one, so several callers used to shorten each other's window.
+    """
+
+    # Emitted on the sampler thread; queued to the GUI thread's slots
+    sampled = pyqtSignal(object)
+    refreshed = pyqtSignal(object)
+
+    def __init__(self, intervals=None):
+        super().__init__()
+        self.intervals = dict(SAMPLE_INTERVALS, **(intervals or {}))
+        self.subscribers = {}
+        self.latest_snapshots = {}
+        self.due = {}
+        self.requests = []
+        self.stopping = False
+        self.condition = threading.Condition()
+        self.thread = threading.Thread(target=self.run, name="telemetry-sampler", daemon=True)
+        self.sampled.connect(self._dispatch)
+        self.refreshed.connect(lambda callback: callback())
+
+    def start(self):
+        # cpu_percent() compares against the previous call; the first
+        # sample should already cover a real interval
+        psutil.cpu_percent()
+        self.thread.start()
+
+    def stop(self, timeout=None):
+        with self.condition:
+            self.stopping = True
+            self.condition.notify()
+        if self.thread.is_alive():
+            self.thread.join(timeout)
+
+    def subscribe(self, source, callback):
+        """Call callback(snapshot) on the GUI thread with every sample of source"""
+        if source not in SOURCES:
+            raise ValueError(f"Unknown telemetry source: {source}")
+        with self.condition:
+            self.subscribers.setdefault(source, []).append(callback)
+            # First subscriber: sample right away instead of at the interval
+            self.due.setdefault(source, 0)
+            self.condition.notify()
+
+    def latest(self, source):
+        """The most recent Snapshot of source, or None if it was never sampled"""
+        with self.condition:
+            return self.latest_snapshots.get(source)
+
+    def latest_data(self, source, default=None):
+        snapshot = self.latest(source)
+        return default if snapshot is None else snapshot.data
+
+    def refresh(self, *sources, callback=None):
+        """Sample sources now; callback() runs on the GUI thread once they are in"""
+        unknown = [source for source in sources if source not in SOURCES]
+        if unknown:
+            raise ValueError(f"Unknown telemetry source: {', '.join(unknown)}")
+        with self.condition:
+            self.requests.append((sources, callback))
+            self.condition.notify()
+
+    def _dispatch(self, snapshot):
+        for callback in list(self.subscribers.get(snapshot.source, ())):
+            try:
+                callback(snapshot)
+            except Exception as e:
+                logger.error(f"Telemetry subscriber for {snapshot.source} failed: {str(e)}")
+
+    def _sample(self, source):
+        try:
+            data = SOURCES[source]()
+        except Exception as e:
+            # One failing metric must not stop the thread sampling the rest
+            logger.error(f"Failed to sample {source}: {str(e)}")
+            return
+        if data is PENDING:
+            return
+        snapshot = Snapshot(source, time.time(), data)
+        with self.condition:
+            self.latest_snapshots[source] = snapshot
+        self.sampled.emit(snapshot)
+
+    def run(self):
+        while True:
+            with self.condition:
+                while True:
+                    if self.stopping:
+                        return
+                    now = time.monotonic()
+                    due = [source for source, at in self.due.items() if at <= now]
+                    if due or self.requests:
+                        break
+                    wait = min(self.due.values()) - now if self.due else None
+                    self.condition.wait(wait)
+                requests, self.requests = self.requests, []
+                for source in due:
+                    self.due[source] = now + self.intervals[source]
+
+            sources = set(due)
+            for requested, _ in requests:
+                sources.update(requested)
+            for source in sources:
+                self._sample(source)
+            for _, callback in requests:
+                if callback is not None:
+                    self.refreshed.emit(callback)
+
+
+_sampler = None
+_sampler_lock = threading.Lock()
+
+
+def get_sampler():
+    """The process-wide sampler, started on first use and stopped at exit.
+
+    Create it from the GUI thread, after the QApplication.
+    """
+    global _sampler
+    with _sampler_lock:
+        if _sampler is None:
+            _sampler = TelemetrySampler()
+            _sampler.start()
+            atexit.register(_sampler.stop, 5)
+        return _sampler
@@ -1,18 +1,39 @@
-import psutil
-import socket
 from datetime import datetime
 from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, 
-                            QTextEdit, QProgressBar)
-from PyQt5.QtCore import QTimer, Qt
+                            QTextEdit, QProgressBar, QCheckBox)
+from PyQt5.QtCore import QTimer, Qt, QObject, pyqtSignal
 from loguru import logger
 from .gui_components import (StyledLabel, StyledButton, StyledGroupBox, 
                            DataCard, COLORS)
+from .incident_store import get_store
+from .incident_dedup import IncidentDeduplicator, fingerprint
+from .telemetry import get_sampler
+from .resolver import get_resolver
+
+# Source recorded in the fingerprint of every finding raised by a scan
+SCAN_SOURCE = "threat_scan"
+
+class ScanSignals(QObject):
+    """Carries resolver results back to the GUI thread"""
+    # (ip, port) once the reverse lookup of an external peer has finished
+    peer_resolved = pyqtSignal(str, int)
 
 class ThreatDetectionModule(QWidget):
     def __init__(self):
         super().__init__()
         self.setup_ui()
         self.is_scanning = False
+        # With "Record findings as incidents" checked, findings become
+        # incidents, one per fingerprint however often they repeat. findings
+        # holds this scan's sightings per fingerprint either way.
+        self.deduplicator = None
+        self.findings = {}
+        self.sampler = get_sampler()
+        # Reverse lookups of this scan's external peers, by (ip, port)
+        self.resolver = get_resolver()
+        self.pending_peers = {}
+        self.scan_signals = ScanSignals()
+        self.scan_signals.peer_resolved.connect(self.on_peer_resolved)
         
     def setup_ui(self):
         layout = QVBoxLayout()
@@ -62,6 +83,11 @@ class ThreatDetectionModule(QWidget):
         self.start_button = StyledButton("Start Threat Scan")
         self.start_button.clicked.connect(self.toggle_scan)
         buttons_layout.addWidget(self.start_button)
+
+        # Off by default: a scan only reports what it finds
+        self.record_checkbox = QCheckBox("Record findings as incidents")
+        self.record_checkbox.setStyleSheet("color: #FFFFFF;")
+        buttons_layout.addWidget(self.record_checkbox)
         
         scan_layout.addLayout(buttons_layout)
         scan_group.setLayout(scan_layout)
@@ -117,9 +143,15 @@ class ThreatDetectionModule(QWidget):
         """)
         
         self.result_box.clear()
+        self.findings = {}
+        self.pending_peers = {}
+        self.threats_card.update_value("0")
         self.progress = 0
         self.progress_bar.setValue(0)
         self.scan_timer.start(100)
+        # Fresh samples for the scan steps, taken off the GUI thread long
+        # before the first step reads them
+        self.sampler.refresh("processes", "connections", "cpu", "memory")
         self.log_message("Starting threat scan...", "info")
         
     def stop_scan(self):
@@ -162,20 +194,21 @@ class ThreatDetectionModule(QWidget):
         suspicious_count = 0
         process_count = 0
         
-        for proc in psutil.process_iter(['pid', 'name', 'memory_info']):
-            try:
-                mem = proc.info['memory_info'].rss / (1024 * 1024)  # MB
-                name = proc.info['name']
-                process_count += 1
-                
-                if mem > 500:  # High memory usage threshold
-                    suspicious_count += 1
-                    self.log_message(
-                        f"High memory usage detected: {name} ({mem:.2f} MB)", 
-                        "warning"
-                    )
-            except (psutil.NoSuchProcess, psutil.AccessDenied):
+        for proc in self.sampler.latest_data("processes", ()):
+            if proc.rss is None:
+                # Not ours to inspect
                 continue
+            mem = proc.rss / (1024 * 1024)  # MB
+            name = proc.name
+            process_count += 1
+            
+            if mem > 500:  # High memory usage threshold
+                suspicious_count += 1
+                self.report_finding(
+                    "process_memory", name, "Medium",
+                    f"High memory usage: {name}",
+                    f"High memory usage detected: {name} ({mem:.2f} MB)"
+                )
 
         self.processes_card.update_value(str(process_count))
         return suspicious_count
@@ -184,45 +217,86 @@ class ThreatDetectionModule(QWidget):
         connection_count = 0
         suspicious_count = 0
         
-        for conn in psutil.net_connections(kind='inet'):
+        for conn in self.sampler.latest_data("connections", ()):
             if conn.status == 'ESTABLISHED' and conn.raddr:
                 connection_count += 1
                 ip, port = conn.raddr
                 
                 if not ip.startswith(("192.168.", "127.0.0.1", "10.")):
                     suspicious_count += 1
-                    try:
-                        hostname = socket.gethostbyaddr(ip)[0]
-                    except:
-                        hostname = "Unknown"
-                    self.log_message(
-                        f"External connection detected: {ip}:{port} ({hostname})", 
-                        "warning"
-                    )
+                    if (ip, port) in self.pending_peers:
+                        continue
+                    # All peers are looked up at once; each is reported when
+                    # its name comes back, or unnamed when the scan completes
+                    future = self.resolver.reverse(ip)
+                    self.pending_peers[(ip, port)] = future
+                    future.add_done_callback(
+                        lambda done, ip=ip, port=port:
+                            self.scan_signals.peer_resolved.emit(ip, port))
                     
         self.connections_card.update_value(str(connection_count))
         return suspicious_count
+
+    def on_peer_resolved(self, ip, port):
+        future = self.pending_peers.get((ip, port))
+        if future is None or not future.done():
+            # Already reported when the scan completed, or a lookup left over
+            # from an earlier scan
+            return
+        del self.pending_peers[(ip, port)]
+        self.report_connection(ip, port, future.result() or "Unknown")
+
+    def report_connection(self, ip, port, hostname):
+        self.report_finding(
+            "external_connection", f"{ip}:{port}", "Medium",
+            f"External connection: {ip}:{port}",
+            f"External connection detected: {ip}:{port} ({hostname})"
+        )
         
     def scan_system(self):
         # Simulate system scan findings
         suspicious_count = 0
         
         # CPU usage check
-        cpu_percent = psutil.cpu_percent()
+        cpu_percent = self.sampler.latest_data("cpu", 0.0)
         if cpu_percent > 90:
             suspicious_count += 1
-            self.log_message(f"High CPU usage detected: {cpu_percent}%", "warning")
+            self.report_finding("system_cpu", "system", "High", "High CPU usage",
+                                f"High CPU usage detected: {cpu_percent}%")
             
         # Memory usage check
-        mem = psutil.virtual_memory()
-        if mem.percent > 90:
+        mem = self.sampler.latest_data("memory")
+        if mem is not None and mem.percent > 90:
             suspicious_count += 1
-            self.log_message(f"High memory usage detected: {mem.percent}%", "warning")
+            self.report_finding("system_memory", "system", "High", "High memory usage",
+                                f"High memory usage detected: {mem.percent}%")
             
         return suspicious_count
         
+    def report_finding(self, rule, entity, severity, subject, message):
+        """Show a finding once per scan, and record it as an incident if asked to"""
+        key = fingerprint(SCAN_SOURCE, rule, entity)
+        sightings = self.findings.get(key, 0) + 1
+        self.findings[key] = sightings
+        if self.record_checkbox.isChecked():
+            if self.deduplicator is None:
+                self.deduplicator = IncidentDeduplicator(get_store())
+            try:
+                self.deduplicator.record(SCAN_SOURCE, rule, entity, severity, subject, message)
+            except RuntimeError as e:
+                logger.error(f"Failed to record finding: {str(e)}")
+        if sightings == 1:
+            self.log_message(message, "warning")
+            self.threats_card.update_value(str(len(self.findings)))
+
     def complete_scan(self):
-        total_threats = int(self.threats_card.value_label.text())
+        # Peers whose names are still being looked up are reported without
+        # one, so a slow resolver cannot hold the scan open
+        for ip, port in list(self.pending_peers):
+            self.report_connection(ip, port, "Unknown")
+        self.pending_peers.clear()
+
+        total_threats = len(self.findings)
         self.last_scan_card.update_value(datetime.now().strftime("%H:%M:%S"))
         
         if total_threats == 0:
@@ -247,11 +321,6 @@ class ThreatDetectionModule(QWidget):
         html_message = f'<span style="color: {color}">[{timestamp}] {message}</span><br>'
         self.result_box.insertHtml(html_message)
         
-        # Update threat count for warnings and errors
-        if level in ["warning", "error"]:
-            current_threats = int(self.threats_card.value_label.text())
-            self.threats_card.update_value(str(current_threats + 1))
-        
         # Log to file
         getattr(logger, level)(message)
 
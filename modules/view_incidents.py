@@ -1,7 +1,9 @@
 from PyQt5.QtWidgets import QWidget, QVBoxLayout, QTextEdit, QLabel
 from loguru import logger
-import mysql.connector
-from mysql.connector import Error
+from .incident_store import get_store, IncidentStoreError
+
+# Newest log lines shown when the tab opens
+VIEWER_LIMIT = 200
 
 def get_incident_log_tab():
     tab = QWidget()
@@ -15,30 +17,18 @@ def get_incident_log_tab():
     layout.addWidget(result_box)
 
     try:
-        connection = mysql.connector.connect(
-            host="localhost",
-            user="root",
-            password="CenaVsPunk2011!",  # Replace with your real password
-            database="security_app_db"
-        )
-        if connection.is_connected():
-            cursor = connection.cursor()
-            cursor.execute("SELECT id, severity, description, timestamp FROM incident_logs ORDER BY timestamp DESC")
-            rows = cursor.fetchall()
+        # What security_db's incident log writer has written
+        rows, _ = get_store().query_log_page(limit=VIEWER_LIMIT)
 
-            if rows:
-                for row in rows:
-                    id, severity, description, timestamp = row
-                    result_box.append(f"[{timestamp}] {severity} - {description}")
-            else:
-                result_box.append("No incidents logged yet.")
-    except Error as e:
+        if rows:
+            for row in rows:
+                id, logged_at, incident = row
+                result_box.append(f"[{logged_at}] {incident}")
+        else:
+            result_box.append("No incidents logged yet.")
+    except IncidentStoreError as e:
         logger.error(f"Database error: {e}")
         result_box.append(f"[!] Failed to load incidents: {e}")
-    finally:
-        if 'connection' in locals() and connection.is_connected():
-            cursor.close()
-            connection.close()
 
     tab.setLayout(layout)
     return tab
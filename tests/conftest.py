@@ -0,0 +1,42 @@
+import os
+import sys
+import pytest
+
+# The app runs from the repository root and imports modules.* from there
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules import incident_store  # noqa: E402
+
+
+def _sqlite_store(tmp_path):
+    return incident_store.SQLiteIncidentStore(str(tmp_path / "incidents.db"))
+
+
+def _mysql_store(tmp_path):
+    # Needs a scratch database; every table in it is emptied
+    database = os.environ.get("MYSQL_TEST_DATABASE")
+    if not database:
+        pytest.skip("set MYSQL_TEST_DATABASE to run the contract tests against MySQL")
+    pytest.importorskip("mysql.connector")
+    store = incident_store.MySQLIncidentStore(
+        pool_name="incidents_test",
+        host=os.environ.get("MYSQL_HOST", "localhost"),
+        port=int(os.environ.get("MYSQL_PORT", "3306")),
+        user=os.environ.get("MYSQL_USER", "root"),
+        password=os.environ.get("MYSQL_PASSWORD", ""),
+        database=database,
+    )
+    with store.connection() as conn:
+        cursor = conn.cursor()
+        for table in ("incidents", "incident_events", "incident_response_times",
+                      "incident_rollups", "incident_counts", "incident_logs"):
+            cursor.execute(f"DELETE FROM {table}")
+        conn.commit()
+    return store
+
+
+@pytest.fixture(params=["sqlite", "mysql"])
+def store(request, tmp_path):
+    store = {"sqlite": _sqlite_store, "mysql": _mysql_store}[request.param](tmp_path)
+    yield store
+    store.close()
@@ -0,0 +1,110 @@
+"""Archived incidents: read-only, flagged, and only read when a page needs them."""
+from datetime import datetime
+import pytest
+from modules import incident_archive, incident_db, incident_store
+
+NOW = datetime(2024, 6, 1)
+COLUMNS = ["id", "timestamp", "severity"]
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = incident_store.SQLiteIncidentStore(str(tmp_path / "incidents.db"))
+    # Six months of Low and Medium incidents, plus one Critical in March
+    old = [(f"Old {month}-{day}", "Low" if day % 2 else "Medium", "Archived",
+            f"2023-{month:02d}-{day:02d} 12:00:00")
+           for month in range(1, 7) for day in range(1, 4)]
+    old.append(("Old breach", "Critical", "Archived", "2023-03-15 08:00:00"))
+    store.insert_incidents(old)
+    store.insert_incidents([(f"New {day}", "Critical", "Hot", f"2024-05-{day:02d} 09:00:00")
+                            for day in range(1, 8)])
+    conn = incident_db.connect(store.path)
+    try:
+        while incident_archive.archive_batch(conn, now=NOW):
+            pass
+    finally:
+        conn.close()
+    yield store
+    store.close()
+
+
+def all_pages(store, limit, **filters):
+    rows, after = [], None
+    while True:
+        page, after = store.query_page(limit=limit, after=after, columns=COLUMNS, **filters)
+        rows += page
+        if after is None:
+            return rows
+
+
+def expected(store, sort):
+    rows = all_pages(store, 1000, sort="newest")
+    if sort.startswith("severity"):
+        key = lambda row: (incident_db.SEVERITY_RANK[row[2]], row[1], row[0])
+    else:
+        key = lambda row: (row[1], row[0])
+    return sorted(rows, key=key, reverse=sort in ("severity_desc", "newest"))
+
+
+def count_archive_reads(monkeypatch):
+    reads = []
+    read = incident_archive._read_archive
+
+    def counting(path, sql, params):
+        reads.append(path)
+        return read(path, sql, params)
+
+    monkeypatch.setattr(incident_archive, "_read_archive", counting)
+    return reads
+
+
+def test_archived_incidents_are_read_only(store):
+    archived = [row for row in all_pages(store, 100) if row[1].startswith("2023")]
+    assert len(archived) == 19
+    incident_id = archived[0][0]
+    with pytest.raises(incident_store.IncidentArchivedError):
+        store.set_status(incident_id, "Resolved")
+    with pytest.raises(incident_store.IncidentArchivedError):
+        store.submit("set_status", incident_id, "Resolved").result()
+    with pytest.raises(KeyError):
+        store.set_status(10**6, "Resolved")
+
+    rows = all_pages(store, 100)
+    flagged = store.archived_ids((row[0], row[1]) for row in rows)
+    assert flagged == {row[0] for row in archived}
+
+
+@pytest.mark.parametrize("sort", ["severity_desc", "severity_asc", "newest", "oldest"])
+def test_pages_merge_archives_in_order(store, sort):
+    for limit in (1, 3, 5, 50):
+        assert all_pages(store, limit, sort=sort) == expected(store, sort)
+
+
+def test_severity_page_skips_archives_that_cannot_reach_it(store, monkeypatch):
+    reads = count_archive_reads(monkeypatch)
+    rows, after = store.query_page(limit=5, columns=COLUMNS, sort="severity_desc")
+    assert [row[1][:4] for row in rows] == ["2024"] * 5
+    assert reads == []
+
+    # The next page holds the archived Critical and the newest Mediums;
+    # the oldest months have nothing that recent
+    rows, _ = store.query_page(limit=5, after=after, columns=COLUMNS, sort="severity_desc")
+    assert rows[2][2] == "Critical" and rows[2][1].startswith("2023-03")
+    assert [path.rsplit("-", 1)[-1] for path in reads] == ["03.db", "06.db", "05.db", "04.db"]
+
+
+def test_archives_without_ranges_are_cataloged(store):
+    with store.connection() as conn:
+        conn.execute("DELETE FROM incident_archive_ranges")
+        conn.commit()
+    # Read as if they held every severity until then
+    assert all_pages(store, 4, sort="severity_desc") == expected(store, "severity_desc")
+
+    conn = incident_db.connect(store.path)
+    try:
+        incident_archive.fill_ranges(conn)
+        ranges = conn.execute("SELECT COUNT(*) FROM incident_archive_ranges").fetchone()[0]
+    finally:
+        conn.close()
+    # Low and Medium in each of the six months, and March's Critical
+    assert ranges == 13
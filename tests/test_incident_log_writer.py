@@ -0,0 +1,88 @@
+"""IncidentLogWriter against a stand-in store, so no database is needed."""
+import threading
+import time
+from modules import incident_store, security_db
+
+
+class RecordingStore:
+    def __init__(self):
+        self.rows = []
+        self.written = threading.Event()
+
+    def insert_log_entries(self, entries):
+        self.rows.extend(entries)
+        self.written.set()
+
+
+def test_single_row_is_flushed_within_the_interval():
+    store = RecordingStore()
+    writer = security_db.IncidentLogWriter(store, flush_interval=0.2)
+    try:
+        started = time.monotonic()
+        writer.log("Port scan detected")
+        assert store.written.wait(2)
+        assert time.monotonic() - started < 1
+        [(text, logged_at)] = store.rows
+        assert text == "Port scan detected" and len(logged_at) == 19
+    finally:
+        writer.close(5)
+
+
+def test_full_buffer_is_flushed_without_waiting():
+    store = RecordingStore()
+    writer = security_db.IncidentLogWriter(store, buffer_size=3, flush_interval=60)
+    try:
+        for number in range(3):
+            writer.log(f"Event {number}")
+        assert store.written.wait(2)
+        assert [text for text, _ in store.rows] == ["Event 0", "Event 1", "Event 2"]
+    finally:
+        writer.close(5)
+
+
+def test_rows_reach_the_incident_store(tmp_path):
+    store = incident_store.SQLiteIncidentStore(str(tmp_path / "incidents.db"))
+    try:
+        writer = security_db.IncidentLogWriter(store, flush_interval=60)
+        writer.log("Brute force from 10.0.0.7")
+        writer.close(5)
+        rows, _ = store.query_log_page()
+        assert [text for _, _, text in rows] == ["Brute force from 10.0.0.7"]
+    finally:
+        store.close()
+
+
+class RejectingStore(RecordingStore):
+    def insert_log_entries(self, entries):
+        if any(text.startswith("Bad") for text, _ in entries):
+            raise incident_store.IncidentStoreError("Data too long for column 'incident'")
+        super().insert_log_entries(entries)
+
+
+def test_rejected_batch_is_dropped_and_counted():
+    store = RejectingStore()
+    writer = security_db.IncidentLogWriter(store, buffer_size=2, flush_interval=60)
+    try:
+        for text in ("Bad 0", "Event 1", "Event 2", "Event 3"):
+            writer.log(text)
+        writer.flush()
+        assert writer.write([("Bad", "2024-05-01 10:00:00")]) == security_db.REJECTED
+        # The batch behind the rejected one is still written
+        assert [text for text, _ in store.rows] == ["Event 2", "Event 3"]
+        assert writer.rejected == 2
+    finally:
+        assert writer.close(5) == 2
+
+
+class UnreachableStore(RecordingStore):
+    def insert_log_entries(self, entries):
+        raise incident_store.IncidentStoreError("Lost connection to MySQL server", transient=True)
+
+
+def test_rows_are_kept_while_the_database_is_unreachable(monkeypatch):
+    monkeypatch.setattr(security_db, "RETRY_DELAY", 0)
+    writer = security_db.IncidentLogWriter(UnreachableStore(), flush_interval=60)
+    writer.log("Event 0")
+    assert writer.flush() is False
+    assert writer.waiting() == 1 and writer.rejected == 0
+    assert writer.close(5) == 1
@@ -0,0 +1,90 @@
+"""The incident log model: a bounded window of pages, and read-only archived rows."""
+import os
+from datetime import datetime
+import pytest
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+QtCore = pytest.importorskip("PyQt5.QtCore")
+
+from modules import incident_archive, incident_db, incident_store  # noqa: E402
+from modules.incident_model import ARCHIVED_ROLE, IncidentTableModel  # noqa: E402
+
+
+@pytest.fixture
+def app():
+    return QtCore.QCoreApplication.instance() or QtCore.QCoreApplication([])
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = incident_store.SQLiteIncidentStore(str(tmp_path / "incidents.db"))
+    store.insert_incidents([(f"Incident {n}", "Low", f"Number {n}",
+                             f"2024-05-01 {n // 60:02d}:{n % 60:02d}:00") for n in range(100)])
+    yield store
+    store.close()
+
+
+def scroll_to_end(model):
+    while model.canFetchMore():
+        model.fetchMore()
+    for position in range(model.rowCount()):
+        model.index(position, 1).data()
+
+
+def subjects(model):
+    return [model.index(position, 1).data() for position in range(model.rowCount())]
+
+
+def test_only_recent_pages_keep_their_rows(app, store):
+    model = IncidentTableModel(store, page_size=10, max_pages=3)
+    model.refresh()
+    scroll_to_end(model)
+
+    assert model.rowCount() == 100
+    assert len(model.loaded) == 3
+    assert sum(page.rows is not None for page in model.pages) == 3
+    assert len(model.by_id) == 30
+    # Dropped pages are read again by keyset
+    assert model.index(0, 1).data() == "Incident 99"
+    assert subjects(model) == [f"Incident {n}" for n in reversed(range(100))]
+
+
+def test_dropped_page_picks_up_changes_when_read_again(app, store):
+    model = IncidentTableModel(store, page_size=10, max_pages=3)
+    model.refresh()
+    scroll_to_end(model)
+    assert model.pages[1].rows is None
+
+    # Sorts into the second page, which is not in memory
+    feed = store.change_feed()
+    try:
+        feed.poll()
+        incident_id = store.insert_incident("Late report", "High", "Backdated", "2024-05-01 01:25:30")
+        model.apply_changes(feed.poll())
+    finally:
+        feed.conn.close()
+    assert model.rowCount() == 100
+
+    model.index(10, 1).data()
+    app.processEvents()
+    assert model.rowCount() == 101
+    assert subjects(model).index("Late report") == 14
+    assert model.index(14, 0).data(QtCore.Qt.UserRole) == incident_id
+
+
+def test_archived_rows_are_marked_read_only(app, tmp_path):
+    store = incident_store.SQLiteIncidentStore(str(tmp_path / "archived.db"))
+    try:
+        store.insert_incidents([("Old", "Low", "Archived", "2023-01-05 10:00:00"),
+                                ("New", "High", "Hot", "2024-05-30 10:00:00")])
+        conn = incident_db.connect(store.path)
+        try:
+            incident_archive.archive_batch(conn, now=datetime(2024, 6, 1))
+        finally:
+            conn.close()
+        model = IncidentTableModel(store)
+        model.refresh()
+        assert [model.index(row, 4).data() for row in range(2)] == ["New", "New (archived)"]
+        assert [model.index(row, 0).data(ARCHIVED_ROLE) for row in range(2)] == [False, True]
+    finally:
+        store.close()
@@ -0,0 +1,190 @@
+"""Contract tests every IncidentStore backend has to pass.
+
+They run against SQLite in a temporary directory. Set MYSQL_TEST_DATABASE
+(plus MYSQL_HOST, MYSQL_USER, ... as for the app) to run them against a
+scratch MySQL database as well.
+"""
+import pytest
+from concurrent.futures import Future
+from modules import incident_db, incident_store
+
+INCIDENTS = [
+    ("Failed login burst", "High", "Repeated failed logins for admin", "2024-05-01 10:00:00"),
+    ("Port scan detected", "Medium", "Scan from 10.0.0.7", "2024-05-01 11:00:00"),
+    ("Malware signature match", "Critical", "Trojan found in downloads", "2024-05-02 09:30:00"),
+    ("Disk usage high", "Low", "Disk 91% full on /var", "2024-05-02 09:30:00"),
+    ("Unusual outbound traffic", "High", "Large upload to unknown host", "2024-05-03 08:15:00"),
+    ("Failed login burst", "Low", "Two failed logins for guest", "2024-05-03 12:45:00"),
+    ("CPU usage spike", "Medium", "100% CPU for 5 minutes", "2024-05-04 16:20:00"),
+]
+COLUMNS = ["id", "timestamp", "subject", "severity", "description", "status"]
+
+
+def all_pages(store, page_size, **filters):
+    rows = []
+    after = None
+    while True:
+        page, after = store.query_page(limit=page_size, after=after, columns=COLUMNS, **filters)
+        rows.extend(page)
+        if after is None:
+            return rows
+
+
+def test_insert_incident_round_trip(store):
+    incident_id = store.insert_incident("Port scan detected", "Medium", "Scan from 10.0.0.7",
+                                        "2024-05-01 11:00:00")
+    rows, after = store.query_page(limit=10, columns=COLUMNS)
+    assert rows == [(incident_id, "2024-05-01 11:00:00", "Port scan detected", "Medium",
+                     "Scan from 10.0.0.7", "New")]
+    assert after is None
+
+
+def test_insert_incidents_returns_ids_in_order(store):
+    ids = store.insert_incidents(INCIDENTS)
+    assert len(ids) == len(INCIDENTS)
+    assert ids == sorted(ids)
+    rows = store.query_page(limit=len(ids), columns=["id", "subject", "description"],
+                            ids=ids)[0]
+    by_id = {row[0]: row[1:] for row in rows}
+    assert [by_id[i] for i in ids] == [(subject, description)
+                                       for subject, _, description, _ in INCIDENTS]
+    assert store.insert_incidents([]) == []
+
+
+@pytest.mark.parametrize("sort", ["newest", "oldest", "severity_desc", "severity_asc"])
+def test_pages_cover_every_incident_once(store, sort):
+    store.insert_incidents(INCIDENTS)
+    expected, after = store.query_page(limit=100, columns=COLUMNS, sort=sort)
+    assert after is None
+    assert len(expected) == len(INCIDENTS)
+    assert all_pages(store, 2, sort=sort) == expected
+
+
+def test_sort_order(store):
+    store.insert_incidents(INCIDENTS)
+    newest = [row[1] for row in all_pages(store, 3, sort="newest")]
+    assert newest == sorted(newest, reverse=True)
+    ranks = [incident_db.SEVERITY_RANK[row[3]] for row in all_pages(store, 3, sort="severity_desc")]
+    assert ranks == sorted(ranks, reverse=True)
+
+
+def test_filters(store):
+    store.insert_incidents(INCIDENTS)
+    assert {row[3] for row in all_pages(store, 2, severity="High")} == {"High"}
+    assert len(all_pages(store, 2, severity="High")) == 2
+    assert len(all_pages(store, 2, severity="All")) == len(INCIDENTS)
+
+    matches = all_pages(store, 2, search="login")
+    assert sorted(row[4] for row in matches) == ["Repeated failed logins for admin",
+                                                  "Two failed logins for guest"]
+
+    in_range = all_pages(store, 2, since="2024-05-02 00:00:00", until="2024-05-03 12:00:00")
+    assert sorted(row[1] for row in in_range) == ["2024-05-02 09:30:00", "2024-05-02 09:30:00",
+                                                 "2024-05-03 08:15:00"]
+
+
+def test_cursor_must_match_sort(store):
+    store.insert_incidents(INCIDENTS)
+    _, after = store.query_page(limit=2, sort="newest")
+    with pytest.raises(ValueError):
+        store.query_page(limit=2, after=after, sort="severity_desc")
+
+
+def test_set_status(store):
+    incident_id = store.insert_incident("Port scan detected", "Medium", "Scan", "2024-05-01 11:00:00")
+    assert store.set_status(incident_id, "Acknowledged") is True
+    assert store.set_status(incident_id, "Acknowledged") is False
+    rows = store.query_page(limit=1, columns=["status"], ids=[incident_id])[0]
+    assert rows == [("Acknowledged",)]
+    with pytest.raises(ValueError):
+        store.set_status(incident_id, "Done")
+    with pytest.raises(KeyError):
+        store.set_status(incident_id + 1000, "Resolved")
+
+
+def test_stats(store):
+    ids = store.insert_incidents(INCIDENTS)
+    store.set_status(ids[0], "Resolved")
+    stats = store.get_stats()
+    assert stats["total"] == len(INCIDENTS)
+    assert stats["by_severity"] == {"Low": 2, "Medium": 2, "High": 2, "Critical": 1}
+    assert stats["by_status"] == {"New": len(INCIDENTS) - 1, "Resolved": 1}
+    assert stats["latest"] == "2024-05-04 16:20:00"
+
+
+def test_response_times(store):
+    times = store.get_response_times()
+    assert times["mtta"]["all"] is None and times["mttr"]["all"] is None
+
+    incident_id = store.insert_incident("Malware signature match", "Critical", "Trojan",
+                                        incident_db.now_timestamp())
+    store.set_status(incident_id, "Acknowledged")
+    store.set_status(incident_id, "Resolved")
+    times = store.get_response_times()
+    for metric in ("mtta", "mttr"):
+        assert times[metric]["Critical"] is not None
+        assert 0 <= times[metric]["all"] < 60
+        assert times[metric]["Low"] is None
+
+
+def test_timeseries(store):
+    store.insert_incidents(INCIDENTS[:3])
+    store.insert_incident(*INCIDENTS[3])
+    store.record_occurrence("f" * 32, "Disk usage high", "Low", "Disk 92% full",
+                            "2024-05-02 09:45:00")
+
+    periods, series = store.get_timeseries("day", "2024-04-30", "2024-05-03")
+    assert periods == ["2024-04-30", "2024-05-01", "2024-05-02"]
+    assert series == {"Low": [0, 0, 2], "Medium": [0, 1, 0], "High": [0, 1, 0],
+                      "Critical": [0, 0, 1]}
+
+    periods, series = store.get_timeseries("hour", "2024-05-01 10:30:00", "2024-05-01 12:00:00",
+                                           severity="Medium")
+    assert periods == ["2024-05-01 10:00:00", "2024-05-01 11:00:00"]
+    assert series == {"Medium": [0, 1]}
+    with pytest.raises(ValueError):
+        store.get_timeseries("week", "2024-05-01")
+
+
+def test_version_moves_on_every_write(store):
+    versions = [store.version()[0]]
+    incident_id = store.insert_incident("Disk usage high", "Low", "Disk 91% full")
+    versions.append(store.version()[0])
+    store.set_status(incident_id, "Contained")
+    versions.append(store.version()[0])
+    assert len(set(versions)) == 3
+    assert store.version()[0] == versions[-1]
+
+
+def test_submit_returns_future(store):
+    future = store.submit("insert_incident", "CPU usage spike", "Medium", "100% CPU")
+    assert isinstance(future, Future)
+    incident_id = future.result(timeout=10)
+    assert store.submit("set_status", incident_id, "Acknowledged").result(timeout=10) is True
+    with pytest.raises(KeyError):
+        store.submit("set_status", incident_id + 1000, "Resolved").result(timeout=10)
+    with pytest.raises(ValueError):
+        store.submit("drop_everything")
+
+
+def test_log_entries_page_newest_first(store):
+    store.insert_log_entries([(f"Entry {number}", f"2024-05-01 10:00:{number:02d}")
+                              for number in range(5)])
+    rows, after = store.query_log_page(limit=3)
+    assert [(logged_at, text) for _, logged_at, text in rows] == [
+        ("2024-05-01 10:00:04", "Entry 4"),
+        ("2024-05-01 10:00:03", "Entry 3"),
+        ("2024-05-01 10:00:02", "Entry 2"),
+    ]
+    rows, after = store.query_log_page(limit=3, after=after)
+    assert [text for _, _, text in rows] == ["Entry 1", "Entry 0"]
+    assert after is None
+
+
+def test_backend_must_implement_the_interface():
+    class PartialStore(incident_store.IncidentStore):
+        def insert_incident(self, subject, severity, description, timestamp=None, status="New"):
+            return 1
+
+    with pytest.raises(TypeError):
+        PartialStore()
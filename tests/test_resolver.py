@@ -0,0 +1,30 @@
+"""The shared DNS resolver: failures are cached and never leave a lookup pending."""
+from modules import resolver
+
+
+def test_unexpected_failure_is_cached_as_negative():
+    calls = []
+
+    def broken(name):
+        calls.append(name)
+        raise ValueError("bad answer")
+
+    lookup = resolver.Resolver(max_workers=2)
+    try:
+        assert lookup._lookup("forward", "host.example", broken).result(timeout=5) is None
+        assert lookup.pending == {}
+        assert lookup._lookup("forward", "host.example", broken).result(timeout=5) is None
+        assert calls == ["host.example"]
+    finally:
+        lookup.close()
+
+
+def test_answers_are_shared_and_cached():
+    lookup = resolver.Resolver(max_workers=2)
+    try:
+        futures = [lookup._lookup("forward", "host.example", lambda name: "192.0.2.1")
+                   for _ in range(3)]
+        assert [future.result(timeout=5) for future in futures] == ["192.0.2.1"] * 3
+        assert lookup.cache[("forward", "host.example")][1] == "192.0.2.1"
+    finally:
+        lookup.close()
@@ -1,46 +1,496 @@
-from flask import Flask, render_template, jsonify, request
+from flask import Flask, render_template, jsonify, request, Response
 import sqlite3
-from datetime import datetime
+from datetime import datetime, timezone
 import json
+import html
+import base64
+import binascii
+import io
+import threading
+import time
+from collections import OrderedDict
+from modules import incident_db, incident_feed, incident_archive, incident_store, incident_export
+from modules.incident_cache import IncidentCache, CACHE_DAYS
 
 app = Flask(__name__)
 
-def get_db_connection():
-    conn = sqlite3.connect('incidents.db')
-    conn.row_factory = sqlite3.Row
-    return conn
+def warm_connection(conn):
+    """Prepare the statements behind the dashboard's polling requests"""
+    incident_feed.store_version(conn)
+    incident_db.get_stats(conn)
+    incident_db.get_response_times(conn)
+    incident_archive.query_page(conn, limit=DEFAULT_PAGE_SIZE, highlight=SNIPPET_MARKERS,
+                                **incident_filters({}))
+
+# Snippets are HTML-escaped before these markers are swapped for <mark> tags,
+# so incident text can never inject markup into the page
+SNIPPET_MARKERS = ("\x02", "\x03")
+
+def incident_to_dict(row, archived=()):
+    incident = dict(zip(incident_db.INCIDENT_COLUMNS, row))
+    # Archived incidents are listed but can no longer be changed
+    incident['archived'] = incident['id'] in archived
+    if len(row) > len(incident_db.INCIDENT_COLUMNS):
+        incident['snippet'] = (html.escape(row[-1])
+                               .replace(SNIPPET_MARKERS[0], '<mark>')
+                               .replace(SNIPPET_MARKERS[1], '</mark>'))
+    return incident
+
+class ResponseCache:
+    """Serialized JSON bodies keyed by request, valid for one store version.
+
+    Entries are dropped as soon as the incident store moves past the version
+    they were built from, whichever process made the write.
+    """
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key, version):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[0] != version:
+                return None
+            self.entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key, version, body):
+        with self.lock:
+            self.entries[key] = (version, body)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def invalidate(self):
+        with self.lock:
+            self.entries.clear()
+
+response_cache = ResponseCache()
+
+def cached_json(build):
+    """Serve build()'s JSON with ETag/Last-Modified from the store version.
+
+    Clients that already hold the current version get a 304 without the
+    query running; everyone else shares one serialized copy per request.
+    """
+    key = request.full_path
+    # Read the version before the data, so a body is never cached under a
+    # version newer than what it shows
+    version, changed_at = store.version()
+    if request.if_none_match.contains_weak(str(version)):
+        body = b''
+    else:
+        body = response_cache.get(key, version)
+        if body is None:
+            body = json.dumps(build()).encode()
+            response_cache.put(key, version, body)
+
+    response = app.response_class(body, mimetype='application/json')
+    response.set_etag(str(version), weak=True)
+    if changed_at is not None:
+        response.last_modified = datetime.fromtimestamp(changed_at, timezone.utc)
+    # Let browsers keep the body but always check back with the validators
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+def dashboard_stats():
+    """Counts for the stats cards plus MTTA/MTTR in seconds"""
+    stats = store.get_stats()
+    stats['response_times'] = store.get_response_times()
+    stats['last_24h'] = incident_cache.counts(days=1)
+    return stats
 
 @app.route('/')
 def index():
     return render_template('index.html')
 
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+class BadRequest(ValueError):
+    pass
+
+@app.errorhandler(BadRequest)
+def handle_bad_request(error):
+    return jsonify({"status": "error", "message": str(error)}), 400
+
+def encode_cursor(values):
+    """Opaque page token holding the sort key of the last row sent"""
+    return base64.urlsafe_b64encode(json.dumps(list(values)).encode()).decode()
+
+def decode_cursor(token):
+    try:
+        values = json.loads(base64.urlsafe_b64decode(token.encode()))
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise BadRequest("Invalid cursor")
+    if not isinstance(values, list):
+        raise BadRequest("Invalid cursor")
+    return tuple(values)
+
+def parse_timestamp(value, name):
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value).strftime("%Y-%m-%d %H:%M:%S")
+    except ValueError:
+        raise BadRequest(f"{name} must be an ISO 8601 date or time")
+
+def incident_filters(args):
+    """Filters shared by the incident list endpoints, read from the query string"""
+    search = args.get('q', '').strip()
+    sort = args.get('sort', 'relevance' if search else 'newest')
+    if sort not in incident_db.SORT_KEYS:
+        raise BadRequest(f"sort must be one of {', '.join(incident_db.SORT_KEYS)}")
+    severity = args.get('severity') or None
+    if severity and severity not in incident_db.SEVERITIES:
+        raise BadRequest(f"severity must be one of {', '.join(incident_db.SEVERITIES)}")
+    return {
+        'search': search,
+        'sort': sort,
+        'severity': severity,
+        'status': args.get('status') or None,
+        'since': parse_timestamp(args.get('since'), 'since'),
+        'until': parse_timestamp(args.get('until'), 'until'),
+    }
+
+# Opening the store creates or migrates the schema, once for the process;
+# on SQLite its pooled connections come warm
+store = incident_store.open_store(warmup=warm_connection)
+# Recent incidents in memory, for counts that should not touch the database;
+# loaded in the background so the first request does not wait for it
+incident_cache = IncidentCache(store)
+threading.Thread(target=incident_cache.sync, name="incident-cache-load", daemon=True).start()
+
 @app.route('/api/incidents', methods=['GET'])
 def get_incidents():
-    conn = get_db_connection()
-    incidents = conn.execute('SELECT * FROM incidents ORDER BY timestamp DESC').fetchall()
-    conn.close()
-    return jsonify([dict(incident) for incident in incidents])
+    filters = incident_filters(request.args)
+    try:
+        limit = min(max(int(request.args.get('limit', DEFAULT_PAGE_SIZE)), 1), MAX_PAGE_SIZE)
+    except ValueError:
+        raise BadRequest("limit must be an integer")
+    after = request.args.get('after')
+    after = decode_cursor(after) if after else None
+
+    def build():
+        try:
+            incidents, next_cursor = store.query_page(
+                limit=limit, after=after, highlight=SNIPPET_MARKERS, **filters)
+        except ValueError as e:
+            # A cursor with the wrong number of values for this sort
+            raise BadRequest(str(e))
+        archived = store.archived_ids((incident[0], incident[1]) for incident in incidents)
+        return {
+            "incidents": [incident_to_dict(incident, archived) for incident in incidents],
+            "next_cursor": encode_cursor(next_cursor) if next_cursor else None,
+        }
+
+    return cached_json(build)
+
+@app.route('/api/incidents/counts', methods=['GET'])
+def count_incidents():
+    """Counts by severity and status over the last days, from the in-memory cache.
+
+    Not served through cached_json: the window ends now, so the counts
+    change as incidents age out of it without the store version moving.
+    """
+    try:
+        days = int(request.args.get('days', 1))
+    except ValueError:
+        raise BadRequest("days must be an integer")
+    if not 1 <= days <= CACHE_DAYS:
+        raise BadRequest(f"days must be between 1 and {CACHE_DAYS}")
+    severity = request.args.get('severity') or None
+    if severity and severity not in incident_db.SEVERITIES:
+        raise BadRequest(f"severity must be one of {', '.join(incident_db.SEVERITIES)}")
+    status = request.args.get('status') or None
+
+    counts = incident_cache.counts(days=days, severity=severity, status=status)
+    counts['days'] = days
+    return jsonify(counts)
+
+# Buckets charted when since is not given, ending with the current one
+TIMESERIES_DEFAULT_PERIODS = {'hour': 48, 'day': 30}
+
+@app.route('/api/incidents/timeseries', methods=['GET'])
+def incident_timeseries():
+    """Incidents raised per hour or day by severity, from the rollup tables.
+
+    Every bucket in the range is listed, empty ones as zeros. Not served
+    through cached_json: without since the range moves with the clock, not
+    with the store version, and the rollups are cheap to read anyway.
+    """
+    granularity = request.args.get('granularity', 'hour')
+    if granularity not in TIMESERIES_DEFAULT_PERIODS:
+        raise BadRequest(f"granularity must be one of {', '.join(TIMESERIES_DEFAULT_PERIODS)}")
+    severity = request.args.get('severity') or None
+    if severity and severity not in incident_db.SEVERITIES:
+        raise BadRequest(f"severity must be one of {', '.join(incident_db.SEVERITIES)}")
+    until = parse_timestamp(request.args.get('until'), 'until')
+    since = parse_timestamp(request.args.get('since'), 'since')
+    if since is None:
+        since = incident_db.timeseries_since(granularity, TIMESERIES_DEFAULT_PERIODS[granularity],
+                                             until)
+
+    try:
+        periods, series = store.get_timeseries(granularity, since, until, severity)
+    except ValueError as e:
+        raise BadRequest(str(e))
+    return jsonify({
+        "granularity": granularity,
+        "periods": periods,
+        "series": series,
+        "totals": {name: sum(counts) for name, counts in series.items()},
+    })
+
+@app.route('/api/incidents/export', methods=['GET'])
+def export_incidents():
+    """Download every incident matching the list filters as CSV or NDJSON.
+
+    The body is streamed a page at a time, so memory use does not depend on
+    how many incidents match. gzip=1 sends a .gz file instead.
+    """
+    filters = incident_filters(request.args)
+    export_format = request.args.get('format', 'csv')
+    if export_format not in incident_export.EXPORT_FORMATS:
+        raise BadRequest(f"format must be one of {', '.join(incident_export.EXPORT_FORMATS)}")
+    compress = request.args.get('gzip', '').lower() in ('1', 'true', 'yes')
+
+    filename = f"incidents-{datetime.now().strftime('%Y%m%d-%H%M%S')}.{export_format}"
+    mimetype = incident_export.EXPORT_FORMATS[export_format]
+    if compress:
+        filename += '.gz'
+        mimetype = 'application/gzip'
+    return Response(incident_export.export_chunks(store, export_format, compress, **filters),
+                    mimetype=mimetype, headers={
+                        'Content-Disposition': f'attachment; filename="{filename}"',
+                        'X-Accel-Buffering': 'no',
+                    })
+
+class ChangeNotifier:
+    """Wakes incident streams when the store moves past the seq they have sent.
+
+    One thread per process watches PRAGMA data_version, so an idle dashboard
+    costs a pragma per interval however many browsers are connected. Writes
+    from any connection or process count, including this app's own.
+    """
+
+    def __init__(self, path, interval=0.5):
+        self.path = path
+        self.interval = interval
+        self.condition = threading.Condition()
+        self.seq = 0
+        self.thread = None
+
+    def start(self):
+        with self.condition:
+            if self.thread is not None:
+                return
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            incident_db.configure_connection(conn)
+            self.seq = incident_feed.latest_seq(conn)
+            self.thread = threading.Thread(target=self.watch, args=(conn,), daemon=True)
+            self.thread.start()
+
+    def watch(self, conn):
+        data_version = None
+        while True:
+            current = conn.execute("PRAGMA data_version").fetchone()[0]
+            if current != data_version:
+                data_version = current
+                seq = incident_feed.latest_seq(conn)
+                with self.condition:
+                    if seq != self.seq:
+                        self.seq = seq
+                        self.condition.notify_all()
+            time.sleep(self.interval)
+
+    def wait(self, after_seq, timeout):
+        """Block until the store is past after_seq or timeout; return the latest seq"""
+        with self.condition:
+            self.condition.wait_for(lambda: self.seq > after_seq, timeout)
+            return self.seq
+
+# Streams need the SQLite change log; other backends have none
+change_notifier = (ChangeNotifier(store.path)
+                   if isinstance(store, incident_store.SQLiteIncidentStore) else None)
+
+# Comment line sent on an idle stream so proxies keep it open and a gone
+# client is noticed
+STREAM_KEEPALIVE = 15
+# Above this many changed incidents the client is told to reload instead
+MAX_STREAM_CHANGES = 500
+
+def sse_event(event, data, event_id=None):
+    message = f"event: {event}\ndata: {json.dumps(data)}\n\n"
+    return f"id: {event_id}\n{message}" if event_id is not None else message
+
+def stream_changes(feed, filters):
+    """SSE messages for each batch of changes the feed reports"""
+    batch = feed.poll(force=True)
+    if batch is None:
+        return
+    if batch.reset or len(batch.upserts) + len(batch.deletes) > MAX_STREAM_CHANGES:
+        yield sse_event("reset", {}, batch.last_seq)
+        return
+    # Re-read the changed incidents through the stream's filters; the ones
+    # that no longer match are removed from the client's view
+    matching, _ = store.query_page(highlight=SNIPPET_MARKERS, ids=sorted(batch.upserts),
+                                   limit=max(len(batch.upserts), 1), **filters)
+    incidents = [incident_to_dict(row) for row in matching]
+    matched = {incident['id'] for incident in incidents}
+    removed = sorted(batch.deletes | (batch.upserts - matched))
+    yield sse_event("changes", {
+        "incidents": incidents,
+        "removed": removed,
+        "stats": dashboard_stats(),
+    }, batch.last_seq)
+
+@app.route('/api/incidents/stream', methods=['GET'])
+def stream_incidents():
+    """Server-Sent Events feed of incidents changed after a change log seq.
+
+    The seq comes from Last-Event-ID when the browser reconnects, or from
+    last_event_id, which the page takes from the ETag of the list it loaded.
+    Without either the stream starts from now.
+    """
+    filters = incident_filters(request.args)
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    try:
+        last_seq = int(last_event_id) if last_event_id else None
+    except ValueError:
+        raise BadRequest("Last-Event-ID must be a change sequence number")
+    if change_notifier is None:
+        return jsonify({"status": "error",
+                        "message": "Live updates need the SQLite incident store"}), 501
+    change_notifier.start()
+
+    def events():
+        feed = store.change_feed()
+        try:
+            yield "retry: 2000\n\n"
+            if last_seq is not None and last_seq > feed.last_seq:
+                # From some other database; the client's view cannot be patched
+                yield sse_event("reset", {}, feed.last_seq)
+            elif last_seq is not None:
+                feed.last_seq = last_seq
+            while True:
+                yield from stream_changes(feed, filters)
+                if change_notifier.wait(feed.last_seq, STREAM_KEEPALIVE) <= feed.last_seq:
+                    yield ": keepalive\n\n"
+        finally:
+            feed.conn.close()
+
+    return Response(events(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        # Stop nginx from buffering the stream
+        'X-Accel-Buffering': 'no',
+    })
+
+@app.route('/api/stats', methods=['GET'])
+def get_stats():
+    # Not through cached_json, like the counts: last_24h and the MTTA/MTTR
+    # windows move with the clock. All of it is read from counters, rollups
+    # and the in-memory cache, so building it every time is cheap
+    return jsonify(dashboard_stats())
+
+@app.route('/api/incidents/<int:incident_id>/status', methods=['POST'])
+def set_incident_status(incident_id):
+    """Move an incident through its lifecycle; the transition is logged as an event"""
+    status = (request.get_json(silent=True) or {}).get('status')
+    try:
+        changed = store.set_status(incident_id, status)
+    except ValueError as e:
+        raise BadRequest(str(e))
+    except KeyError:
+        return jsonify({"status": "error", "message": "Incident not found"}), 404
+    except incident_store.IncidentArchivedError:
+        return jsonify({"status": "error", "message": "Incident is archived and read-only"}), 409
+    response_cache.invalidate()
+    return jsonify({"status": "success", "changed": changed})
 
 @app.route('/api/incidents', methods=['POST'])
 def create_incident():
-    data = request.json
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    cursor.execute('''
-        INSERT INTO incidents (subject, severity, description, timestamp, status)
-        VALUES (?, ?, ?, ?, ?)
-    ''', (
-        data['subject'],
-        data['severity'],
-        data['description'],
-        datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-        "New"
-    ))
-    
-    conn.commit()
-    conn.close()
+    try:
+        subject, severity, description, timestamp = incident_db.validate_incident(request.json)
+    except ValueError as e:
+        raise BadRequest(str(e))
+    store.insert_incident(
+        subject,
+        severity,
+        description,
+        timestamp or datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+    )
+    response_cache.invalidate()
     return jsonify({"status": "success"})
 
+# Rows per transaction for bulk ingestion; big enough to amortize the
+# commit, small enough not to hold the write lock for long
+BULK_CHUNK_SIZE = 1000
+
+NDJSON_TYPES = ('application/x-ndjson', 'application/ndjson', 'application/jsonl')
+
+def bulk_records():
+    """Yield (index, record-or-error) from a JSON array or an NDJSON stream"""
+    if request.mimetype in NDJSON_TYPES:
+        # Read line by line so large uploads are never held in memory; the
+        # raw request stream is unbuffered, so readline would go byte by byte
+        stream = io.BufferedReader(request.stream, buffer_size=65536)
+        for index, line in enumerate(stream):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield index, json.loads(line)
+            except ValueError:
+                yield index, ValueError("invalid JSON")
+        return
+
+    records = request.get_json(silent=True)
+    if not isinstance(records, list):
+        raise BadRequest("Expected a JSON array or an NDJSON body")
+    yield from enumerate(records)
+
+@app.route('/api/incidents/bulk', methods=['POST'])
+def create_incidents_bulk():
+    results = []
+    pending = []
+
+    def flush():
+        try:
+            ids = store.insert_incidents([values for _, values in pending])
+        except incident_store.IncidentStoreError as e:
+            results.extend({"index": index, "error": f"database error: {str(e)}"}
+                           for index, _ in pending)
+        else:
+            results.extend({"index": index, "id": incident_id}
+                           for (index, _), incident_id in zip(pending, ids))
+        pending.clear()
+
+    try:
+        for index, record in bulk_records():
+            try:
+                if isinstance(record, ValueError):
+                    raise record
+                pending.append((index, incident_db.validate_incident(record)))
+            except ValueError as e:
+                results.append({"index": index, "error": str(e)})
+            if len(pending) >= BULK_CHUNK_SIZE:
+                flush()
+        if pending:
+            flush()
+    finally:
+        response_cache.invalidate()
+
+    results.sort(key=lambda result: result["index"])
+    inserted = sum(1 for result in results if "id" in result)
+    return jsonify({
+        "status": "success" if inserted == len(results) else "partial",
+        "inserted": inserted,
+        "failed": len(results) - inserted,
+        "results": results,
+    })
+
 if __name__ == '__main__':
-    app.run(debug=True) 
\ No newline at end of file
+    app.run(debug=True)
\ No newline at end of file